@@ -1,83 +1,101 @@
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify
 from flask_socketio import SocketIO, emit, join_room as socket_join_room, leave_room as socket_leave_room
-from db import create_room, join_room as db_join_room, get_room, add_task_to_user_in_room, get_tasks_for_user_in_room, get_user_rooms, get_room_by_name
+from db import create_room, join_room as db_join_room, get_room, add_task_to_user_in_room, get_tasks_for_user_in_room, get_user_room_summaries, get_room_by_name, find_tasks
+from db_common import format_room_summary, task_filters_from_args
 from flask_cors import CORS
 import uuid
-from collections import defaultdict
+from functools import wraps
 import os
 import sys
 import base64
-import json
+import json_utils
 import tempfile
-import assemblyai as aai
+import threading
+import time
+import services
 from datetime import datetime
-from video_call import VideoCall
+import server_common
+from server_common import RoomState, STREAM_MIN_ITEMS, TRANSCRIPTS_DIR
+import vad
+from audio_coalescer import AudioCoalescer, COALESCE_ENABLED
+from rate_limit import limit_event, limit_route, limiter
+from audio_queue import AudioIngestQueue, QueuedFlush, AUDIO_RETRY_AFTER_MS, ROOM_DRAIN_TIMEOUT
+from github_webhook import PushDebouncer
+from signaling import CandidateBatcher, ICE_BATCH_WINDOW_MS, same_room
+from static_assets import AssetStore
+import profiler
+from profiler import Sampler, ProfileToggle
+import progress_tracker
 from tasksync import extract_tasks
+from transcript_preprocess import prepare_extraction_input
 from dotenv import load_dotenv
+import logging
+from logger import configure_logging, get_logger, log_event, Lazy
 
 # Load environment variables
 load_dotenv()
 
-app = Flask(__name__)
+# The server is an entry point: configure at import so a WSGI host that imports `app` logs the same way
+configure_logging()
+logger = get_logger(__name__)
+vad.warn_if_ffmpeg_missing()
+
+# Static files are served from memory by static_assets instead of Flask's disk-backed /static route
+app = Flask(__name__, static_folder=None)
 CORS(app)
 app.config['SECRET_KEY'] = os.getenv('FLASK_SECRET_KEY', 'fallback-secret-key')
-
-# Get AssemblyAI API key from environment
-assemblyai_api_key = os.getenv('ASSEMBLYAI_API_KEY')
-if not assemblyai_api_key:
-    raise ValueError("ASSEMBLYAI_API_KEY environment variable is required")
-
-aai.settings.api_key = assemblyai_api_key
+# jsonify() uses the same encoder as the streamed endpoints (datetime, ObjectId, orjson when available)
+app.json = json_utils.TaskSyncJSONProvider(app)
 
 
 # Enable CORS for all routes
 CORS(app, origins="*")
 
+# Socket.IO / Engine.IO internals log every packet, so they are opt-in
+socketio_logging = os.getenv('SOCKETIO_LOGGING', 'false').lower() == 'true'
+
 # Configure SocketIO with comprehensive CORS settings
 socketio = SocketIO(app, 
                    cors_allowed_origins="*", 
-                   logger=True, 
-                   engineio_logger=True,
+                   logger=socketio_logging, 
+                   engineio_logger=socketio_logging,
+                   async_mode=os.getenv('SOCKETIO_ASYNC_MODE') or None,
                    transports=['polling', 'websocket'],
                    allow_upgrades=True)
 
-# Store room users with their names
-rooms = defaultdict(dict)  # {room: {userId: {"name": "John", "socketId": "abc123"}}}
-user_rooms = {}  # {socketId: room}
+# Room membership, VideoCall objects and legacy transcripts, shared in shape with async_app.py
+state = RoomState(TRANSCRIPTS_DIR)
+rooms = state.rooms  # {room: {userId: {"name": "John", "socketId": "abc123"}}}
+user_rooms = state.user_rooms  # {socketId: room}
+video_calls = state.video_calls  # {room: VideoCall}
+# Deprecated - kept for backward compatibility
+transcriptions = state.transcriptions  # {room: [{"speaker": "John", "transcription": "Hello world"}]}
+transcript_files = state.transcript_files  # {room: file_path}
 
-# Store VideoCall objects for each room
-video_calls = {}  # {room: VideoCall}
+# Bounded per-room/per-speaker queue between audio-chunk events and the transcription workers
+audio_queue = AudioIngestQueue()
+AUDIO_WORKERS = int(os.getenv('AUDIO_WORKERS', '4'))
+audio_workers_started = False
+audio_workers_lock = threading.Lock()
 
-# Store transcriptions for each room (deprecated - kept for backward compatibility)
-transcriptions = defaultdict(list)  # {room: [{"speaker": "John", "transcription": "Hello world"}]}
-transcript_files = {}  # {room: file_path} - Track transcript files for each room (deprecated)
+# Per-speaker buffers that merge consecutive audio chunks into one transcription job
+coalescer = AudioCoalescer()
 
-def create_transcript_file(room_name):
-    """Create a new transcript file for a room"""
-    room_uuid = str(uuid.uuid4())
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    filename = f"transcript_{room_name}_{timestamp}_{room_uuid[:8]}.txt"
-    filepath = os.path.join("/Users/ajayavasi/Code/TaskSync/transcripts", filename)
-    
-    # Create transcripts directory if it doesn't exist
-    os.makedirs(os.path.dirname(filepath), exist_ok=True)
-    
-    # Create the file with header
-    with open(filepath, 'w', encoding='utf-8') as f:
-        f.write(f"Video Call Transcript\n")
-        f.write(f"Room: {room_name}\n")
-        f.write(f"UUID: {room_uuid}\n")
-        f.write(f"Started: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
-        f.write("=" * 50 + "\n\n")
-    
-    transcript_files[room_name] = filepath
-    print(f"Created transcript file: {filepath}")
-    return filepath
+# Pushes received on /github/webhook, debounced per repository branch before a progress sweep
+push_debouncer = PushDebouncer()
+webhook_worker_started = False
+webhook_worker_lock = threading.Lock()
+
+# ICE candidates coalesced per (sender, target) before they are relayed
+candidate_batcher = CandidateBatcher()
+
+# index.html and static/, read and compressed once at startup
+assets = AssetStore()
 
 def append_to_transcript_file(room_name, speaker, transcription, timestamp):
     """Append a new transcription to the room's transcript file"""
     if room_name not in transcript_files:
-        create_transcript_file(room_name)
+        state.create_transcript_file(room_name)
     
     filepath = transcript_files[room_name]
     
@@ -85,69 +103,320 @@ def append_to_transcript_file(room_name, speaker, transcription, timestamp):
         with open(filepath, 'a', encoding='utf-8') as f:
             time_str = datetime.fromtimestamp(timestamp / 1000).strftime('%H:%M:%S') if timestamp else datetime.now().strftime('%H:%M:%S')
             f.write(f"[{time_str}] {speaker}: {transcription}\n")
-        print(f"Appended transcription to {filepath}")
+        logger.debug("Appended transcription to %s", filepath)
     except Exception as e:
-        print(f"Error writing to transcript file {filepath}: {e}")
+        logger.error("Error writing to transcript file %s: %s", filepath, e)
 
-def transcribe_audio(audio_file_path, speaker_name):
+def run_blocking(func, *args):
     """
-    Transcribe audio from file path.
+    Call func(*args) on a real OS thread when Socket.IO runs on green threads.
+
+    The server does not monkey-patch, so under eventlet (the default async mode when it is
+    installed) or gevent a blocking call - an AssemblyAI request, an ffmpeg subprocess, a
+    Cerebras or GitHub request - would stall the hub: AUDIO_WORKERS would process one chunk
+    at a time and no socket traffic would be served meanwhile. In threading mode the caller
+    already is an OS thread.
+    """
+    if socketio.async_mode == 'eventlet':
+        from eventlet import tpool
+        return tpool.execute(func, *args)
+    if socketio.async_mode == 'gevent':
+        import gevent
+        return gevent.get_hub().threadpool.apply(func, args)
+    return func(*args)
+
+def _run_transcriber(audio_file_path):
+    """
+    Run AssemblyAI on an audio file and return the transcript object.
     The file will be deleted after processing.
     """
     try:
+       # The AssemblyAI SDK is configured on first use (requires ASSEMBLYAI_API_KEY)
+       aai = services.get('assemblyai')
        config = aai.TranscriptionConfig(speech_model=aai.SpeechModel.universal)
-       transcript = aai.Transcriber(config=config).transcribe(audio_file_path)
+       transcript = run_blocking(aai.Transcriber(config=config).transcribe, audio_file_path)
        if transcript.status == "error":
            raise RuntimeError(f"Transcription failed: {transcript.error}")
-       return transcript.text
+       return transcript
     finally:
         # Always delete the file after processing
         if os.path.exists(audio_file_path):
             os.remove(audio_file_path)
-            print(f"Deleted temporary audio file: {audio_file_path}")
+            logger.debug("Deleted temporary audio file: %s", audio_file_path)
+
+def transcribe_audio(audio_file_path, speaker_name):
+    """
+    Transcribe audio from file path.
+    The file will be deleted after processing.
+    """
+    return _run_transcriber(audio_file_path).text
+
+def write_temp_audio(user_id, timestamp, audio_bytes, audio_format):
+    """Save audio bytes to a temporary file for the transcriber and return its path"""
+    temp_filename = f"audio_{user_id}_{timestamp}_{uuid.uuid4().hex[:8]}.{audio_format}"
+    temp_file_path = os.path.join(tempfile.gettempdir(), temp_filename)
+    with open(temp_file_path, 'wb') as f:
+        f.write(audio_bytes)
+    return temp_file_path
+
+def publish_transcription(room, speaker_name, transcription_text, timestamp):
+    """Store a transcription on the room's VideoCall and broadcast it to the room"""
+    transcription_entry = state.add_transcription(room, speaker_name, transcription_text, timestamp)
+    
+    # Emit transcription to all users in the room
+    socketio.emit('new-transcription', transcription_entry, room=room)
+    
+    log_event(logger, logging.INFO, 'audio-chunk', 'Transcribed audio from %s in room %s: "%s"',
+              speaker_name, room, transcription_text, room=room)
+
+def run_transcription_job(job):
+    """Transcribe a coalesced job and publish one entry per original chunk timestamp"""
+    temp_file_path = write_temp_audio(job.user_id, job.spans[0].timestamp, job.to_wav_bytes(), 'wav')
+    try:
+        started = time.perf_counter()
+        transcript = _run_transcriber(temp_file_path)
+        coalescer.record_latency(time.perf_counter() - started)
+    except Exception as e:
+        logger.exception('Error transcribing %d merged chunks from %s in room %s: %s',
+                         len(job.spans), job.speaker, job.room, e)
+        return
+    
+    words = getattr(transcript, 'words', None) or []
+    if words:
+        entries = job.split_words(words)
+    else:
+        entries = [(job.spans[0].timestamp, transcript.text)]
+    for timestamp, text in entries:
+        publish_transcription(job.room, job.speaker, text, timestamp)
+
+def process_audio_chunk(user_id, room, speaker_name, audio_data, timestamp, audio_format):
+    """Decode, VAD-filter and transcribe (or buffer for coalescing) one audio chunk"""
+    try:
+        # Decode base64 audio data
+        audio_bytes = base64.b64decode(audio_data)
+        
+        # Drop silent chunks and trim leading/trailing silence before paying for transcription
+        vad_result = run_blocking(vad.filter_chunk, audio_bytes)
+        if vad_result.skip:
+            log_event(logger, logging.DEBUG, 'audio-chunk', "Skipped silent audio chunk from %s", speaker_name,
+                      room=room, speech_ms=vad_result.speech_ms, total_ms=vad_result.total_ms)
+            # A silent chunk is a pause: transcribe what the speaker said before it
+            job = coalescer.flush(user_id, "pause")
+            if job:
+                run_transcription_job(job)
+            return
+        
+        # Decoded speech is merged with the speaker's neighbouring chunks into fewer, larger jobs
+        if COALESCE_ENABLED and vad_result.pcm is not None:
+            for job in coalescer.add(room, user_id, speaker_name, vad_result.pcm, timestamp):
+                run_transcription_job(job)
+            return
+        
+        # Chunks that could not be decoded cannot be merged; keep ordering by flushing first
+        job = coalescer.flush(user_id, "pause")
+        if job:
+            run_transcription_job(job)
+        audio_format = vad_result.audio_format or audio_format
+        temp_file_path = write_temp_audio(user_id, timestamp, vad_result.audio_bytes, audio_format)
+        log_event(logger, logging.DEBUG, 'audio-chunk', "Saved audio chunk to: %s", temp_file_path,
+                  room=room, bytes=len(vad_result.audio_bytes))
+        
+        # Transcribe audio (file will be deleted inside this function)
+        transcription_text = transcribe_audio(temp_file_path, speaker_name)
+        publish_transcription(room, speaker_name, transcription_text, timestamp)
+        
+    except Exception as e:
+        logger.exception('Error processing audio chunk from %s in room %s: %s', user_id, room, e)
+        # Clean up file if there was an error and file still exists
+        if 'temp_file_path' in locals() and os.path.exists(temp_file_path):
+            os.remove(temp_file_path)
+            logger.debug("Cleaned up file after error: %s", temp_file_path)
+
+def process_queued_chunk(item):
+    if isinstance(item, QueuedFlush):
+        job = item.job or coalescer.flush(item.user_id, item.reason)
+        if job:
+            run_transcription_job(job)
+        return
+    process_audio_chunk(item.user_id, item.room, item.speaker, item.audio_data, item.timestamp, item.audio_format)
+
+def flush_speaker(user_id, room, reason="leave"):
+    """Queue the transcription of everything still queued or buffered for a speaker; never blocks"""
+    audio_queue.offer_flush(user_id, room, reason)
+    ensure_audio_workers()
+
+def extract_tasks_when_idle(room_name):
+    """Background task that runs task extraction once the room's queued audio has been transcribed"""
+    deadline = time.monotonic() + ROOM_DRAIN_TIMEOUT
+    while not audio_queue.room_idle(room_name) and time.monotonic() < deadline:
+        socketio.sleep(0.1)
+    run_blocking(create_and_save_tasks, room_name)
+
+def audio_worker():
+    """Background task that pulls queued chunks and runs them through the audio pipeline"""
+    while True:
+        item = audio_queue.take()
+        if item is None:
+            socketio.sleep(0.05)
+            continue
+        try:
+            process_queued_chunk(item)
+        finally:
+            audio_queue.done(item.user_id)
+
+def coalesce_flusher():
+    """Background task that queues speaker buffers whose latency deadline has passed"""
+    while True:
+        socketio.sleep(0.5)
+        for job in coalescer.expired():
+            audio_queue.offer_flush(job.user_id, job.room, "deadline", job)
+
+def ensure_audio_workers():
+    global audio_workers_started
+    with audio_workers_lock:
+        if not audio_workers_started:
+            for _ in range(AUDIO_WORKERS):
+                socketio.start_background_task(audio_worker)
+            socketio.start_background_task(coalesce_flusher)
+            audio_workers_started = True
+
+def run_progress_sweep(repo, branches):
+    try:
+        run_blocking(progress_tracker.sweep, os.getenv('GITHUB_TOKEN'), repo, branches)
+    except Exception as e:
+        logger.exception("Progress sweep for %s %s failed: %s", repo, branches, e)
+
+def webhook_dispatcher():
+    """Background task that runs a progress sweep for each branch whose pushes have settled"""
+    while True:
+        socketio.sleep(0.5)
+        for repo, branches in push_debouncer.due():
+            socketio.start_background_task(run_progress_sweep, repo, branches)
+
+def ensure_webhook_worker():
+    global webhook_worker_started
+    with webhook_worker_lock:
+        if not webhook_worker_started:
+            socketio.start_background_task(webhook_dispatcher)
+            webhook_worker_started = True
+
+def schedule_sweep(repo, branches):
+    ensure_webhook_worker()
+    return push_debouncer.push(repo, branches)
+
+def json_response(data, status=200):
+    """Serialize data with the shared encoder, pretty-printed if ?pretty=1 is passed"""
+    pretty = request.args.get('pretty') == '1'
+    return Response(json_utils.dumps(data, pretty=pretty), status=status, mimetype='application/json')
 
 @app.route('/transcriptions/<room_name>')
 def get_transcriptions(room_name):
     """Get all transcriptions for a specific room from VideoCall object"""
-    if room_name in video_calls:
-        # Get transcriptions from VideoCall object
-        room_transcriptions = video_calls[room_name].get_transcript()
-        return json.dumps(room_transcriptions, indent=2)
-    else:
-        # Fallback to legacy storage for backward compatibility
-        room_transcriptions = transcriptions.get(room_name, [])
-        return json.dumps(room_transcriptions, indent=2)
+    room_transcriptions = state.transcript(room_name)
+    if len(room_transcriptions) > STREAM_MIN_ITEMS:
+        return Response(json_utils.buffered(json_utils.stream_array(room_transcriptions)), mimetype='application/json')
+    return json_response(room_transcriptions)
 
 @app.route('/videocall/<room_name>')
+@limit_route('videocall')
 def get_video_call_info(room_name):
-    """Get complete VideoCall information for a specific room"""
-    if room_name in video_calls:
-        video_call_info = video_calls[room_name].to_dict()
-        return json.dumps(video_call_info, indent=2)
-    else:
-        return json.dumps({"error": "Room not found"}, indent=2), 404
+    """
+    Get VideoCall information for a specific room.
+    
+    Query parameters:
+        fields: Comma-separated keys to include, e.g. ?fields=attendees_count,created_at
+        summary: 1 to return only counts and metadata
+    """
+    if room_name not in video_calls:
+        return json_response({"error": "Room not found"}, 404)
+    
+    fields = json_utils.parse_fields(request.args.get('fields'))
+    video_call = video_calls[room_name]
+    video_call_info = server_common.video_call_view(video_call, fields, request.args.get('summary') == '1')
+    if "transcript" in video_call_info and len(video_call.transcript) > STREAM_MIN_ITEMS:
+        return Response(json_utils.buffered(json_utils.stream_object(video_call_info.items(), stream_lists=True)),
+                        mimetype='application/json')
+    return json_response(video_call_info)
 
 @app.route('/videocalls')
+@limit_route('videocalls')
 def get_all_video_calls():
-    """Get information about all active video calls"""
-    all_calls = {}
-    for room_name, video_call in video_calls.items():
-        all_calls[room_name] = video_call.to_dict()
-    return json.dumps(all_calls, indent=2)
+    """
+    Get information about all active video calls as {room_name: info}.
+    
+    Query parameters:
+        fields: Comma-separated keys to include for each call
+        summary: 1 to return only counts and metadata for each call
+        limit, offset: Page through calls ordered by room name. The total number of calls
+            is returned in X-Total-Count and the next offset, if any, in X-Next-Offset.
+    
+    The body is streamed call by call, so memory does not scale with transcript sizes.
+    """
+    fields = json_utils.parse_fields(request.args.get('fields'))
+    summary = request.args.get('summary') == '1'
+    try:
+        offset, limit = server_common.parse_page(request.args)
+    except ValueError as e:
+        return json_response({"error": str(e)}, 400)
+    
+    items, headers = server_common.video_calls_page(video_calls, fields, summary, offset, limit)
+    if request.args.get('pretty') == '1':
+        return Response(json_utils.dumps(dict(items), pretty=True), mimetype='application/json', headers=headers)
+    stream = json_utils.buffered(json_utils.stream_object(items, stream_lists=True))
+    return Response(stream, mimetype='application/json', headers=headers)
+
+@app.route('/github/webhook', methods=['POST'])
+@limit_route('github-webhook')
+def github_webhook():
+    """
+    Receive GitHub webhook deliveries (content type application/json).
+    
+    Push events are verified against GITHUB_WEBHOOK_SECRET (X-Hub-Signature-256) and
+    schedule a progress sweep for the tasks that track the pushed repository branch.
+    """
+    body, status = server_common.github_webhook_response(request.get_data(), request.headers,
+                                                         request.get_json(silent=True), schedule_sweep)
+    return jsonify(body), status
+
+@app.route('/health')
+def get_health():
+    """Health of the external services this worker has initialized so far"""
+    report = services.health()
+    healthy = all(service["ok"] is not False for service in report.values())
+    return jsonify({"ok": healthy, "services": report}), 200 if healthy else 503
+
+@app.route('/stats')
+def get_stats():
+    """Get pipeline counters for this worker"""
+    return jsonify(server_common.pipeline_stats(vad.stats, coalescer, audio_queue, limiter, push_debouncer,
+                                                candidate_batcher)), 200
+
+def asset_response(asset):
+    """Send the stored representation of an asset matching Accept-Encoding, or a 304"""
+    status, headers, body = asset.respond(request.headers.get('Accept-Encoding', ''),
+                                          request.headers.get('If-None-Match', ''))
+    return Response(body, status=status, headers=headers)
 
 @app.route('/')
 def index():
-    # Serve the HTML file directly from the server
-    try:
-        with open('index.html', 'r') as f:
-            return f.read()
-    except FileNotFoundError:
+    # Serve the client page from memory
+    asset = assets.get('index.html')
+    if asset is None:
         return """
         <h1>File not found</h1>
         <p>Please make sure 'index.html' is in the same directory as the server script.</p>
         """
+    return asset_response(asset)
+
+@app.route('/static/<path:name>')
+def static_asset(name):
+    asset = assets.get('static/' + name)
+    if asset is None:
+        return jsonify({"error": "Not found"}), 404
+    return asset_response(asset)
 
 @app.route('/create-room', methods=['POST'])
+@limit_route('create-room')
 def api_create_room():
     data = request.json
     room_name = data.get('room_name')
@@ -160,65 +429,41 @@ def api_create_room():
     if not room_code:
         return jsonify({"error": "Could not create room"}), 500
 
-    return jsonify({
-        "status": "Room created",
-        "room_code": room_code,
-        "room_name": room_name,
-        "owner": user_name,
-        "members": [user_name]  # Host included in members
-    }), 201
+    return jsonify(server_common.created_room_view(room_code, room_name, user_name)), 201
 
 
 @app.route('/join-room', methods=['POST'])
+@limit_route('join-room-http')
 def api_join_room():
-    print("=== JOIN ROOM REQUEST ===")
     data = request.json
-    print(f"Request data: {data}")
+    logger.debug("Join room request: %s", data)
 
     room_code = data.get('room_code')
     user_name = data.get('user_name')
 
-    print(f"Room code: {room_code}, User name: {user_name}")
-
     if not room_code or not user_name:
         return jsonify({"error": "room_code and user_name required"}), 400
 
     success, message = db_join_room(room_code, user_name)
-    print(f"Join result: success={success}, message={message}")
+    logger.info("Join room %s by %s: success=%s message=%s", room_code, user_name, success, message)
 
-    if success:
-        room = get_room(room_code)
-        if room:
-            member_list = [m["username"] for m in room["members"]]
-            response_data = {
-                "status": message,
-                "room_code": room_code,
-                "room_name": room["room_name"],
-                "owner": room["owner"],
-                "members": member_list
-            }
-            print(f"Success response: {response_data}")
-            return jsonify(response_data), 200
-        else:
-            return jsonify({"error": "Room not found after join"}), 500
-    else:
-        print(f"Join failed: {message}")
+    if not success:
         return jsonify({"error": message}), 400
+    room = get_room(room_code)
+    if not room:
+        return jsonify({"error": "Room not found after join"}), 500
+    return jsonify(server_common.joined_room_view(room, message)), 200
 
 
 @app.route('/create-task', methods=['POST'])
+@limit_route('create-task')
 def api_create_task():
-    data = request.json
-    room_code = data.get('room_code')
-    creator = data.get('creator')
-    assigned_to = data.get('assigned_to')
-    title = data.get('title')
-    description = data.get('description', "")
-
-    if not all([room_code, creator, assigned_to, title]):
-        return jsonify({"error": "room_code, creator, assigned_to, and title required"}), 400
+    try:
+        task_args = server_common.parse_create_task(request.json)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
 
-    success, result = add_task_to_user_in_room(room_code, creator, assigned_to, title, description)
+    success, result = add_task_to_user_in_room(*task_args)
     if success:
         return jsonify({"status": "Task created", "task": result}), 201
     else:
@@ -227,10 +472,35 @@ def api_create_task():
 
 @app.route('/tasks/<room_code>/<username>', methods=['GET'])
 def api_get_tasks(room_code, username):
-    tasks = get_tasks_for_user_in_room(room_code, username)
-    if tasks is None:
+    """
+    Get the tasks assigned to a user in one room, oldest first.
+    
+    Query parameters:
+        created_by, status: Only tasks matching these values
+        due_before, due_after: ISO 8601 bounds on the due date
+        limit, cursor: Page size and the next_cursor returned by the previous page; without
+            either, every task is returned and the response has no next_cursor
+    """
+    try:
+        filters = task_filters_from_args(request.args)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    result = get_tasks_for_user_in_room(room_code, username, **filters)
+    if result is None:
         return jsonify({"error": "Room or user not found"}), 404
-    return jsonify({"tasks": tasks}), 200
+    tasks, next_cursor = result
+    return jsonify(server_common.tasks_view(tasks, next_cursor, filters)), 200
+
+
+@app.route('/user/<username>/tasks', methods=['GET'])
+def api_get_user_tasks(username):
+    """Get the tasks assigned to a user across all rooms; accepts the same parameters as /tasks"""
+    try:
+        filters = task_filters_from_args(request.args)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    tasks, next_cursor = find_tasks(username, **filters)
+    return jsonify(server_common.tasks_view(tasks, next_cursor, filters)), 200
 
 
 @app.route('/room/<room_code>', methods=['GET'])
@@ -238,61 +508,50 @@ def api_get_room(room_code):
     room = get_room(room_code)
     if not room:
         return jsonify({"error": "Room not found"}), 404
-    if "_id" in room:
-        room["_id"] = str(room["_id"])
-
-    # Safe transformation with error handling
-    members_dict = {}
-    for member in room.get("members", []):
-        if isinstance(member, dict) and "username" in member:
-            members_dict[member["username"]] = member.get("tasks", [])
-        elif isinstance(member, str):
-            # Handle legacy data where members might be just strings
-            members_dict[member] = []
-
-    room["members"] = members_dict
-    return jsonify(room), 200
+    return jsonify(server_common.room_view(room)), 200
 
 
 # NEW ENDPOINT: Get all rooms for a user
 @app.route('/user/<username>/rooms', methods=['GET'])
 def api_get_user_rooms(username):
-    """Get all rooms that a user is part of (either as owner or member)"""
+    """
+    Get all rooms that a user is part of (either as owner or member), newest first.
+    
+    Query parameters:
+        limit, offset: Page through the rooms; X-Next-Offset is set when there are more
+    """
     try:
-        rooms = get_user_rooms(username)
-
-        # Format the response
-        formatted_rooms = []
-        for room in rooms:
-            if "_id" in room:
-                room["_id"] = str(room["_id"])
-
-            # Get member count
-            member_count = len(room.get("members", []))
-
-            formatted_room = {
-                "id": room["room_code"],
-                "name": room["room_name"],
-                "owner": room["owner"],
-                "member_count": member_count,
-                "created_at": room.get("created_at")
-            }
-            formatted_rooms.append(formatted_room)
-
-        return jsonify({"rooms": formatted_rooms}), 200
+        offset, limit = server_common.parse_page(request.args)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    
+    try:
+        # One extra row tells us whether there is a next page without a count query
+        rooms = get_user_room_summaries(username, limit + 1 if limit else None, offset)
+        has_more = bool(limit) and len(rooms) > limit
+        formatted_rooms = [format_room_summary(room) for room in rooms[:limit]]
     except Exception as e:
-        print(f"Error getting user rooms: {e}")
+        logger.exception("Error getting user rooms for %s: %s", username, e)
         return jsonify({"error": "Failed to get user rooms"}), 500
+    
+    response = jsonify({"rooms": formatted_rooms})
+    if has_more:
+        response.headers["X-Next-Offset"] = str(offset + limit)
+    return response, 200
+
 
+# Registered once with the profiling wrapper, which only checks a flag while profiling is off
+audio_chunk_profile = ProfileToggle('handle_audio_chunk')
 
 @socketio.on('audio-chunk')
+@audio_chunk_profile.wrap
+@limit_event('audio-chunk')
 def handle_audio_chunk(data):
     user_id = request.sid
     
     if user_id not in user_rooms:
-        print(f'Received audio chunk from user not in room: {user_id}')
-        print(f'Current user_rooms: {user_rooms}')
-        print(f'Current rooms: {dict(rooms)}')
+        log_event(logger, logging.WARNING, 'audio-chunk', "Received audio chunk from user not in room: %s", user_id,
+                  connected_users=len(user_rooms), active_rooms=len(rooms))
         return
     
     room = user_rooms[user_id]
@@ -301,227 +560,169 @@ def handle_audio_chunk(data):
     timestamp = data.get('timestamp', 0)
     audio_format = data.get('format', 'wav')  # Default to wav if not specified
     
-    try:
-        # Decode base64 audio data
-        audio_bytes = base64.b64decode(audio_data)
-        
-        # Create temporary file
-        temp_dir = tempfile.gettempdir()
-        temp_filename = f"audio_{user_id}_{timestamp}.{audio_format}"
-        temp_file_path = os.path.join(temp_dir, temp_filename)
-        
-        # Save audio data to temporary file
-        with open(temp_file_path, 'wb') as f:
-            f.write(audio_bytes)
-        
-        print(f"Saved audio chunk to: {temp_file_path}")
-        
-        # Transcribe audio (file will be deleted inside this function)
-        transcription_text = transcribe_audio(temp_file_path, speaker_name)
-        
-        # Store transcription in VideoCall object
-        if room in video_calls:
-            video_calls[room].add_transcript_entry(speaker_name, transcription_text, timestamp)
-            print(f'Added transcription to VideoCall object for room {room}')
-        
-        # Store transcription in legacy format for backward compatibility
-        transcription_entry = {
-            "speaker": speaker_name,
-            "transcription": transcription_text,
-            "timestamp": timestamp
-        }
-        
-        transcriptions[room].append(transcription_entry)
-        
-        # Save to transcript file (backward compatibility)        
-        # Emit transcription to all users in the room
-        emit('new-transcription', transcription_entry, room=room)
-        
-        print(f'Transcribed audio from {speaker_name} in room {room}: "{transcription_text}"')
-        
-    except Exception as e:
-        print(f'Error processing audio chunk: {e}')
-        # Clean up file if there was an error and file still exists
-        if 'temp_file_path' in locals() and os.path.exists(temp_file_path):
-            os.remove(temp_file_path)
-            print(f"Cleaned up file after error: {temp_file_path}")
+    # Only queue the still-encoded payload here; decoding and transcription happen in the workers
+    ensure_audio_workers()
+    outcome = audio_queue.offer(user_id, room, speaker_name, audio_data, timestamp, audio_format)
+    if outcome == "rejected":
+        emit('audio-backpressure', {
+            "retryAfterMs": AUDIO_RETRY_AFTER_MS,
+            "queueDepth": audio_queue.room_depth(room)
+        })
+    if outcome != "queued":
+        log_event(logger, logging.WARNING, 'audio-chunk', "Audio queue full for %s in room %s: %s",
+                  speaker_name, room, outcome, room=room, depth=audio_queue.depth)
 
 @socketio.on('connect')
 def handle_connect():
-    user_id = str(uuid.uuid4())
-    print(f'User {user_id} connected from {request.remote_addr}')
+    logger.info('User %s connected from %s', request.sid, request.remote_addr)
 
 @socketio.on('disconnect')
 def handle_disconnect():
     user_id = request.sid
+    limiter.forget(user_id)
+    candidate_batcher.forget(user_id)
     if user_id in user_rooms:
         room = user_rooms[user_id]
+        flush_speaker(user_id, room)
         socket_leave_room(room)
-        
-        # Remove user from room
-        if user_id in rooms[room]:
-            del rooms[room][user_id]
-        
-        # Remove from VideoCall object if it exists
-        if room in video_calls:
-            video_calls[room].remove_attendee(user_id)
-        
-        del user_rooms[user_id]
+        user_list = state.leave(user_id, room)
         
         # Notify other users in the room
         emit('user-left', user_id, room=room)
-        
-        # Send updated user list
-        user_list = [{"userId": uid, "name": data["name"]} for uid, data in rooms[room].items()]
         emit('room-users', user_list, room=room)
         
-        print(f'User {user_id} disconnected from room {room}')
+        logger.info('User %s disconnected from room %s', user_id, room)
 
         if(len(user_list) == 0):
-            print(f"No users left in room {room}")
-            create_and_save_tasks(room)
+            logger.info("No users left in room %s", room)
+            socketio.start_background_task(extract_tasks_when_idle, room)
         
             
 
 @socketio.on('join-room')
+@limit_event('join-room')
 def handle_join_room(data):
     user_id = request.sid
     
-    # Extract room and name from data
-    if isinstance(data, dict):
-        room_name = data.get('room', 'default')
-        user_name = data.get('name', 'Anonymous')
-    else:
-        # Backward compatibility for old format
-        room_name = data
-        user_name = 'Anonymous'
+    room_name, user_name, _ = server_common.parse_join_event(data)
     
     # Leave previous room if any
     if user_id in user_rooms:
         old_room = user_rooms[user_id]
+        flush_speaker(user_id, old_room)
         socket_leave_room(old_room)
-        if user_id in rooms[old_room]:
-            del rooms[old_room][user_id]
-        
-        # Remove from VideoCall object if it exists
-        if old_room in video_calls:
-            video_calls[old_room].remove_attendee(user_id)
+        user_list = state.leave(user_id, old_room)
         
         # Notify old room
         emit('user-left', user_id, room=old_room)
-        user_list = [{"userId": uid, "name": data["name"]} for uid, data in rooms[old_room].items()]
         emit('room-users', user_list, room=old_room)
     
+    # Selective forwarding needs the asyncio server (async_app.py); this server always relays a mesh
+    emit('room-mode', {"mode": "mesh"})
+    
     # Join new room
     socket_join_room(room_name)
-    rooms[room_name][user_id] = {"name": user_name, "socketId": user_id}
-    user_rooms[user_id] = room_name
-    
-    # Create VideoCall object for new room if it doesn't exist
-    if room_name not in video_calls:
-        video_calls[room_name] = VideoCall(room_name)
-        print(f"Created new VideoCall object for room: {room_name}")
-    
-    # Add attendee to VideoCall object
-    video_calls[room_name].add_attendee(user_id, user_name, user_id)
-    
-    # Create transcript file for new room if it doesn't exist (backward compatibility)
-    if room_name not in transcript_files:
-        create_transcript_file(room_name)
+    state.join(user_id, room_name, user_name)
     
     # Notify existing users about new user
     emit('user-joined', {"userId": user_id, "name": user_name}, room=room_name, include_self=False)
     
     # Send current users list to everyone in room
-    user_list = [{"userId": uid, "name": user_data["name"]} for uid, user_data in rooms[room_name].items()]
-    emit('room-users', user_list, room=room_name)
+    emit('room-users', state.user_list(room_name), room=room_name)
     
-    print(f'User {user_id} ({user_name}) joined room {room_name}')
-    print(f'Room {room_name} now has {len(rooms[room_name])} users')
-    print(f'VideoCall object attendees: {video_calls[room_name].get_attendees_count()}')
-    print(f'Updated user_rooms: {user_rooms}')
-    print(f'Updated rooms[{room_name}]: {rooms[room_name]}')
+    log_event(logger, logging.INFO, 'join-room', 'User %s (%s) joined room %s', user_id, user_name, room_name,
+              room_users=len(rooms[room_name]), attendees=video_calls[room_name].get_attendees_count())
+    # Full state dumps are O(total users); only format them when debugging
+    logger.debug('Room %s members: %s', room_name, Lazy(lambda: rooms[room_name]))
     
 
 @socketio.on('update-name')
+@limit_event('update-name')
 def handle_update_name(new_name):
     user_id = request.sid
     
-    if user_id in user_rooms:
-        room = user_rooms[user_id]
-        if user_id in rooms[room]:
-            # Update the user's name
-            rooms[room][user_id]["name"] = new_name or 'Anonymous'
-            
-            # Update name in VideoCall object if it exists
-            if room in video_calls:
-                video_calls[room].update_attendee_name(user_id, new_name or 'Anonymous')
-            
-            # Notify other users about the name change
-            emit('user-name-updated', {"userId": user_id, "name": new_name}, room=room, include_self=False)
-            
-            # Send updated user list
-            user_list = [{"userId": uid, "name": user_data["name"]} for uid, user_data in rooms[room].items()]
-            emit('room-users', user_list, room=room)
-            
-            print(f'User {user_id} updated name to: {new_name}')
+    room = state.rename(user_id, new_name)
+    if room is not None:
+        # Notify other users about the name change
+        emit('user-name-updated', {"userId": user_id, "name": new_name}, room=room, include_self=False)
+        
+        # Send updated user list
+        emit('room-users', state.user_list(room), room=room)
+        
+        logger.info('User %s updated name to: %s', user_id, new_name)
 
 @socketio.on('leave-room')
+@limit_event('leave-room')
 def handle_leave_room(room_name):
     user_id = request.sid
     
     if user_id in user_rooms and user_rooms[user_id] == room_name:
+        flush_speaker(user_id, room_name)
+        candidate_batcher.forget(user_id)
         socket_leave_room(room_name)
-        if user_id in rooms[room_name]:
-            del rooms[room_name][user_id]
-        
-        # Remove from VideoCall object if it exists
-        if room_name in video_calls:
-            video_calls[room_name].remove_attendee(user_id)
-        
-        del user_rooms[user_id]
+        user_list = state.leave(user_id, room_name)
         
         # Notify other users in the room
         emit('user-left', user_id, room=room_name)
-        
-        # Send updated user list
-        user_list = [{"userId": uid, "name": data["name"]} for uid, data in rooms[room_name].items()]
         emit('room-users', user_list, room=room_name)
         
-        print(f'User {user_id} left room {room_name}')
+        logger.info('User %s left room %s', user_id, room_name)
         if(len(user_list) == 0):
-            print(f"No users left in room {room_name}")
-            create_and_save_tasks(room_name)
+            logger.info("No users left in room %s", room_name)
+            socketio.start_background_task(extract_tasks_when_idle, room_name)
 
 def create_and_save_tasks(room_name):
-    if room_name not in video_calls:
-        print(f"No VideoCall object for room {room_name}, cannot create tasks.")
-        return
-    
-    video_call = video_calls[room_name]
-    transcript = video_call.get_transcript()
-    if not transcript:
-        print(f"No transcript available for room {room_name}, cannot create tasks.")
+    transcript = state.extraction_transcript(room_name)
+    if transcript is None:
         return
-    transcript_text = "\n".join([f"{entry['speaker']}: {entry['transcription']}" for entry in transcript])
     room_data = get_room(room_name)
     if not room_data:
-        print(f"No room data found for room name {room_name}, cannot create tasks.")
+        logger.warning("No room data found for room name %s, cannot create tasks.", room_name)
         return
-    attendees = [{"username": m["username"], "role": m["role"]} for m in room_data.get("members", []) if isinstance(m, dict) and "username" in m]
-    transcript_text += "\n\nTeam Members and Roles:\n"
-    for attendee in attendees:
-        transcript_text += f"- {attendee['username']}: {attendee.get('role', 'member')}\n"
+    prepared = prepare_extraction_input(transcript, room_data.get("members", []))
+    log_event(logger, logging.INFO, 'extract-tasks', "Extraction input for room %s: %d -> %d tokens",
+              room_name, prepared.tokens_before, prepared.tokens_after, room=room_name, **prepared.to_dict())
+    transcript_text = prepared.text
     gen_tasks = extract_tasks(transcript_text)
-    print("Generated tasks:", gen_tasks)
+    logger.info("Generated %d tasks for room %s", len(gen_tasks), room_name)
+    logger.debug("Generated tasks: %s", gen_tasks)
+
+
+
+def valid_target(event, target_user):
+    """Signaling may only be relayed to a connected user in the sender's room"""
+    if same_room(user_rooms, request.sid, target_user):
+        return True
+    log_event(logger, logging.WARNING, 'signaling', "Dropped %s from %s to %s: not in the same room",
+              event, request.sid, target_user)
+    return False
 
+def relay_candidates(sender, target_user):
+    candidates = candidate_batcher.flush(sender, target_user)
+    # The target may have left while the batch was collecting
+    if candidates and same_room(user_rooms, sender, target_user):
+        socketio.emit('ice-candidates', {'userId': sender, 'candidates': candidates}, to=target_user)
 
+def relay_after_window(sender, target_user):
+    socketio.sleep(ICE_BATCH_WINDOW_MS / 1000)
+    relay_candidates(sender, target_user)
+
+def queue_candidates(target_user, candidates):
+    sender = request.sid
+    outcome = candidate_batcher.add(sender, target_user, candidates)
+    if outcome == "full" or ICE_BATCH_WINDOW_MS <= 0:
+        relay_candidates(sender, target_user)
+    elif outcome == "new":
+        socketio.start_background_task(relay_after_window, sender, target_user)
 
 @socketio.on('offer')
+@limit_event('offer')
 def handle_offer(data):
     user_id = request.sid
     target_user = data['userId']
     offer = data['offer']
+    if not valid_target('offer', target_user):
+        return
     
     emit('offer', {
         'userId': user_id,
@@ -529,31 +730,155 @@ def handle_offer(data):
     }, room=target_user)
 
 @socketio.on('answer')
+@limit_event('answer')
 def handle_answer(data):
     user_id = request.sid
     target_user = data['userId']
     answer = data['answer']
+    if not valid_target('answer', target_user):
+        return
     
     emit('answer', {
         'userId': user_id,
         'answer': answer
     }, room=target_user)
 
+@socketio.on('ice-candidates')
+@limit_event('ice-candidates')
+def handle_ice_candidates(data):
+    target_user = data['userId']
+    candidates = data.get('candidates')
+    if not candidates or not isinstance(candidates, list):
+        return
+    if not valid_target('ice-candidates', target_user):
+        candidate_batcher.reject()
+        return
+    queue_candidates(target_user, candidates)
+
 @socketio.on('ice-candidate')
+@limit_event('ice-candidate')
 def handle_ice_candidate(data):
-    user_id = request.sid
+    # Single-candidate form from older clients; relayed in the same batches as 'ice-candidates'
     target_user = data['userId']
-    candidate = data['candidate']
-    
-    emit('ice-candidate', {
-        'userId': user_id,
-        'candidate': candidate
-    }, room=target_user)
+    if not valid_target('ice-candidate', target_user):
+        candidate_batcher.reject()
+        return
+    queue_candidates(target_user, [data['candidate']])
+
+def require_admin(view):
+    """Reject requests without "Authorization: Bearer <ADMIN_TOKEN>" (503 when no token is configured)"""
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        if not profiler.ADMIN_TOKEN:
+            return jsonify({"error": "Admin token not configured"}), 503
+        if not profiler.authorized(request.headers.get('Authorization', '')):
+            return jsonify({"error": "Unauthorized"}), 401
+        return view(*args, **kwargs)
+    return wrapper
+
+# Handlers call create_and_save_tasks through this module's globals
+_create_and_save_tasks = create_and_save_tasks
+
+def _profile_create_and_save_tasks(toggle):
+    globals()['create_and_save_tasks'] = toggle.wrap(_create_and_save_tasks)
+
+def _unprofile_create_and_save_tasks(toggle):
+    globals()['create_and_save_tasks'] = _create_and_save_tasks
+
+_unprofiled_views = {}  # {endpoint: view} while HTTP routes are profiled
+
+def _profile_http(toggle):
+    for endpoint, view in list(app.view_functions.items()):
+        if not endpoint.startswith('admin_'):
+            _unprofiled_views[endpoint] = view
+            app.view_functions[endpoint] = toggle.wrap(view)
+
+def _unprofile_http(toggle):
+    app.view_functions.update(_unprofiled_views)
+    _unprofiled_views.clear()
+
+# Per-handler cProfile toggles; the task and HTTP wrappers are only installed while a toggle is enabled
+profile_toggles = {
+    'handle_audio_chunk': audio_chunk_profile,
+    'create_and_save_tasks': ProfileToggle('create_and_save_tasks', _profile_create_and_save_tasks,
+                                           _unprofile_create_and_save_tasks),
+    'http': ProfileToggle('http', _profile_http, _unprofile_http),
+}
+profile_lock = threading.Lock()
+
+@app.route('/admin/profile')
+@require_admin
+def admin_profile():
+    """
+    Sample every thread and greenlet of this worker for ?seconds=N (default 10) and return
+    collapsed stacks (?format=collapsed, default) or a pstats file (?format=pstats).
+    ?interval_ms sets the sampling interval; ?greenlets=0 leaves out suspended greenlets.
+    """
+    output = request.args.get('format', 'collapsed')
+    if output not in ('collapsed', 'pstats'):
+        return jsonify({"error": "format must be collapsed or pstats"}), 400
+    try:
+        seconds = float(request.args.get('seconds', 10))
+        interval_ms = float(request.args.get('interval_ms', profiler.PROFILE_INTERVAL_MS))
+    except ValueError:
+        return jsonify({"error": "seconds and interval_ms must be numbers"}), 400
+    if not profile_lock.acquire(blocking=False):
+        return jsonify({"error": "A profile is already running"}), 409
+    try:
+        sampler = Sampler(seconds, interval_ms, include_greenlets=request.args.get('greenlets', '1') != '0').start()
+        logger.info("Sampling profile for %.1fs at %.1fms", sampler.seconds, sampler.interval * 1000)
+        # Yield to the other handlers (greenlets) while the sampler thread runs
+        while not sampler.finished:
+            socketio.sleep(0.05)
+    finally:
+        profile_lock.release()
+    headers = {"X-Profile-Samples": str(sampler.profile.samples)}
+    if output == 'pstats':
+        headers["Content-Disposition"] = 'attachment; filename="profile.pstats"'
+        return Response(sampler.profile.to_pstats(), mimetype='application/octet-stream', headers=headers)
+    return Response(sampler.profile.to_collapsed(), mimetype='text/plain', headers=headers)
+
+@app.route('/admin/profile/handlers')
+@require_admin
+def admin_profile_handlers():
+    """Which handlers are being profiled and their call counts"""
+    return jsonify({name: toggle.summary() for name, toggle in profile_toggles.items()}), 200
+
+@app.route('/admin/profile/handlers/<name>', methods=['GET', 'POST'])
+@require_admin
+def admin_profile_handler(name):
+    """
+    POST {"enabled": true|false} switches cProfile on or off for a handler (enabling resets its
+    statistics). GET returns what has been collected: pstats text (?format=text, default) or a
+    pstats file (?format=pstats).
+    """
+    toggle = profile_toggles.get(name)
+    if toggle is None:
+        return jsonify({"error": f"Unknown handler, expected one of {sorted(profile_toggles)}"}), 404
+    if request.method == 'POST':
+        enabled = (request.get_json(silent=True) or {}).get('enabled')
+        if not isinstance(enabled, bool):
+            return jsonify({"error": "enabled (boolean) required"}), 400
+        if not enabled:
+            toggle.disable()
+        elif not toggle.enable():
+            return jsonify({"error": "Another handler is already being profiled"}), 409
+        logger.info("Profiling of %s %s", name, "enabled" if enabled else "disabled")
+        return jsonify({name: toggle.summary()}), 200
+    if request.args.get('format') == 'pstats':
+        return Response(toggle.dump(), mimetype='application/octet-stream',
+                        headers={"Content-Disposition": f'attachment; filename="{name}.pstats"'})
+    return Response(toggle.report(), mimetype='text/plain')
 
 if __name__ == '__main__':
     # Get port from command line argument or default to 5001
     port = int(sys.argv[1]) if len(sys.argv) > 1 else 5001
     
+    # Connect to the services named in WARMUP_SERVICES now instead of on the first request
+    warmup_services = [name.strip() for name in os.getenv('WARMUP_SERVICES', 'mongo').split(',') if name.strip()]
+    if warmup_services:
+        print(f"Warming up services: {services.warmup(warmup_services)}")
+    
     print("Starting minimal video call server...")
     print(f"Server will run on port {port}")
     print("Open your browser and go to:")
@@ -0,0 +1,893 @@
+"""
+Asyncio server mode: the app.py HTTP routes and Socket.IO events on python-socketio's
+AsyncServer and aiohttp.
+
+MongoDB (motor), AssemblyAI (aiohttp) and Cerebras (AsyncCerebras) calls are awaited
+instead of blocking a thread, so one process can hold thousands of idle connections and
+many in-flight transcriptions. CPU-bound audio decoding/VAD runs in the default executor.
+
+Run with:
+    python async_app.py [port]
+"""
+import asyncio
+import base64
+import json
+import logging
+import os
+import sys
+import time
+from functools import wraps
+
+import socketio
+from aiohttp import web
+from dotenv import load_dotenv
+
+import async_db
+import progress_tracker
+import json_utils
+import profiler
+import server_common
+import services
+import sfu
+import vad
+from audio_coalescer import AudioCoalescer, COALESCE_ENABLED
+from audio_queue import AudioIngestQueue, QueuedFlush, AUDIO_RETRY_AFTER_MS, ROOM_DRAIN_TIMEOUT
+from db_common import format_room_summary, task_filters_from_args
+from github_webhook import PushDebouncer
+from signaling import CandidateBatcher, ICE_BATCH_WINDOW_MS, same_room
+from static_assets import AssetStore
+from logger import configure_logging, get_logger, log_event, Lazy
+from profiler import Sampler, ProfileToggle
+from rate_limit import RATE_LIMIT_ENABLED, limiter, resolve_address
+from server_common import RoomState, STREAM_MIN_ITEMS, TRANSCRIPTS_DIR
+from tasksync import extract_tasks_async
+from transcript_preprocess import prepare_extraction_input
+
+load_dotenv()
+
+# The server is an entry point: configure at import so a host that imports `create_app` logs the same way
+configure_logging()
+logger = get_logger(__name__)
+vad.warn_if_ffmpeg_missing()
+
+# Concurrent transcriptions; each one is a coroutine waiting on AssemblyAI, not a thread
+ASYNC_AUDIO_WORKERS = int(os.getenv('ASYNC_AUDIO_WORKERS', '64'))
+
+# Socket.IO / Engine.IO internals log every packet, so they are opt-in
+socketio_logging = os.getenv('SOCKETIO_LOGGING', 'false').lower() == 'true'
+
+sio = socketio.AsyncServer(async_mode='aiohttp',
+                           cors_allowed_origins="*",
+                           logger=socketio_logging,
+                           engineio_logger=socketio_logging,
+                           transports=['polling', 'websocket'],
+                           allow_upgrades=True)
+
+# Same in-memory state as app.py
+state = RoomState(TRANSCRIPTS_DIR)
+rooms = state.rooms  # {room: {userId: {"name": "John", "socketId": "abc123"}}}
+user_rooms = state.user_rooms  # {socketId: room}
+video_calls = state.video_calls  # {room: VideoCall}
+
+audio_queue = AudioIngestQueue()
+audio_ready = asyncio.Event()
+coalescer = AudioCoalescer()
+push_debouncer = PushDebouncer()
+candidate_batcher = CandidateBatcher()
+assets = AssetStore()
+# Rooms whose first participant asked for selective forwarding; the mode is fixed until the room empties
+room_modes = {}  # {room: "mesh" or "sfu"}
+sfu_rooms = {}  # {room: sfu.SfuRoom}
+# Keep references to fire-and-forget tasks so they are not garbage collected mid-flight
+background_tasks = set()
+
+
+def spawn(coro):
+    task = asyncio.get_running_loop().create_task(coro)
+    background_tasks.add(task)
+    task.add_done_callback(background_tasks.discard)
+    return task
+
+
+# --- Audio pipeline ---------------------------------------------------------
+
+async def publish_transcription(room, speaker_name, transcription_text, timestamp):
+    """Store a transcription on the room's VideoCall and broadcast it to the room"""
+    transcription_entry = state.add_transcription(room, speaker_name, transcription_text, timestamp)
+    await sio.emit('new-transcription', transcription_entry, room=room)
+    log_event(logger, logging.INFO, 'audio-chunk', 'Transcribed audio from %s in room %s: "%s"',
+              speaker_name, room, transcription_text, room=room)
+
+
+async def run_transcription_job(job):
+    """Transcribe a coalesced job and publish one entry per original chunk timestamp"""
+    try:
+        started = asyncio.get_running_loop().time()
+        transcript = await services.get('assemblyai_async').transcribe(job.to_wav_bytes())
+        coalescer.record_latency(asyncio.get_running_loop().time() - started)
+    except Exception as e:
+        logger.exception('Error transcribing %d merged chunks from %s in room %s: %s',
+                         len(job.spans), job.speaker, job.room, e)
+        return
+
+    if transcript.words:
+        entries = job.split_words(transcript.words)
+    else:
+        entries = [(job.spans[0].timestamp, transcript.text)]
+    for timestamp, text in entries:
+        await publish_transcription(job.room, job.speaker, text, timestamp)
+
+
+async def process_audio_chunk(user_id, room, speaker_name, audio_data, timestamp, audio_format):
+    """Decode, VAD-filter and transcribe (or buffer for coalescing) one audio chunk"""
+    try:
+        # ffmpeg decoding and the energy VAD are CPU-bound; keep them off the event loop
+        if audio_format == 'pcm':
+            # Already decoded by the SFU
+            vad_result = await asyncio.to_thread(vad.filter_pcm, audio_data)
+        else:
+            vad_result = await asyncio.to_thread(vad.filter_chunk, base64.b64decode(audio_data))
+        if vad_result.skip:
+            log_event(logger, logging.DEBUG, 'audio-chunk', "Skipped silent audio chunk from %s", speaker_name,
+                      room=room, speech_ms=vad_result.speech_ms, total_ms=vad_result.total_ms)
+            job = coalescer.flush(user_id, "pause")
+            if job:
+                await run_transcription_job(job)
+            return
+
+        if COALESCE_ENABLED and vad_result.pcm is not None:
+            for job in coalescer.add(room, user_id, speaker_name, vad_result.pcm, timestamp):
+                await run_transcription_job(job)
+            return
+
+        job = coalescer.flush(user_id, "pause")
+        if job:
+            await run_transcription_job(job)
+        # The REST upload takes raw bytes, so no temporary file is needed here
+        transcript = await services.get('assemblyai_async').transcribe(vad_result.audio_bytes)
+        await publish_transcription(room, speaker_name, transcript.text, timestamp)
+    except Exception as e:
+        logger.exception('Error processing audio chunk from %s in room %s: %s', user_id, room, e)
+
+
+def enqueue_sfu_audio(room, user_id, pcm, timestamp):
+    """
+    Queue audio the SFU received from a participant, like an audio-chunk event but already decoded.
+    The room comes from the SFU, since the last partial chunk arrives after user_rooms dropped the user.
+    """
+    if user_id not in rooms.get(room, {}):
+        return
+    outcome = audio_queue.offer(user_id, room, rooms[room][user_id]["name"], pcm, timestamp, 'pcm')
+    audio_ready.set()
+    if outcome != "queued":
+        log_event(logger, logging.WARNING, 'audio-chunk', "Audio queue full for %s in room %s: %s",
+                  user_id, room, outcome, room=room, depth=audio_queue.depth)
+
+
+async def process_queued_chunk(item):
+    if isinstance(item, QueuedFlush):
+        job = item.job or coalescer.flush(item.user_id, item.reason)
+        if job:
+            await run_transcription_job(job)
+        return
+    await process_audio_chunk(item.user_id, item.room, item.speaker, item.audio_data, item.timestamp,
+                              item.audio_format)
+
+
+def flush_speaker(user_id, room, reason="leave"):
+    """Queue the transcription of everything still queued or buffered for a speaker; never blocks"""
+    audio_queue.offer_flush(user_id, room, reason)
+    audio_ready.set()
+
+
+async def extract_tasks_when_idle(room_name):
+    """Run task extraction once the room's queued audio has been transcribed"""
+    deadline = time.monotonic() + ROOM_DRAIN_TIMEOUT
+    while not audio_queue.room_idle(room_name) and time.monotonic() < deadline:
+        await asyncio.sleep(0.1)
+    await create_and_save_tasks(room_name)
+
+
+async def audio_worker():
+    """Pull queued chunks and run them through the audio pipeline; sleeps until a chunk arrives"""
+    while True:
+        item = audio_queue.take()
+        if item is None:
+            audio_ready.clear()
+            await audio_ready.wait()
+            continue
+        try:
+            await process_queued_chunk(item)
+        finally:
+            audio_queue.done(item.user_id)
+            # The speaker's next chunk may have been skipped while this one was in flight
+            audio_ready.set()
+
+
+async def coalesce_flusher():
+    """Queue speaker buffers whose latency deadline has passed"""
+    while True:
+        await asyncio.sleep(0.5)
+        jobs = coalescer.expired()
+        for job in jobs:
+            audio_queue.offer_flush(job.user_id, job.room, "deadline", job)
+        if jobs:
+            audio_ready.set()
+
+
+async def webhook_dispatcher():
+    """Run a progress sweep for each branch whose pushes have settled"""
+    while True:
+        await asyncio.sleep(0.5)
+        for repo, branches in push_debouncer.due():
+            # Deliberately not ported to async_db: a sweep is dominated by blocking GitHub and LLM
+            # client calls, with a few indexed pymongo reads/writes in between, so a motor version
+            # would still need the thread and would fork progress_tracker's logic. The sweep runs
+            # off the event loop, once per settled branch, and shares the database with async_db.
+            spawn(asyncio.to_thread(progress_tracker.sweep, os.getenv('GITHUB_TOKEN'), repo, branches))
+
+
+async def create_and_save_tasks(room_name):
+    transcript = state.extraction_transcript(room_name)
+    if transcript is None:
+        return
+    room_data = await async_db.get_room(room_name)
+    if not room_data:
+        logger.warning("No room data found for room name %s, cannot create tasks.", room_name)
+        return
+    prepared = prepare_extraction_input(transcript, room_data.get("members", []))
+    log_event(logger, logging.INFO, 'extract-tasks', "Extraction input for room %s: %d -> %d tokens",
+              room_name, prepared.tokens_before, prepared.tokens_after, room=room_name, **prepared.to_dict())
+    transcript_text = prepared.text
+    gen_tasks = await extract_tasks_async(transcript_text)
+    logger.info("Generated %d tasks for room %s", len(gen_tasks), room_name)
+    logger.debug("Generated tasks: %s", gen_tasks)
+
+
+# --- Rate limiting ----------------------------------------------------------
+
+def request_address(request) -> str:
+    return resolve_address(request.headers.get('X-Forwarded-For', ''), request.remote)
+
+
+def socket_address(sid) -> str:
+    environ = sio.get_environ(sid) or {}
+    request = environ.get('aiohttp.request')
+    return request_address(request) if request is not None else 'unknown'
+
+
+def limit_event(name: str):
+    """Async counterpart of rate_limit.limit_event: per-sid and per-address token buckets"""
+    def decorator(handler):
+        if not RATE_LIMIT_ENABLED:
+            return handler
+
+        @wraps(handler)
+        async def wrapper(sid, *args):
+            if not limiter.allow_all([(name + ':addr', socket_address(sid)), (name, sid)]):
+                return None
+            return await handler(sid, *args)
+        return wrapper
+    return decorator
+
+
+def limit_route(name: str):
+    """Async counterpart of rate_limit.limit_route; rejected requests get a 429"""
+    def decorator(view):
+        if not RATE_LIMIT_ENABLED:
+            return view
+
+        @wraps(view)
+        async def wrapper(request):
+            if not limiter.allow(name, request_address(request)):
+                return json_response({"error": "Too many requests"}, 429)
+            return await view(request)
+        return wrapper
+    return decorator
+
+
+# --- HTTP routes ------------------------------------------------------------
+
+routes = web.RouteTableDef()
+
+
+def json_response(data, status=200, request=None, headers=None):
+    """Serialize data with the shared encoder, pretty-printed if ?pretty=1 is passed"""
+    pretty = request is not None and request.query.get('pretty') == '1'
+    return web.Response(text=json_utils.dumps(data, pretty=pretty), status=status,
+                        content_type='application/json', headers=headers)
+
+
+async def stream_response(request, chunks, headers=None):
+    """Write buffered JSON pieces to the client as they are produced"""
+    response = web.StreamResponse(headers=headers)
+    response.content_type = 'application/json'
+    await response.prepare(request)
+    for chunk in json_utils.buffered(chunks):
+        await response.write(chunk.encode('utf-8'))
+    await response.write_eof()
+    return response
+
+
+async def read_json(request):
+    try:
+        data = await request.json()
+    except ValueError:
+        return None
+    return data if isinstance(data, dict) else None
+
+
+@routes.get('/transcriptions/{room_name}')
+async def get_transcriptions(request):
+    room_transcriptions = state.transcript(request.match_info['room_name'])
+    if len(room_transcriptions) > STREAM_MIN_ITEMS:
+        return await stream_response(request, json_utils.stream_array(room_transcriptions))
+    return json_response(room_transcriptions, request=request)
+
+
+@routes.get('/videocall/{room_name}')
+@limit_route('videocall')
+async def get_video_call_info(request):
+    room_name = request.match_info['room_name']
+    if room_name not in video_calls:
+        return json_response({"error": "Room not found"}, 404, request)
+
+    fields = json_utils.parse_fields(request.query.get('fields'))
+    video_call = video_calls[room_name]
+    video_call_info = server_common.video_call_view(video_call, fields, request.query.get('summary') == '1')
+    if "transcript" in video_call_info and len(video_call.transcript) > STREAM_MIN_ITEMS:
+        return await stream_response(request, json_utils.stream_object(video_call_info.items(), stream_lists=True))
+    return json_response(video_call_info, request=request)
+
+
+@routes.get('/videocalls')
+@limit_route('videocalls')
+async def get_all_video_calls(request):
+    fields = json_utils.parse_fields(request.query.get('fields'))
+    summary = request.query.get('summary') == '1'
+    try:
+        offset, limit = server_common.parse_page(request.query)
+    except ValueError as e:
+        return json_response({"error": str(e)}, 400, request)
+
+    items, headers = server_common.video_calls_page(video_calls, fields, summary, offset, limit)
+    if request.query.get('pretty') == '1':
+        return json_response(dict(items), request=request, headers=headers)
+    return await stream_response(request, json_utils.stream_object(items, stream_lists=True), headers)
+
+
+@routes.post('/github/webhook')
+@limit_route('github-webhook')
+async def github_webhook(request):
+    """Verify a GitHub delivery and schedule a progress sweep for pushed branches (see app.py)"""
+    body = await request.read()
+    try:
+        payload = json.loads(body)
+    except ValueError:
+        payload = None
+    data, status = server_common.github_webhook_response(body, request.headers, payload, push_debouncer.push)
+    return json_response(data, status)
+
+
+@routes.get('/health')
+async def get_health(request):
+    """Health of the external services this worker has initialized so far"""
+    report = services.health()
+    if services.is_initialized('mongo_async'):
+        try:
+            await async_db.get_db().command('ping')
+        except Exception as e:
+            report['mongo_async'] = {"initialized": True, "ok": False, "error": str(e)}
+    healthy = all(service["ok"] is not False for service in report.values())
+    return json_response({"ok": healthy, "services": report}, 200 if healthy else 503)
+
+
+@routes.get('/stats')
+async def get_stats(request):
+    stats = server_common.pipeline_stats(vad.stats, coalescer, audio_queue, limiter, push_debouncer,
+                                         candidate_batcher)
+    stats["sfu"] = {room: sfu_room.stats() for room, sfu_room in sfu_rooms.items()}
+    stats["background_tasks"] = len(background_tasks)
+    return json_response(stats)
+
+
+@routes.get('/')
+async def index(request):
+    asset = assets.get('index.html')
+    if asset is None:
+        return web.Response(text="""
+        <h1>File not found</h1>
+        <p>Please make sure 'index.html' is in the same directory as the server script.</p>
+        """, content_type='text/html')
+    return asset_response(request, asset)
+
+
+@routes.get('/static/{name:.+}')
+async def static_asset(request):
+    asset = assets.get('static/' + request.match_info['name'])
+    if asset is None:
+        return json_response({"error": "Not found"}, 404)
+    return asset_response(request, asset)
+
+
+def asset_response(request, asset):
+    """Send the stored representation of an asset matching Accept-Encoding, or a 304"""
+    status, headers, body = asset.respond(request.headers.get('Accept-Encoding', ''),
+                                          request.headers.get('If-None-Match', ''))
+    return web.Response(body=body, status=status, headers=headers)
+
+
+@routes.post('/create-room')
+@limit_route('create-room')
+async def api_create_room(request):
+    data = await read_json(request) or {}
+    room_name = data.get('room_name')
+    user_name = data.get('user_name')
+
+    if not room_name or not user_name:
+        return json_response({"error": "room_name and user_name required"}, 400)
+
+    room_code = await async_db.create_room(user_name, room_name)
+    if not room_code:
+        return json_response({"error": "Could not create room"}, 500)
+
+    return json_response(server_common.created_room_view(room_code, room_name, user_name), 201)
+
+
+@routes.post('/join-room')
+@limit_route('join-room-http')
+async def api_join_room(request):
+    data = await read_json(request) or {}
+    logger.debug("Join room request: %s", data)
+
+    room_code = data.get('room_code')
+    user_name = data.get('user_name')
+
+    if not room_code or not user_name:
+        return json_response({"error": "room_code and user_name required"}, 400)
+
+    success, message = await async_db.join_room(room_code, user_name)
+    logger.info("Join room %s by %s: success=%s message=%s", room_code, user_name, success, message)
+
+    if not success:
+        return json_response({"error": message}, 400)
+    room = await async_db.get_room(room_code)
+    if not room:
+        return json_response({"error": "Room not found after join"}, 500)
+    return json_response(server_common.joined_room_view(room, message))
+
+
+@routes.post('/create-task')
+@limit_route('create-task')
+async def api_create_task(request):
+    try:
+        task_args = server_common.parse_create_task(await read_json(request) or {})
+    except ValueError as e:
+        return json_response({"error": str(e)}, 400)
+
+    success, result = await async_db.add_task_to_user_in_room(*task_args)
+    if success:
+        return json_response({"status": "Task created", "task": result}, 201)
+    return json_response({"error": result}, 400)
+
+
+@routes.get('/tasks/{room_code}/{username}')
+async def api_get_tasks(request):
+    try:
+        filters = task_filters_from_args(request.query)
+    except ValueError as e:
+        return json_response({"error": str(e)}, 400)
+    result = await async_db.get_tasks_for_user_in_room(request.match_info['room_code'], request.match_info['username'],
+                                                       **filters)
+    if result is None:
+        return json_response({"error": "Room or user not found"}, 404)
+    tasks, next_cursor = result
+    return json_response(server_common.tasks_view(tasks, next_cursor, filters))
+
+
+@routes.get('/user/{username}/tasks')
+async def api_get_user_tasks(request):
+    try:
+        filters = task_filters_from_args(request.query)
+    except ValueError as e:
+        return json_response({"error": str(e)}, 400)
+    tasks, next_cursor = await async_db.find_tasks(request.match_info['username'], **filters)
+    return json_response(server_common.tasks_view(tasks, next_cursor, filters))
+
+
+@routes.get('/room/{room_code}')
+async def api_get_room(request):
+    room = await async_db.get_room(request.match_info['room_code'])
+    if not room:
+        return json_response({"error": "Room not found"}, 404)
+    return json_response(server_common.room_view(room))
+
+
+@routes.get('/user/{username}/rooms')
+async def api_get_user_rooms(request):
+    """Get all rooms that a user is part of, newest first; ?limit=&offset= page through them"""
+    username = request.match_info['username']
+    try:
+        offset, limit = server_common.parse_page(request.query)
+    except ValueError as e:
+        return json_response({"error": str(e)}, 400)
+
+    try:
+        user_room_docs = await async_db.get_user_room_summaries(username, limit + 1 if limit else None, offset)
+    except Exception as e:
+        logger.exception("Error getting user rooms for %s: %s", username, e)
+        return json_response({"error": "Failed to get user rooms"}, 500)
+
+    headers = {}
+    if limit and len(user_room_docs) > limit:
+        headers["X-Next-Offset"] = str(offset + limit)
+    return json_response({"rooms": [format_room_summary(room) for room in user_room_docs[:limit]]}, headers=headers)
+
+
+# --- Admin: on-demand profiling ---------------------------------------------
+
+def require_admin(view):
+    """Reject requests without "Authorization: Bearer <ADMIN_TOKEN>" (503 when no token is configured)"""
+    @wraps(view)
+    async def wrapper(request):
+        if not profiler.ADMIN_TOKEN:
+            return json_response({"error": "Admin token not configured"}, 503)
+        if not profiler.authorized(request.headers.get('Authorization', '')):
+            return json_response({"error": "Unauthorized"}, 401)
+        return await view(request)
+    return wrapper
+
+
+# Handlers call create_and_save_tasks through this module's globals
+_create_and_save_tasks = create_and_save_tasks
+
+
+def _profile_create_and_save_tasks(toggle):
+    globals()['create_and_save_tasks'] = toggle.wrap_async(_create_and_save_tasks)
+
+
+def _unprofile_create_and_save_tasks(toggle):
+    globals()['create_and_save_tasks'] = _create_and_save_tasks
+
+
+# handle_audio_chunk is registered once with this wrapper, which only checks a flag while profiling is off
+audio_chunk_profile = ProfileToggle('handle_audio_chunk')
+
+# aiohttp freezes its router at startup, so HTTP routes can only be profiled with the sampler here
+profile_toggles = {
+    'handle_audio_chunk': audio_chunk_profile,
+    'create_and_save_tasks': ProfileToggle('create_and_save_tasks', _profile_create_and_save_tasks,
+                                           _unprofile_create_and_save_tasks),
+}
+profile_lock = asyncio.Lock()
+
+
+@routes.get('/admin/profile')
+@require_admin
+async def admin_profile(request):
+    """
+    Sample every thread (including the event loop's) for ?seconds=N (default 10) and return
+    collapsed stacks (?format=collapsed, default) or a pstats file (?format=pstats).
+    """
+    output = request.query.get('format', 'collapsed')
+    if output not in ('collapsed', 'pstats'):
+        return json_response({"error": "format must be collapsed or pstats"}, 400)
+    try:
+        seconds = float(request.query.get('seconds', 10))
+        interval_ms = float(request.query.get('interval_ms', profiler.PROFILE_INTERVAL_MS))
+    except ValueError:
+        return json_response({"error": "seconds and interval_ms must be numbers"}, 400)
+    if profile_lock.locked():
+        return json_response({"error": "A profile is already running"}, 409)
+    async with profile_lock:
+        sampler = Sampler(seconds, interval_ms, include_greenlets=False).start()
+        logger.info("Sampling profile for %.1fs at %.1fms", sampler.seconds, sampler.interval * 1000)
+        while not sampler.finished:
+            await asyncio.sleep(0.05)
+    headers = {"X-Profile-Samples": str(sampler.profile.samples)}
+    if output == 'pstats':
+        headers["Content-Disposition"] = 'attachment; filename="profile.pstats"'
+        return web.Response(body=sampler.profile.to_pstats(), content_type='application/octet-stream',
+                            headers=headers)
+    return web.Response(text=sampler.profile.to_collapsed(), headers=headers)
+
+
+@routes.get('/admin/profile/handlers')
+@require_admin
+async def admin_profile_handlers(request):
+    """Which handlers are being profiled and their call counts"""
+    return json_response({name: toggle.summary() for name, toggle in profile_toggles.items()})
+
+
+@routes.route('*', '/admin/profile/handlers/{name}')
+@require_admin
+async def admin_profile_handler(request):
+    """
+    POST {"enabled": true|false} switches cProfile on or off for a handler (enabling resets its
+    statistics). GET returns pstats text (?format=text, default) or a pstats file (?format=pstats).
+    """
+    name = request.match_info['name']
+    toggle = profile_toggles.get(name)
+    if toggle is None:
+        return json_response({"error": f"Unknown handler, expected one of {sorted(profile_toggles)}"}, 404)
+    if request.method == 'POST':
+        enabled = (await read_json(request) or {}).get('enabled')
+        if not isinstance(enabled, bool):
+            return json_response({"error": "enabled (boolean) required"}, 400)
+        if not enabled:
+            toggle.disable()
+        elif not toggle.enable():
+            return json_response({"error": "Another handler is already being profiled"}, 409)
+        logger.info("Profiling of %s %s", name, "enabled" if enabled else "disabled")
+        return json_response({name: toggle.summary()})
+    if request.query.get('format') == 'pstats':
+        return web.Response(body=toggle.dump(), content_type='application/octet-stream',
+                            headers={"Content-Disposition": f'attachment; filename="{name}.pstats"'})
+    return web.Response(text=toggle.report())
+
+
+# --- Socket.IO events -------------------------------------------------------
+
+async def remove_from_room(sid, room):
+    """Flush the user's audio, take them out of the room and notify who is left"""
+    if room in sfu_rooms:
+        # Returns once the audio reader has queued the last partial chunk, so the flush below follows it
+        await sfu_rooms[room].remove(sid)
+    flush_speaker(sid, room)
+    candidate_batcher.forget(sid)
+    sio.leave_room(sid, room)
+    user_list = state.leave(sid, room)
+    await sio.emit('user-left', sid, room=room)
+    if not user_list:
+        room_modes.pop(room, None)
+        if room in sfu_rooms:
+            await sfu_rooms.pop(room).close()
+    await sio.emit('room-users', user_list, room=room)
+    return user_list
+
+
+@sio.on('audio-chunk')
+@audio_chunk_profile.wrap_async
+@limit_event('audio-chunk')
+async def handle_audio_chunk(sid, data):
+    if sid not in user_rooms:
+        log_event(logger, logging.WARNING, 'audio-chunk', "Received audio chunk from user not in room: %s", sid,
+                  connected_users=len(user_rooms), active_rooms=len(rooms))
+        return
+
+    room = user_rooms[sid]
+    speaker_name = data.get('speaker', 'Unknown')
+    outcome = audio_queue.offer(sid, room, speaker_name, data.get('audioData', ''),
+                                data.get('timestamp', 0), data.get('format', 'wav'))
+    audio_ready.set()
+    if outcome == "rejected":
+        await sio.emit('audio-backpressure', {
+            "retryAfterMs": AUDIO_RETRY_AFTER_MS,
+            "queueDepth": audio_queue.room_depth(room)
+        }, to=sid)
+    if outcome != "queued":
+        log_event(logger, logging.WARNING, 'audio-chunk', "Audio queue full for %s in room %s: %s",
+                  speaker_name, room, outcome, room=room, depth=audio_queue.depth)
+
+
+@sio.on('connect')
+async def handle_connect(sid, environ, auth=None):
+    logger.info('User %s connected from %s', sid, socket_address(sid))
+
+
+@sio.on('disconnect')
+async def handle_disconnect(sid):
+    limiter.forget(sid)
+    room = user_rooms.pop(sid, None)
+    if room is None:
+        return
+    user_list = await remove_from_room(sid, room)
+    logger.info('User %s disconnected from room %s', sid, room)
+    if len(user_list) == 0:
+        logger.info("No users left in room %s", room)
+        spawn(extract_tasks_when_idle(room))
+
+
+@sio.on('join-room')
+@limit_event('join-room')
+async def handle_join_room(sid, data):
+    room_name, user_name, wants_sfu = server_common.parse_join_event(data)
+
+    old_room = user_rooms.pop(sid, None)
+    if old_room is not None:
+        await remove_from_room(sid, old_room)
+
+    if room_name not in room_modes:
+        room_modes[room_name] = 'sfu' if wants_sfu and sfu.SFU_ENABLED and sfu.SFU_AVAILABLE else 'mesh'
+        if wants_sfu and room_modes[room_name] == 'mesh':
+            logger.warning("SFU mode requested for room %s but it is %s", room_name,
+                           "disabled" if not sfu.SFU_ENABLED else "unavailable (aiortc is not installed)")
+    # Sent before user-joined so the client knows whether to wait for mesh offers or publish to the server
+    await sio.emit('room-mode', {"mode": room_modes[room_name]}, to=sid)
+
+    sio.enter_room(sid, room_name)
+    state.join(sid, room_name, user_name)
+
+    await sio.emit('user-joined', {"userId": sid, "name": user_name}, room=room_name, skip_sid=sid)
+    await sio.emit('room-users', state.user_list(room_name), room=room_name)
+
+    log_event(logger, logging.INFO, 'join-room', 'User %s (%s) joined room %s', sid, user_name, room_name,
+              room_users=len(rooms[room_name]), attendees=video_calls[room_name].get_attendees_count())
+    logger.debug('Room %s members: %s', room_name, Lazy(lambda: rooms[room_name]))
+
+
+@sio.on('update-name')
+@limit_event('update-name')
+async def handle_update_name(sid, new_name):
+    room = state.rename(sid, new_name)
+    if room is None:
+        return
+    await sio.emit('user-name-updated', {"userId": sid, "name": new_name}, room=room, skip_sid=sid)
+    await sio.emit('room-users', state.user_list(room), room=room)
+    logger.info('User %s updated name to: %s', sid, new_name)
+
+
+@sio.on('leave-room')
+@limit_event('leave-room')
+async def handle_leave_room(sid, room_name):
+    if user_rooms.get(sid) != room_name:
+        return
+    del user_rooms[sid]
+    user_list = await remove_from_room(sid, room_name)
+    logger.info('User %s left room %s', sid, room_name)
+    if len(user_list) == 0:
+        logger.info("No users left in room %s", room_name)
+        spawn(extract_tasks_when_idle(room_name))
+
+
+@sio.on('sfu-offer')
+@limit_event('sfu-offer')
+async def handle_sfu_offer(sid, data):
+    room = user_rooms.get(sid)
+    if room is None or room_modes.get(room) != 'sfu':
+        return
+    if room not in sfu_rooms:
+        sfu_rooms[room] = sfu.SfuRoom(room, lambda event, payload, to: sio.emit(event, payload, to=to),
+                                      enqueue_sfu_audio)
+    try:
+        answer = await sfu_rooms[room].publish(sid, data['offer'])
+    except Exception as e:
+        logger.exception("SFU publish from %s in room %s failed: %s", sid, room, e)
+        return
+    await sio.emit('sfu-answer', answer, to=sid)
+
+
+@sio.on('sfu-answer')
+@limit_event('sfu-answer')
+async def handle_sfu_answer(sid, data):
+    room = user_rooms.get(sid)
+    if room in sfu_rooms:
+        sfu_rooms[room].answer(sid, data['answer'])
+
+
+def valid_target(event, sid, target_user):
+    """Signaling may only be relayed to a connected user in the sender's room"""
+    if same_room(user_rooms, sid, target_user):
+        return True
+    log_event(logger, logging.WARNING, 'signaling', "Dropped %s from %s to %s: not in the same room",
+              event, sid, target_user)
+    return False
+
+
+async def relay_candidates(sender, target_user):
+    candidates = candidate_batcher.flush(sender, target_user)
+    # The target may have left while the batch was collecting
+    if candidates and same_room(user_rooms, sender, target_user):
+        await sio.emit('ice-candidates', {'userId': sender, 'candidates': candidates}, to=target_user)
+
+
+async def queue_candidates(sid, target_user, candidates):
+    outcome = candidate_batcher.add(sid, target_user, candidates)
+    if outcome == "full" or ICE_BATCH_WINDOW_MS <= 0:
+        await relay_candidates(sid, target_user)
+    elif outcome == "new":
+        asyncio.get_running_loop().call_later(ICE_BATCH_WINDOW_MS / 1000,
+                                              lambda: spawn(relay_candidates(sid, target_user)))
+
+
+@sio.on('offer')
+@limit_event('offer')
+async def handle_offer(sid, data):
+    if valid_target('offer', sid, data['userId']):
+        await sio.emit('offer', {'userId': sid, 'offer': data['offer']}, to=data['userId'])
+
+
+@sio.on('answer')
+@limit_event('answer')
+async def handle_answer(sid, data):
+    if valid_target('answer', sid, data['userId']):
+        await sio.emit('answer', {'userId': sid, 'answer': data['answer']}, to=data['userId'])
+
+
+@sio.on('ice-candidates')
+@limit_event('ice-candidates')
+async def handle_ice_candidates(sid, data):
+    candidates = data.get('candidates')
+    if not candidates or not isinstance(candidates, list):
+        return
+    if not valid_target('ice-candidates', sid, data['userId']):
+        candidate_batcher.reject()
+        return
+    await queue_candidates(sid, data['userId'], candidates)
+
+
+@sio.on('ice-candidate')
+@limit_event('ice-candidate')
+async def handle_ice_candidate(sid, data):
+    # Single-candidate form from older clients; relayed in the same batches as 'ice-candidates'
+    if not valid_target('ice-candidate', sid, data['userId']):
+        candidate_batcher.reject()
+        return
+    await queue_candidates(sid, data['userId'], [data['candidate']])
+
+
+# --- Application ------------------------------------------------------------
+
+@web.middleware
+async def cors_middleware(request, handler):
+    """Allow any origin on the HTTP API, as CORS(app, origins="*") does for the Flask app"""
+    if request.path.startswith('/socket.io'):
+        # Engine.IO sets its own CORS headers
+        return await handler(request)
+    if request.method == 'OPTIONS':
+        response = web.Response()
+        response.headers['Access-Control-Allow-Methods'] = 'GET, POST, OPTIONS'
+        response.headers['Access-Control-Allow-Headers'] = request.headers.get('Access-Control-Request-Headers', '*')
+    else:
+        response = await handler(request)
+    response.headers['Access-Control-Allow-Origin'] = '*'
+    return response
+
+
+async def on_startup(web_app):
+    for _ in range(ASYNC_AUDIO_WORKERS):
+        spawn(audio_worker())
+    spawn(coalesce_flusher())
+    spawn(webhook_dispatcher())
+
+    warmup = [name.strip() for name in os.getenv('WARMUP_SERVICES', 'mongo').split(',') if name.strip()]
+    if 'mongo' in warmup:
+        try:
+            await async_db.get_db().command('ping')
+            await async_db.ensure_indexes()
+            logger.info("MongoDB (motor) is reachable")
+        except Exception as e:
+            logger.error("Warmup of service mongo_async failed: %s", e)
+
+
+async def on_cleanup(web_app):
+    for room in list(sfu_rooms):
+        await sfu_rooms.pop(room).close()
+    for task in list(background_tasks):
+        task.cancel()
+    if services.is_initialized('http_async'):
+        await services.get('http_async').close()
+
+
+def create_app():
+    web_app = web.Application(middlewares=[cors_middleware])
+    sio.attach(web_app)
+    web_app.add_routes(routes)
+    web_app.on_startup.append(on_startup)
+    web_app.on_cleanup.append(on_cleanup)
+    return web_app
+
+
+if __name__ == '__main__':
+    port = int(sys.argv[1]) if len(sys.argv) > 1 else 5001
+
+    ssl_context = None
+    if os.path.exists('cert.pem') and os.path.exists('key.pem'):
+        import ssl
+        ssl_context = ssl.create_default_context(ssl.Purpose.CLIENT_AUTH)
+        ssl_context.load_cert_chain('cert.pem', 'key.pem')
+
+    scheme = 'https' if ssl_context else 'http'
+    print(f"Starting asyncio video call server on port {port}")
+    print(f"  {scheme}://localhost:{port}?room=yourroom")
+    web.run_app(create_app(), host='0.0.0.0', port=port, ssl_context=ssl_context)
@@ -0,0 +1,170 @@
+"""
+Motor (asyncio) versions of the db.py functions used by the asyncio server mode.
+
+Documents, queries and return values come from db_common.py, like in db.py, so both servers
+can share one database.
+"""
+from datetime import datetime
+from pymongo import ReturnDocument
+from logger import get_logger
+from db_common import (MONGO_DB_NAME, INDEXES, BACKFILL_MIGRATION, BACKFILL_ROOM_PROJECTION, MEMBERSHIP_PROJECTION,
+                       MEMBERSHIP_SORT, TASK_PROJECTION, TASK_SORT, generate_room_code, new_member, join_room_query,
+                       new_room_document, membership_document, normalize_members, get_member_usernames,
+                       user_rooms_query, task_creation_error, new_task, members_with_task, task_document,
+                       backfill_membership_updates, backfill_task_updates, task_page_size, build_task_query,
+                       is_paginated, page_tasks)
+import services
+
+logger = get_logger(__name__)
+
+_indexes_ready = False
+
+
+def get_db():
+    """Return the rooms database on the shared AsyncIOMotorClient (created on first use)"""
+    return services.get('mongo_async')[MONGO_DB_NAME]
+
+
+async def ensure_indexes():
+    """Create the collection indexes; create_index is a no-op for indexes that already exist"""
+    global _indexes_ready
+    for collection, indexes in INDEXES.items():
+        for keys, options in indexes:
+            await get_db()[collection].create_index(keys, **options)
+    _indexes_ready = True
+    await ensure_backfilled()
+
+
+async def ensure_backfilled():
+    """Copy rooms created before the memberships and tasks collections existed into them, once (see db.py)"""
+    database = get_db()
+    if await database.migrations.find_one({"_id": BACKFILL_MIGRATION}) is not None:
+        return
+    memberships = tasks = 0
+    async for room in database.rooms.find({}, BACKFILL_ROOM_PROJECTION):
+        for query, update in backfill_membership_updates(room):
+            await database.memberships.update_one(query, update, upsert=True)
+            memberships += 1
+        for query, update in backfill_task_updates(room):
+            await database.tasks.update_one(query, update, upsert=True)
+            tasks += 1
+    await database.migrations.update_one({"_id": BACKFILL_MIGRATION}, {"$set": {"completed_at": datetime.utcnow()}},
+                                         upsert=True)
+    logger.info("Backfilled %d memberships and %d tasks", memberships, tasks)
+
+
+async def indexed(collection):
+    """A memberships/tasks collection, with the indexes ensured on first use"""
+    if not _indexes_ready:
+        await ensure_indexes()
+    return get_db()[collection]
+
+
+async def create_room(owner, room_name):
+    for _ in range(5):
+        room_code = generate_room_code()
+        if not await get_db().rooms.find_one({"room_code": room_code}):
+            room = new_room_document(room_code, owner, room_name)
+            try:
+                await get_db().rooms.insert_one(room)
+                await (await indexed('memberships')).insert_one(membership_document(room, owner, "host", 1))
+                return room_code
+            except Exception as e:
+                logger.error("Error inserting room %s: %s", room_code, e)
+                return None
+    logger.error("Failed to generate a unique room code.")
+    return None
+
+
+async def join_room(room_code, username):
+    # The membership check is part of the update, so a user joining twice at once is added once
+    room = await get_db().rooms.find_one_and_update(
+        join_room_query(room_code, username),
+        {"$push": {"members": new_member(username)}},
+        return_document=ReturnDocument.AFTER
+    )
+    if room is None:
+        if await get_db().rooms.find_one({"room_code": room_code}, {"_id": 1}) is None:
+            return False, "Room not found"
+        return False, "User already in room"
+
+    member_count = len(get_member_usernames(room["members"]))
+    membership_collection = await indexed('memberships')
+    await membership_collection.update_many({"room_code": room_code}, {"$max": {"member_count": member_count}})
+    await membership_collection.update_one(
+        {"username": username, "room_code": room_code},
+        {"$set": membership_document(room, username, "member", member_count)},
+        upsert=True
+    )
+    return True, "Joined room successfully"
+
+
+async def get_room(room_code):
+    room = await get_db().rooms.find_one({"room_code": room_code})
+    if room and "members" in room:
+        room["members"] = normalize_members(room["members"])
+        await get_db().rooms.update_one(
+            {"room_code": room_code},
+            {"$set": {"members": room["members"]}}
+        )
+    return room
+
+
+async def add_task_to_user_in_room(room_code, creator, assigned_to, title, description="", due_date=None,
+                                   status="open", repo=None, branch=None):
+    room = await get_db().rooms.find_one({"room_code": room_code})
+    error = task_creation_error(room, creator, assigned_to, status)
+    if error:
+        return False, error
+
+    task = new_task(creator, title, description, due_date, status, repo, branch)
+    members = members_with_task(room, assigned_to, task)
+
+    result = await get_db().rooms.update_one(
+        {"room_code": room_code},
+        {"$set": {"members": members}}
+    )
+
+    if result.modified_count == 1:
+        await (await indexed('tasks')).insert_one(task_document(task, room_code, assigned_to))
+        return True, task
+    else:
+        return False, "Failed to add task"
+
+
+async def find_tasks(username, room_code=None, created_by=None, status=None, due_before=None, due_after=None,
+                     limit=None, cursor=None):
+    """Query a user's tasks, oldest first; returns (tasks, next_cursor) like db.find_tasks"""
+    query = build_task_query(username, room_code, created_by, status, due_before, due_after, cursor)
+    results = (await indexed('tasks')).find(query, TASK_PROJECTION).sort(TASK_SORT)
+    if not is_paginated(limit, cursor):
+        return await results.to_list(length=None), None
+    limit = task_page_size(limit)
+    return page_tasks(await results.limit(limit + 1).to_list(length=None), limit)
+
+
+async def get_tasks_for_user_in_room(room_code, username, **filters):
+    """Tasks assigned to a user in one room as (tasks, next_cursor); None if the room or user is not found"""
+    memberships = await indexed('memberships')
+    membership = await memberships.find_one({"username": username, "room_code": room_code}, {"_id": 1})
+    if membership is None:
+        return None
+    return await find_tasks(username, room_code=room_code, **filters)
+
+
+async def get_user_rooms(username):
+    """Get all rooms where the user is either the owner or a member"""
+    try:
+        return await get_db().rooms.find(user_rooms_query(username)).to_list(length=None)
+    except Exception as e:
+        logger.error("Error in get_user_rooms for %s: %s", username, e)
+        return []
+
+
+async def get_user_room_summaries(username, limit=None, offset=0):
+    """List a user's rooms, newest first, from the memberships collection (see db.py)"""
+    cursor = (await indexed('memberships')).find({"username": username}, MEMBERSHIP_PROJECTION) \
+        .sort(MEMBERSHIP_SORT).skip(offset)
+    if limit:
+        cursor = cursor.limit(limit)
+    return await cursor.to_list(length=None)
@@ -0,0 +1,83 @@
+"""
+Non-blocking AssemblyAI client for the asyncio server mode.
+
+The assemblyai SDK blocks its calling thread while it uploads and polls, so the asyncio
+server talks to the same REST API through a shared aiohttp session instead.
+"""
+import asyncio
+import os
+import time
+from dotenv import load_dotenv
+from logger import get_logger
+
+load_dotenv()
+
+logger = get_logger(__name__)
+
+ASSEMBLYAI_BASE_URL = os.getenv('ASSEMBLYAI_BASE_URL', 'https://api.assemblyai.com/v2')
+# Seconds between status polls, and how long to wait for a transcript before giving up
+ASSEMBLYAI_POLL_INTERVAL = float(os.getenv('ASSEMBLYAI_POLL_INTERVAL', '0.5'))
+ASSEMBLYAI_TIMEOUT = float(os.getenv('ASSEMBLYAI_TIMEOUT', '120'))
+
+
+class Word:
+    """A transcribed word with its offsets (ms) into the uploaded audio"""
+
+    __slots__ = ('text', 'start', 'end', 'confidence')
+
+    def __init__(self, text, start, end, confidence=None):
+        self.text = text
+        self.start = start
+        self.end = end
+        self.confidence = confidence
+
+
+class Transcript:
+    """The parts of an AssemblyAI transcript the audio pipeline uses (.text and .words)"""
+
+    def __init__(self, transcript_id, text, words):
+        self.id = transcript_id
+        self.text = text or ""
+        self.words = words
+
+
+class AsyncAssemblyAI:
+    """
+    Upload audio, request a transcript and poll for it without blocking the event loop.
+
+    Args:
+        api_key (str): AssemblyAI API key
+        session (aiohttp.ClientSession): Shared, pooled HTTP session
+        speech_model (str): Speech model to request, as in the synchronous pipeline
+    """
+
+    def __init__(self, api_key, session, speech_model='universal'):
+        self.session = session
+        self.speech_model = speech_model
+        self.headers = {"authorization": api_key}
+
+    async def _request(self, method, path, **kwargs):
+        async with self.session.request(method, ASSEMBLYAI_BASE_URL + path, headers=self.headers, **kwargs) as response:
+            response.raise_for_status()
+            return await response.json()
+
+    async def transcribe(self, audio_bytes: bytes) -> Transcript:
+        started = time.perf_counter()
+        upload = await self._request('POST', '/upload', data=audio_bytes)
+        job = await self._request('POST', '/transcript', json={
+            "audio_url": upload["upload_url"],
+            "speech_model": self.speech_model
+        })
+
+        deadline = time.monotonic() + ASSEMBLYAI_TIMEOUT
+        while job.get("status") not in ("completed", "error"):
+            if time.monotonic() > deadline:
+                raise TimeoutError(f"Transcript {job.get('id')} not ready after {ASSEMBLYAI_TIMEOUT:.0f}s")
+            await asyncio.sleep(ASSEMBLYAI_POLL_INTERVAL)
+            job = await self._request('GET', f"/transcript/{job['id']}")
+
+        if job["status"] == "error":
+            raise RuntimeError(f"Transcription failed: {job.get('error')}")
+        logger.debug("Transcript %s ready in %.3fs", job["id"], time.perf_counter() - started)
+        words = [Word(w["text"], w["start"], w["end"], w.get("confidence")) for w in job.get("words") or []]
+        return Transcript(job["id"], job.get("text"), words)
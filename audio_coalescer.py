@@ -0,0 +1,173 @@
+import os
+import threading
+import time
+import numpy as np
+from dotenv import load_dotenv
+from vad import SAMPLE_RATE, pcm_to_wav_bytes
+
+load_dotenv()
+
+COALESCE_ENABLED = os.getenv('COALESCE_ENABLED', 'true').lower() == 'true'
+# Never merge more than this much audio into one transcription job
+COALESCE_MAX_AUDIO_MS = int(os.getenv('COALESCE_MAX_AUDIO_MS', '20000'))
+# Bounds for how long the first chunk of a job may wait before the job is flushed
+COALESCE_MIN_WINDOW_MS = int(os.getenv('COALESCE_MIN_WINDOW_MS', '4500'))
+COALESCE_MAX_WINDOW_MS = int(os.getenv('COALESCE_MAX_WINDOW_MS', '12000'))
+# Target window as a multiple of the observed transcriber latency
+COALESCE_LATENCY_FACTOR = float(os.getenv('COALESCE_LATENCY_FACTOR', '2.0'))
+
+
+class ChunkSpan:
+    """Where one original audio-chunk sits inside a merged job"""
+
+    def __init__(self, timestamp, offset_ms, duration_ms):
+        self.timestamp = timestamp
+        self.offset_ms = offset_ms
+        self.duration_ms = duration_ms
+
+
+class TranscriptionJob:
+    """
+    One or more consecutive chunks from a single speaker, transcribed together.
+
+    Attributes:
+        room (str): Room the speaker is in
+        user_id (str): Socket ID of the speaker
+        speaker (str): Display name of the speaker
+        spans (List[ChunkSpan]): Original chunks with their client timestamps and offsets
+        pcm (np.ndarray): Concatenated 16 kHz mono PCM
+    """
+
+    def __init__(self, room, user_id, speaker, spans, pcm):
+        self.room = room
+        self.user_id = user_id
+        self.speaker = speaker
+        self.spans = spans
+        self.pcm = pcm
+
+    @property
+    def audio_ms(self) -> int:
+        return len(self.pcm) * 1000 // SAMPLE_RATE
+
+    def to_wav_bytes(self) -> bytes:
+        return pcm_to_wav_bytes(self.pcm)
+
+    def split_words(self, words):
+        """
+        Assign transcribed words back to the chunk they were spoken in.
+
+        Args:
+            words: Iterable of objects with .text and .start (ms offset into the job audio)
+
+        Returns:
+            List[Tuple[int, str]]: (original timestamp, text) for every chunk with text
+        """
+        texts = [[] for _ in self.spans]
+        for word in words:
+            index = 0
+            for i, span in enumerate(self.spans):
+                if word.start >= span.offset_ms:
+                    index = i
+                else:
+                    break
+            texts[index].append(word.text)
+        return [(span.timestamp, " ".join(parts)) for span, parts in zip(self.spans, texts) if parts]
+
+
+class _SpeakerBuffer:
+    def __init__(self, room, speaker):
+        self.room = room
+        self.speaker = speaker
+        self.pcm_parts = []
+        self.spans = []
+        self.audio_ms = 0
+        self.started_at = time.monotonic()
+
+
+class AudioCoalescer:
+    """
+    Per-speaker buffer that merges consecutive speech chunks into one transcription job.
+
+    A speaker's buffer is flushed when a pause (silent chunk) is seen, when it reaches
+    COALESCE_MAX_AUDIO_MS of audio, or when its first chunk has waited longer than the
+    current window. The window adapts to the observed transcriber latency: a slow
+    transcriber with high fixed overhead gets larger batches.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._buffers = {}  # {user_id: _SpeakerBuffer}
+        self._latency_ms = None  # EWMA of transcriber latency per job
+        self.jobs_flushed = 0
+        self.chunks_merged = 0
+        self.flush_reasons = {"pause": 0, "size": 0, "deadline": 0, "leave": 0}
+
+    @property
+    def window_ms(self) -> int:
+        if self._latency_ms is None:
+            return COALESCE_MIN_WINDOW_MS
+        target = int(self._latency_ms * COALESCE_LATENCY_FACTOR)
+        return max(COALESCE_MIN_WINDOW_MS, min(COALESCE_MAX_WINDOW_MS, target))
+
+    def record_latency(self, seconds: float):
+        """Feed back how long the transcriber took for one job"""
+        latency_ms = seconds * 1000
+        with self._lock:
+            if self._latency_ms is None:
+                self._latency_ms = latency_ms
+            else:
+                self._latency_ms = 0.8 * self._latency_ms + 0.2 * latency_ms
+
+    def add(self, room, user_id, speaker, pcm, timestamp):
+        """Buffer a decoded speech chunk; returns the jobs that are ready to transcribe"""
+        jobs = []
+        with self._lock:
+            buffer = self._buffers.get(user_id)
+            if buffer and buffer.room != room:
+                jobs.append(self._flush_locked(user_id, "leave"))
+                buffer = None
+            if buffer is None:
+                buffer = self._buffers[user_id] = _SpeakerBuffer(room, speaker)
+            duration_ms = len(pcm) * 1000 // SAMPLE_RATE
+            buffer.spans.append(ChunkSpan(timestamp, buffer.audio_ms, duration_ms))
+            buffer.pcm_parts.append(pcm)
+            buffer.audio_ms += duration_ms
+            buffer.speaker = speaker
+            if buffer.audio_ms >= COALESCE_MAX_AUDIO_MS:
+                jobs.append(self._flush_locked(user_id, "size"))
+        return [job for job in jobs if job]
+
+    def flush(self, user_id, reason="pause"):
+        """Flush one speaker's buffer (pause detected, speaker left, ...); returns a job or None"""
+        with self._lock:
+            return self._flush_locked(user_id, reason)
+
+    def expired(self):
+        """Return jobs whose first chunk has waited longer than the current window"""
+        deadline = time.monotonic() - self.window_ms / 1000.0
+        with self._lock:
+            due = [user_id for user_id, buffer in self._buffers.items() if buffer.started_at <= deadline]
+            return [job for job in (self._flush_locked(user_id, "deadline") for user_id in due) if job]
+
+    def _flush_locked(self, user_id, reason):
+        buffer = self._buffers.pop(user_id, None)
+        if not buffer or not buffer.spans:
+            return None
+        self.jobs_flushed += 1
+        self.chunks_merged += len(buffer.spans)
+        self.flush_reasons[reason] = self.flush_reasons.get(reason, 0) + 1
+        pcm = buffer.pcm_parts[0] if len(buffer.pcm_parts) == 1 else np.concatenate(buffer.pcm_parts)
+        return TranscriptionJob(buffer.room, user_id, buffer.speaker, buffer.spans, pcm)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "enabled": COALESCE_ENABLED,
+                "window_ms": self.window_ms,
+                "transcriber_latency_ms": round(self._latency_ms, 1) if self._latency_ms is not None else None,
+                "buffered_speakers": len(self._buffers),
+                "jobs_flushed": self.jobs_flushed,
+                "chunks_merged": self.chunks_merged,
+                "chunks_per_job": self.chunks_merged / self.jobs_flushed if self.jobs_flushed else 0.0,
+                "flush_reasons": dict(self.flush_reasons),
+            }
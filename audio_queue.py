@@ -0,0 +1,229 @@
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Chunks waiting for transcription, per speaker and per room
+AUDIO_QUEUE_MAX_PER_SPEAKER = int(os.getenv('AUDIO_QUEUE_MAX_PER_SPEAKER', '4'))
+AUDIO_QUEUE_MAX_PER_ROOM = int(os.getenv('AUDIO_QUEUE_MAX_PER_ROOM', '16'))
+# What to do with a chunk that arrives while its queue is full: drop-oldest or slow-down
+AUDIO_OVERLOAD_POLICY = os.getenv('AUDIO_OVERLOAD_POLICY', 'drop-oldest')
+# Suggested client back-off when the slow-down policy rejects a chunk
+AUDIO_RETRY_AFTER_MS = int(os.getenv('AUDIO_RETRY_AFTER_MS', '4000'))
+# How long task extraction for an emptied room waits for its queued audio to be transcribed
+ROOM_DRAIN_TIMEOUT = float(os.getenv('ROOM_DRAIN_TIMEOUT', '120'))
+
+OVERLOAD_POLICIES = ('drop-oldest', 'slow-down')
+
+
+class QueuedChunk:
+    """
+    One queue entry: the still-encoded audio of one chunk from a speaker.
+
+    Attributes:
+        user_id (str): Socket ID of the speaker
+        room (str): Room the audio was sent in
+        speaker (str): Display name of the speaker
+        audio_data (str): Base64 audio; for format "pcm" already decoded float32 PCM (SFU rooms)
+        timestamp (int): Client timestamp of the chunk
+        audio_format (str): Container format of audio_data
+        enqueued_at (float): Monotonic time the entry was created
+    """
+
+    __slots__ = ('user_id', 'room', 'speaker', 'audio_data', 'timestamp', 'audio_format', 'enqueued_at')
+
+    def __init__(self, user_id, room, speaker, audio_data, timestamp, audio_format):
+        self.user_id = user_id
+        self.room = room
+        self.speaker = speaker
+        self.audio_data = audio_data
+        self.timestamp = timestamp
+        self.audio_format = audio_format
+        self.enqueued_at = time.monotonic()
+
+
+class QueuedFlush:
+    """
+    One queue entry: transcribe what the coalescer holds for a speaker.
+
+    Attributes:
+        user_id (str): Socket ID of the speaker
+        room (str): Room the audio was sent in
+        reason (str): Why the buffer is flushed ("leave", "deadline", ...)
+        job (TranscriptionJob): Already flushed coalescer job, or None to flush the speaker's buffer when taken
+        enqueued_at (float): Monotonic time the entry was created
+    """
+
+    __slots__ = ('user_id', 'room', 'reason', 'job', 'enqueued_at')
+
+    def __init__(self, user_id, room, reason, job=None):
+        self.user_id = user_id
+        self.room = room
+        self.reason = reason
+        self.job = job
+        self.enqueued_at = time.monotonic()
+
+
+def _chunk_count(queue) -> int:
+    return sum(1 for entry in queue if isinstance(entry, QueuedChunk))
+
+
+class AudioIngestQueue:
+    """
+    Bounded per-room, per-speaker queue between audio-chunk events and transcription workers.
+
+    offer() never blocks. When a speaker's or room's queue is full the configured overload
+    policy decides what happens:
+        drop-oldest: evict the oldest queued entry to make room
+        slow-down:   reject the chunk so the caller can ask the client to back off
+    take() serves rooms round-robin, and speakers round-robin inside a room, so one busy
+    room cannot starve the others. A speaker whose entry has been taken is skipped until
+    the worker calls done(user_id), so one speaker's chunks are processed one at a time and
+    in order even with many workers.
+
+    offer_flush() queues a QueuedFlush entry, which is never rejected or evicted, so the
+    transcription of a leaving speaker's buffer or of a coalescer deadline job goes through
+    the same bounded pool of workers as the chunks.
+    """
+
+    def __init__(self, max_per_speaker=AUDIO_QUEUE_MAX_PER_SPEAKER, max_per_room=AUDIO_QUEUE_MAX_PER_ROOM,
+                 policy=AUDIO_OVERLOAD_POLICY):
+        if policy not in OVERLOAD_POLICIES:
+            raise ValueError(f"AUDIO_OVERLOAD_POLICY must be one of {', '.join(OVERLOAD_POLICIES)}")
+        self.max_per_speaker = max_per_speaker
+        self.max_per_room = max_per_room
+        self.policy = policy
+        self._lock = threading.Lock()
+        self._rooms = OrderedDict()  # {room: OrderedDict({user_id: deque[QueuedChunk]})}
+        self._room_depth = {}  # {room: queued entries}
+        self._in_flight = {}  # {user_id: room} for speakers whose taken entry is still being processed
+        self.depth = 0
+        self.max_depth_seen = 0
+        self.counters = {"enqueued": 0, "dropped": 0, "rejected": 0, "taken": 0, "flushes": 0}
+        self.total_wait_ms = 0.0
+
+    def offer(self, user_id, room, speaker, audio_data, timestamp, audio_format) -> str:
+        """
+        Queue one chunk. Returns "queued", "dropped" (an older entry was evicted) or "rejected".
+        """
+        with self._lock:
+            speakers = self._rooms.setdefault(room, OrderedDict())
+            queue = speakers.setdefault(user_id, deque())
+            speaker_full = _chunk_count(queue) >= self.max_per_speaker
+            room_full = self._room_depth.get(room, 0) >= self.max_per_room
+
+            if speaker_full or room_full:
+                victim_queue = queue if speaker_full else max(speakers.values(), key=_chunk_count)
+                victim = next((entry for entry in victim_queue if isinstance(entry, QueuedChunk)), None)
+                if self.policy == 'slow-down' or victim is None:
+                    self.counters["rejected"] += 1
+                    if not queue:
+                        del speakers[user_id]
+                    return "rejected"
+                victim_queue.remove(victim)
+                self._room_depth[room] -= 1
+                self.depth -= 1
+                self.counters["dropped"] += 1
+                outcome = "dropped"
+            else:
+                outcome = "queued"
+
+            queue.append(QueuedChunk(user_id, room, speaker, audio_data, timestamp, audio_format))
+            self._room_depth[room] = self._room_depth.get(room, 0) + 1
+            self.depth += 1
+            self.max_depth_seen = max(self.max_depth_seen, self.depth)
+            self.counters["enqueued"] += 1
+            return outcome
+
+    def offer_flush(self, user_id, room, reason, job=None):
+        """
+        Queue a coalescer flush for a speaker. Never blocks, rejects or evicts.
+
+        Without a job the speaker's buffer is flushed when the entry is taken, after the
+        chunks already queued for them. An already flushed deadline job goes to the front
+        of the speaker's queue, since its audio is older than anything still queued.
+        """
+        with self._lock:
+            speakers = self._rooms.setdefault(room, OrderedDict())
+            queue = speakers.setdefault(user_id, deque())
+            entry = QueuedFlush(user_id, room, reason, job)
+            if job is None:
+                queue.append(entry)
+            else:
+                queue.appendleft(entry)
+            self._room_depth[room] = self._room_depth.get(room, 0) + 1
+            self.depth += 1
+            self.max_depth_seen = max(self.max_depth_seen, self.depth)
+            self.counters["flushes"] += 1
+
+    def take(self):
+        """
+        Pop the next entry, fair across rooms and speakers, and mark its speaker in flight.
+
+        Returns None if nothing is queued for a speaker who is not in flight. The caller must
+        call done(item.user_id) once the entry has been processed.
+        """
+        with self._lock:
+            for room in list(self._rooms):
+                speakers = self._rooms[room]
+                for user_id in list(speakers):
+                    queue = speakers[user_id]
+                    if not queue:
+                        del speakers[user_id]
+                        continue
+                    if user_id in self._in_flight:
+                        continue
+                    self._rooms.move_to_end(room)
+                    speakers.move_to_end(user_id)
+                    item = queue.popleft()
+                    if not queue:
+                        del speakers[user_id]
+                    self._in_flight[user_id] = room
+                    self._account_removed(room, 1)
+                    self.counters["taken"] += 1
+                    self.total_wait_ms += (time.monotonic() - item.enqueued_at) * 1000
+                    return item
+                if not speakers:
+                    del self._rooms[room]
+                    self._room_depth.pop(room, None)
+            return None
+
+    def done(self, user_id):
+        """Release a speaker after its taken entry has been processed"""
+        with self._lock:
+            self._in_flight.pop(user_id, None)
+
+    def room_idle(self, room) -> bool:
+        """True once nothing is queued or being processed for a room"""
+        with self._lock:
+            return room not in self._room_depth and room not in self._in_flight.values()
+
+    def _account_removed(self, room, count):
+        self.depth -= count
+        self._room_depth[room] = self._room_depth.get(room, 0) - count
+        if self._room_depth[room] <= 0:
+            self._room_depth.pop(room, None)
+            if not self._rooms.get(room):
+                self._rooms.pop(room, None)
+
+    def room_depth(self, room) -> int:
+        with self._lock:
+            return self._room_depth.get(room, 0)
+
+    def stats(self) -> dict:
+        with self._lock:
+            taken = self.counters["taken"]
+            return {
+                "policy": self.policy,
+                "max_per_speaker": self.max_per_speaker,
+                "max_per_room": self.max_per_room,
+                "depth": self.depth,
+                "in_flight": len(self._in_flight),
+                "max_depth_seen": self.max_depth_seen,
+                "room_depths": dict(sorted(self._room_depth.items(), key=lambda kv: kv[1], reverse=True)[:20]),
+                "avg_wait_ms": self.total_wait_ms / taken if taken else 0.0,
+                **self.counters,
+            }
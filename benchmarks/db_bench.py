@@ -0,0 +1,266 @@
+"""
+Micro-benchmarks for the db.py data-access functions.
+
+Seeds a local mongod with parameterized synthetic data and times create_room,
+join_room, get_room, add_task_to_user_in_room, get_tasks_for_user_in_room,
+get_user_rooms, get_user_room_summaries and find_tasks across sizes. Every call is also
+measured in MongoDB round trips and BSON bytes sent/received, using a pymongo
+command listener.
+
+Results are written as JSON so two runs (e.g. before and after a schema or index
+change) can be compared with --compare.
+
+Usage:
+    python benchmarks/db_bench.py --members 10,100,500 --tasks 0,12,36 --user-rooms 10,100,300
+    python benchmarks/db_bench.py --output after.json --compare before.json
+
+The benchmark drops and recreates the --db-name database; never point it at real data.
+"""
+import argparse
+import itertools
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+import uuid
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import bson
+from pymongo import monitoring
+
+
+class CommandStats(monitoring.CommandListener):
+    """Count round trips and BSON payload bytes for every command pymongo sends"""
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.round_trips = 0
+        self.bytes_sent = 0
+        self.bytes_received = 0
+
+    def started(self, event):
+        self.round_trips += 1
+        self.bytes_sent += len(bson.encode(event.command))
+
+    def succeeded(self, event):
+        self.bytes_received += len(bson.encode(event.reply))
+
+    def failed(self, event):
+        pass
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, int(round(pct / 100.0 * (len(sorted_values) - 1)))))
+    return sorted_values[index]
+
+
+def make_task(creator, index):
+    return {
+        "task_id": str(uuid.uuid4()),
+        "title": f"Synthetic task {index}",
+        "description": "Generated by db_bench " + "x" * 120,
+        "created_by": creator,
+        "timestamp": datetime.utcnow(),
+    }
+
+
+def seed(db_module, members, tasks_per_member, user_rooms):
+    """
+    Create one large target room and user_rooms small rooms that contain the
+    "heavy" user. Returns the target room code.
+    """
+    database = db_module.get_db()
+    for name in database.list_collection_names():
+        database.drop_collection(name)
+    db_module.ensure_indexes(database)
+
+    owner = "owner"
+    member_docs = [{"username": owner, "tasks": [], "role": "host"}]
+    for i in range(members - 1):
+        username = f"member{i}"
+        member_docs.append({
+            "username": username,
+            "tasks": [make_task(owner, t) for t in range(tasks_per_member)],
+            "role": "member",
+        })
+    target_code = "TARGET"
+    database.rooms.insert_one({
+        "room_code": target_code,
+        "room_name": "Target room",
+        "owner": owner,
+        "members": member_docs,
+        "created_at": datetime.utcnow(),
+    })
+
+    batch = []
+    for i in range(user_rooms):
+        batch.append({
+            "room_code": f"H{i:05d}",
+            "room_name": f"Heavy user room {i}",
+            "owner": "heavy" if i % 4 == 0 else f"owner{i}",
+            "members": [{"username": "heavy", "tasks": [make_task("owner", t) for t in range(tasks_per_member)],
+                         "role": "member"}]
+                       + [{"username": f"peer{i}_{j}", "tasks": [], "role": "member"} for j in range(4)],
+            "created_at": datetime.utcnow(),
+        })
+        if len(batch) >= 500:
+            database.rooms.insert_many(batch)
+            batch = []
+    if batch:
+        database.rooms.insert_many(batch)
+    db_module.backfill_memberships()
+    db_module.backfill_tasks()
+    return target_code
+
+
+def measure(stats, func, iterations, args_for):
+    """Run func(*args_for(i)) iterations times; return per-call timing and wire stats"""
+    durations = []
+    round_trips = bytes_sent = bytes_received = 0
+    for i in range(iterations):
+        call_args = args_for(i)
+        stats.reset()
+        started = time.perf_counter()
+        func(*call_args)
+        durations.append(time.perf_counter() - started)
+        round_trips += stats.round_trips
+        bytes_sent += stats.bytes_sent
+        bytes_received += stats.bytes_received
+    ordered = sorted(durations)
+    return {
+        "iterations": iterations,
+        "mean_ms": statistics.mean(ordered) * 1000,
+        "p50_ms": percentile(ordered, 50) * 1000,
+        "p95_ms": percentile(ordered, 95) * 1000,
+        "round_trips_per_call": round_trips / iterations,
+        "bytes_sent_per_call": bytes_sent / iterations,
+        "bytes_received_per_call": bytes_received / iterations,
+    }
+
+
+def run_scenario(db_module, stats, members, tasks_per_member, user_rooms, iterations):
+    target = seed(db_module, members, tasks_per_member, user_rooms)
+    last_member = f"member{members - 2}" if members > 1 else "owner"
+    run_id = uuid.uuid4().hex[:6]
+
+    cases = {
+        "create_room": (db_module.create_room, lambda i: (f"creator{i}", f"Bench room {i}")),
+        "join_room": (db_module.join_room, lambda i: (target, f"joiner_{run_id}_{i}")),
+        "get_room": (db_module.get_room, lambda i: (target,)),
+        "add_task_to_user_in_room": (db_module.add_task_to_user_in_room,
+                                     lambda i: (target, "owner", last_member, f"Bench task {i}", "")),
+        "get_tasks_for_user_in_room": (db_module.get_tasks_for_user_in_room, lambda i: (target, last_member)),
+        "get_user_rooms": (db_module.get_user_rooms, lambda i: ("heavy",)),
+        "get_user_room_summaries": (db_module.get_user_room_summaries, lambda i: ("heavy", 50)),
+        "find_tasks": (db_module.find_tasks, lambda i: ("heavy",)),
+    }
+
+    rows = []
+    for name, (func, args_for) in cases.items():
+        row = {
+            "function": name,
+            "members": members,
+            "tasks_per_member": tasks_per_member,
+            "user_rooms": user_rooms,
+        }
+        row.update(measure(stats, func, iterations, args_for))
+        rows.append(row)
+    return rows
+
+
+def scenario_key(row):
+    return (row["function"], row["members"], row["tasks_per_member"], row["user_rooms"])
+
+
+def compare(rows, baseline_path):
+    with open(baseline_path, encoding="utf-8") as f:
+        baseline = {scenario_key(row): row for row in json.load(f)["results"]}
+    print(f"\nComparison against {baseline_path} (negative is better)")
+    print(f"{'function':<28}{'M':>6}{'T':>5}{'R':>6}{'p50 Δ%':>10}{'RT Δ':>8}{'bytes in Δ%':>13}")
+    for row in rows:
+        before = baseline.get(scenario_key(row))
+        if not before:
+            continue
+
+        def pct(new, old):
+            return (new - old) / old * 100 if old else 0.0
+
+        print(f"{row['function']:<28}{row['members']:>6}{row['tasks_per_member']:>5}{row['user_rooms']:>6}"
+              f"{pct(row['p50_ms'], before['p50_ms']):>10.1f}"
+              f"{row['round_trips_per_call'] - before['round_trips_per_call']:>8.1f}"
+              f"{pct(row['bytes_received_per_call'], before['bytes_received_per_call']):>13.1f}")
+
+
+def git_revision():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True).strip()
+    except Exception:
+        return None
+
+
+def parse_sizes(value):
+    return [int(v) for v in value.split(",") if v.strip()]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Micro-benchmarks for db.py")
+    parser.add_argument("--mongo-uri", default=os.getenv("BENCH_MONGO_URI", "mongodb://localhost:27017"))
+    parser.add_argument("--db-name", default="rooms_db_bench")
+    parser.add_argument("--members", type=parse_sizes, default=[10, 100, 500], help="members in the target room")
+    parser.add_argument("--tasks", type=parse_sizes, default=[0, 12, 36], help="tasks per member")
+    parser.add_argument("--user-rooms", type=parse_sizes, default=[10, 100, 300], help="rooms the heavy user is in")
+    parser.add_argument("--iterations", type=int, default=50)
+    parser.add_argument("--output", default="db_bench_results.json")
+    parser.add_argument("--compare", help="baseline results file to diff against")
+    args = parser.parse_args()
+
+    if args.db_name == "rooms_db":
+        parser.error("refusing to benchmark against the application database")
+
+    # Listeners must be registered before db.py lazily creates its MongoClient
+    stats = CommandStats()
+    monitoring.register(stats)
+    os.environ["MONGO_URI"] = args.mongo_uri
+    os.environ["MONGO_DB_NAME"] = args.db_name
+    os.environ.setdefault("LOG_LEVEL", "WARNING")
+    from logger import configure_logging
+    configure_logging()
+    import db as db_module
+    import services
+
+    results = []
+    for members, tasks_per_member, user_rooms in itertools.product(args.members, args.tasks, args.user_rooms):
+        print(f"Scenario: members={members} tasks/member={tasks_per_member} user_rooms={user_rooms}")
+        results.extend(run_scenario(db_module, stats, members, tasks_per_member, user_rooms, args.iterations))
+
+    print(f"\n{'function':<28}{'M':>6}{'T':>5}{'R':>6}{'p50 ms':>9}{'p95 ms':>9}{'RT':>6}{'KB out':>9}{'KB in':>10}")
+    for row in results:
+        print(f"{row['function']:<28}{row['members']:>6}{row['tasks_per_member']:>5}{row['user_rooms']:>6}"
+              f"{row['p50_ms']:>9.2f}{row['p95_ms']:>9.2f}{row['round_trips_per_call']:>6.1f}"
+              f"{row['bytes_sent_per_call'] / 1024:>9.1f}{row['bytes_received_per_call'] / 1024:>10.1f}")
+
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump({
+            "created_at": datetime.utcnow().isoformat(),
+            "git_revision": git_revision(),
+            "mongo_uri": args.mongo_uri,
+            "results": results,
+        }, f, indent=2)
+    print(f"\nResults written to {args.output}")
+
+    if args.compare:
+        compare(results, args.compare)
+
+    services.get('mongo').drop_database(args.db_name)
+
+
+if __name__ == "__main__":
+    main()
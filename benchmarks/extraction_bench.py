@@ -0,0 +1,431 @@
+"""
+End-to-end task extraction benchmark replaying the transcripts corpus.
+
+Every transcript in transcripts/ (the per-room "[HH:MM:SS] Speaker: text" files) and the
+sample transcript.txt is loaded into a VideoCall, optionally repeated --scales times to
+stand in for longer calls, and run through app.create_and_save_tasks ->
+transcript_preprocess.prepare_extraction_input -> tasksync.extract_tasks -> send_message,
+with and without transcript preprocessing. The Cerebras client is replaced by a
+deterministic stand-in: it derives tasks from the action items in the prompt, wraps a fixed
+share of its answers in markdown fences (a real model's most common JSON failure, chosen by
+a hash of the prompt so runs are reproducible) and sleeps for a latency modelled on prompt
+and completion tokens.
+
+Reports, per transcript size bucket (raw prompt tokens) and preprocessing mode: prompt
+tokens sent, request serialization time, response parse time and failures, and end-to-end
+latency. Results are written as JSON so two runs can be compared with --compare.
+
+Usage:
+    python benchmarks/extraction_bench.py --scales 1,4,16,64 --repeat 3
+    python benchmarks/extraction_bench.py --output before.json
+    python benchmarks/extraction_bench.py --output after.json --compare before.json
+"""
+import argparse
+import glob
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+import time
+import zlib
+from datetime import datetime
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.load_test import install_stand_ins, percentile
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MODES = ("raw", "preprocessed")
+# Upper bounds of the size buckets, in raw prompt tokens
+BUCKETS = (1000, 4000, 16000, 64000)
+
+_TIMESTAMPED_LINE = re.compile(r"^\[(\d{2}):(\d{2}):(\d{2})\]\s*([^:]+):\s*(.*)$")
+_SPEAKER_LINE = re.compile(r"^([A-Z][\w'-]*(?: [A-Z][\w'-]*)?)(?:\s*\(([^)]*)\))?:\s*(.*)$")
+_TEAM_LINE = re.compile(r"^(\w[\w ]*?)\s*-\s*(\w+)\s*\(Github:\s*([^)]*)\)", re.IGNORECASE)
+_ACTION = re.compile(r"\b(?:need (?:you|to)|can you|please|you should|i'll|i will|let's|make sure|set up|build|"
+                     r"implement|add|connect|fix|finish|write|send|handle)\b", re.IGNORECASE)
+_SENTENCE = re.compile(r"[^.!?]+[.!?]?")
+
+
+# ---------------------------------------------------------------------------
+# Corpus
+# ---------------------------------------------------------------------------
+
+def load_room_transcript(path):
+    """Entries and members of a transcripts/ file written by app.append_to_transcript_file"""
+    entries = []
+    for line in open(path, encoding="utf-8"):
+        match = _TIMESTAMPED_LINE.match(line.strip())
+        if match:
+            hours, minutes, seconds, speaker, text = match.groups()
+            timestamp = ((int(hours) * 60 + int(minutes)) * 60 + int(seconds)) * 1000
+            entries.append({"speaker": speaker.strip(), "transcription": text, "timestamp": timestamp})
+    speakers = list(dict.fromkeys(entry["speaker"] for entry in entries))
+    members = [{"username": name, "role": "host" if i == 0 else "member"} for i, name in enumerate(speakers)]
+    return entries, members
+
+
+def load_sample_transcript(path):
+    """Entries and members of transcript.txt: a Team: header, then "Name (Role):" turns"""
+    entries = []
+    members = []
+    speaker = None
+    in_header = True
+    for line in open(path, encoding="utf-8"):
+        line = line.strip()
+        team = _TEAM_LINE.match(line) if in_header else None
+        if team:
+            role, name, github = team.groups()
+            members.append({"username": name, "role": role.lower(), "github": github.strip()})
+            continue
+        if not line or line.startswith("["):
+            in_header = in_header and not line.startswith("[")
+            continue
+        if in_header:
+            continue
+        match = _SPEAKER_LINE.match(line)
+        if match:
+            speaker = match.group(1)
+            line = match.group(3)
+        # One entry per line, as the client sends one transcription per audio chunk
+        if speaker and line:
+            entries.append({"speaker": speaker, "transcription": line, "timestamp": len(entries) * 4000})
+    return entries, members
+
+
+def load_corpus(transcripts_dir, sample_path):
+    """[(name, entries, members)] for every transcript that has speech"""
+    corpus = []
+    skipped = 0
+    for path in sorted(glob.glob(os.path.join(transcripts_dir, "*.txt"))):
+        entries, members = load_room_transcript(path)
+        if any(entry["transcription"].strip() for entry in entries):
+            corpus.append((os.path.basename(path)[:-4], entries, members))
+        else:
+            skipped += 1
+    if os.path.exists(sample_path):
+        entries, members = load_sample_transcript(sample_path)
+        if entries:
+            corpus.append((os.path.basename(sample_path)[:-4], entries, members))
+    return corpus, skipped
+
+
+def scale_entries(entries, scale):
+    """The call repeated scale times back to back, as a stand-in for a longer meeting"""
+    if scale == 1 or not entries:
+        return list(entries)
+    span = entries[-1]["timestamp"] - entries[0]["timestamp"] + 4000
+    return [dict(entry, timestamp=entry["timestamp"] + k * span) for k in range(scale) for entry in entries]
+
+
+# ---------------------------------------------------------------------------
+# Deterministic LLM stand-in
+# ---------------------------------------------------------------------------
+
+class ReplayLLM:
+    """
+    Drop-in replacement for the Cerebras client used by cerebras_connector.send_message.
+
+    Each request is serialized to JSON as the SDK would send it (timed), answered with the
+    tasks found in the prompt and delayed by base_ms + ms_per_1k_prompt per 1000 prompt
+    tokens + ms_per_output_token per completion token.
+    """
+
+    def __init__(self, count_tokens, base_ms=50.0, ms_per_1k_prompt=25.0, ms_per_output_token=0.2,
+                 malformed_pct=10.0, max_tasks=40):
+        self.count_tokens = count_tokens
+        self.base_ms = base_ms
+        self.ms_per_1k_prompt = ms_per_1k_prompt
+        self.ms_per_output_token = ms_per_output_token
+        self.malformed_pct = malformed_pct
+        self.max_tasks = max_tasks
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+        self.reset()
+
+    def reset(self):
+        self.last = {"serialize_s": 0.0, "request_bytes": 0, "prompt_tokens": 0, "completion_tokens": 0,
+                     "llm_s": 0.0, "malformed": False}
+
+    def respond(self, message):
+        """JSON task list for the action items in the prompt, assigned to a named member or the speaker"""
+        names = [line.split(":", 1)[0].strip() for line in message.splitlines() if ":" in line]
+        members = sorted({name for name in names if name and " " not in name and not name.startswith("-")})
+        tasks = []
+        seen = set()
+        for line in message.splitlines():
+            speaker, _, text = line.partition(":")
+            if not text or speaker.strip() not in members:
+                continue
+            for sentence in _SENTENCE.findall(text):
+                sentence = sentence.strip()
+                key = sentence.lower()
+                if len(tasks) >= self.max_tasks or key in seen or not _ACTION.search(sentence):
+                    continue
+                seen.add(key)
+                assignee = next((m for m in members if m != speaker.strip() and m.lower() in key), speaker.strip())
+                tasks.append({
+                    "task_title": " ".join(sentence.split()[:8]),
+                    "task_description": sentence,
+                    "assignee": assignee,
+                    "assignee_github": "",
+                    "due_date": "",
+                })
+        content = json.dumps(tasks, indent=2)
+        malformed = zlib.crc32(message.encode("utf-8")) % 100 < self.malformed_pct
+        if malformed:
+            content = "Here are the tasks from the meeting:\n```json\n" + content + "\n```"
+        return content, malformed
+
+    def create(self, messages, **kwargs):
+        started = time.perf_counter()
+        body = json.dumps({"messages": messages, **kwargs}).encode("utf-8")
+        serialize_s = time.perf_counter() - started
+
+        started = time.perf_counter()
+        prompt_tokens = sum(self.count_tokens(m["content"]) for m in messages)
+        content, malformed = self.respond(messages[-1]["content"])
+        completion_tokens = self.count_tokens(content)
+        delay_ms = (self.base_ms + self.ms_per_1k_prompt * prompt_tokens / 1000
+                    + self.ms_per_output_token * completion_tokens)
+        remaining = delay_ms / 1000 - (time.perf_counter() - started)
+        if remaining > 0:
+            time.sleep(remaining)
+        self.last = {"serialize_s": serialize_s, "request_bytes": len(body), "prompt_tokens": prompt_tokens,
+                     "completion_tokens": completion_tokens, "llm_s": time.perf_counter() - started,
+                     "malformed": malformed}
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))])
+
+
+# ---------------------------------------------------------------------------
+# Pipeline instrumentation
+# ---------------------------------------------------------------------------
+
+class PipelineProbe:
+    """Times the pipeline stages of one create_and_save_tasks call"""
+
+    def __init__(self, app_module, tasksync_module):
+        self.reset()
+        prepare = app_module.prepare_extraction_input
+        parse = tasksync_module.parse_tasks
+
+        def timed_prepare(*args, **kwargs):
+            started = time.perf_counter()
+            prepared = prepare(*args, **kwargs)
+            self.stages["preprocess_s"] += time.perf_counter() - started
+            self.prepared = prepared
+            return prepared
+
+        def timed_parse(response):
+            started = time.perf_counter()
+            tasks = parse(response)
+            self.stages["parse_s"] += time.perf_counter() - started
+            self.tasks = len(tasks) if isinstance(tasks, list) else 0
+            # parse_tasks answers [] when the JSON does not decode
+            self.parse_failed = not isinstance(tasks, list) or (not tasks and response.strip() != "[]")
+            return tasks
+
+        app_module.prepare_extraction_input = timed_prepare
+        tasksync_module.parse_tasks = timed_parse
+
+    def reset(self):
+        self.stages = {"preprocess_s": 0.0, "parse_s": 0.0}
+        self.prepared = None
+        self.tasks = 0
+        self.parse_failed = False
+
+
+def run_transcript(app_module, probe, llm, name, entries, members, scale, mode, repeat):
+    import db
+    import transcript_preprocess
+    from video_call import VideoCall
+
+    transcript_preprocess.TRANSCRIPT_PREPROCESS_ENABLED = mode == "preprocessed"
+    room_name = f"EXTRACT-{name}-{scale}-{mode}"
+    db.get_db().rooms.insert_one({"room_code": room_name, "room_name": room_name,
+                                  "owner": members[0]["username"] if members else "", "members": members})
+    video_call = VideoCall(room_name)
+    for entry in scale_entries(entries, scale):
+        video_call.add_transcript_entry(entry["speaker"], entry["transcription"], entry["timestamp"])
+    app_module.video_calls[room_name] = video_call
+
+    runs = []
+    for _ in range(repeat):
+        probe.reset()
+        llm.reset()
+        started = time.perf_counter()
+        app_module.create_and_save_tasks(room_name)
+        total_s = time.perf_counter() - started
+        stages = dict(probe.stages, serialize_s=llm.last["serialize_s"], llm_s=llm.last["llm_s"])
+        runs.append({
+            "total_ms": total_s * 1000,
+            "preprocess_ms": stages["preprocess_s"] * 1000,
+            "serialize_ms": stages["serialize_s"] * 1000,
+            "llm_ms": stages["llm_s"] * 1000,
+            "parse_ms": stages["parse_s"] * 1000,
+            "other_ms": (total_s - sum(stages.values())) * 1000,
+        })
+    app_module.video_calls.pop(room_name, None)
+
+    prepared = probe.prepared
+    row = {
+        "transcript": name,
+        "scale": scale,
+        "mode": mode,
+        "entries": len(entries) * scale,
+        "raw_tokens": prepared.tokens_before,
+        "input_tokens": prepared.tokens_after,
+        "dropped_turns": prepared.dropped_turns,
+        "prompt_tokens": llm.last["prompt_tokens"],
+        "completion_tokens": llm.last["completion_tokens"],
+        "request_bytes": llm.last["request_bytes"],
+        "tasks": probe.tasks,
+        "parse_failures": len(runs) if probe.parse_failed else 0,
+        "runs": len(runs),
+    }
+    for stage in runs[0]:
+        row[stage] = statistics.median(run[stage] for run in runs)
+    row["total_ms_all"] = [run["total_ms"] for run in runs]
+    return row
+
+
+# ---------------------------------------------------------------------------
+# Reporting
+# ---------------------------------------------------------------------------
+
+def bucket_label(tokens):
+    lower = 0
+    for upper in BUCKETS:
+        if tokens < upper:
+            return f"{lower // 1000}k-{upper // 1000}k" if lower else f"<{upper // 1000}k"
+        lower = upper
+    return f">={lower // 1000}k"
+
+
+def summarize(rows):
+    """Aggregate rows per (size bucket, mode), in bucket order"""
+    groups = {}
+    for row in rows:
+        groups.setdefault((bucket_label(row["raw_tokens"]), row["mode"]), []).append(row)
+    order = [bucket_label(0)] + [bucket_label(upper) for upper in BUCKETS]
+    summary = []
+    for (bucket, mode), group in sorted(groups.items(), key=lambda item: (order.index(item[0][0]), item[0][1])):
+        totals = sorted(total for row in group for total in row["total_ms_all"])
+        summary.append({
+            "bucket": bucket,
+            "mode": mode,
+            "transcripts": len(group),
+            "calls": sum(row["runs"] for row in group),
+            "prompt_tokens": statistics.mean(row["prompt_tokens"] for row in group),
+            "serialize_ms": statistics.mean(row["serialize_ms"] for row in group),
+            "preprocess_ms": statistics.mean(row["preprocess_ms"] for row in group),
+            "parse_ms": statistics.mean(row["parse_ms"] for row in group),
+            "parse_failures": sum(row["parse_failures"] for row in group),
+            "tasks": statistics.mean(row["tasks"] for row in group),
+            "p50_ms": percentile(totals, 50),
+            "p95_ms": percentile(totals, 95),
+        })
+    return summary
+
+
+def print_summary(summary):
+    print(f"\n{'size':<9}{'mode':<14}{'calls':>6}{'prompt tok':>11}{'prep ms':>9}{'ser ms':>8}{'parse ms':>9}"
+          f"{'fails':>6}{'tasks':>7}{'p50 ms':>9}{'p95 ms':>9}")
+    for row in summary:
+        print(f"{row['bucket']:<9}{row['mode']:<14}{row['calls']:>6}{row['prompt_tokens']:>11.0f}"
+              f"{row['preprocess_ms']:>9.2f}{row['serialize_ms']:>8.3f}{row['parse_ms']:>9.3f}"
+              f"{row['parse_failures']:>6}{row['tasks']:>7.1f}{row['p50_ms']:>9.1f}{row['p95_ms']:>9.1f}")
+
+
+def scenario_key(row):
+    return (row["transcript"], row["scale"], row["mode"])
+
+
+def compare(rows, baseline_path):
+    with open(baseline_path, encoding="utf-8") as f:
+        baseline = {scenario_key(row): row for row in json.load(f)["results"]}
+    print(f"\nComparison against {baseline_path} (negative is better)")
+    print(f"{'transcript':<44}{'x':>4} {'mode':<14}{'tokens Δ%':>10}{'total Δ%':>10}{'fails Δ':>8}{'tasks Δ':>8}")
+    for row in rows:
+        before = baseline.get(scenario_key(row))
+        if not before:
+            continue
+
+        def pct(new, old):
+            return (new - old) / old * 100 if old else 0.0
+
+        print(f"{row['transcript'][:43]:<44}{row['scale']:>4} {row['mode']:<14}"
+              f"{pct(row['prompt_tokens'], before['prompt_tokens']):>10.1f}"
+              f"{pct(row['total_ms'], before['total_ms']):>10.1f}"
+              f"{row['parse_failures'] - before['parse_failures']:>8}{row['tasks'] - before['tasks']:>8}")
+
+
+def git_revision():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True).strip()
+    except Exception:
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay the transcripts corpus through task extraction")
+    parser.add_argument("--transcripts-dir", default=os.path.join(BASE_DIR, "transcripts"))
+    parser.add_argument("--sample", default=os.path.join(BASE_DIR, "transcript.txt"),
+                        help="sample transcript with a Team: header")
+    parser.add_argument("--scales", default="1,4,16,64", help="comma-separated repetitions of each call")
+    parser.add_argument("--modes", default=",".join(MODES), help="raw, preprocessed or both")
+    parser.add_argument("--repeat", type=int, default=3, help="extractions per transcript, scale and mode")
+    parser.add_argument("--llm-base-ms", type=float, default=50.0, help="stand-in latency per request")
+    parser.add_argument("--llm-ms-per-1k-prompt", type=float, default=25.0, help="stand-in prefill latency")
+    parser.add_argument("--llm-ms-per-output-token", type=float, default=0.2, help="stand-in decode latency")
+    parser.add_argument("--malformed-pct", type=float, default=10.0,
+                        help="share of answers wrapped in markdown fences (by prompt hash)")
+    parser.add_argument("--output", help="write the results to this JSON file")
+    parser.add_argument("--compare", help="baseline results file to diff against")
+    args = parser.parse_args()
+    modes = [mode.strip() for mode in args.modes.split(",") if mode.strip()]
+    if any(mode not in MODES for mode in modes):
+        parser.error(f"--modes must be a subset of {','.join(MODES)}")
+    scales = [int(scale) for scale in args.scales.split(",")]
+    # install_stand_ins reads the upstream latencies; the transcriber is never called here
+    args.transcribe_latency_ms = 0.0
+    args.llm_latency_ms = 0.0
+
+    app_module = install_stand_ins(args)
+    import services
+    import tasksync
+    import transcript_preprocess
+
+    llm = ReplayLLM(transcript_preprocess.count_tokens, args.llm_base_ms, args.llm_ms_per_1k_prompt,
+                    args.llm_ms_per_output_token, args.malformed_pct)
+    services.override('cerebras', llm)
+    probe = PipelineProbe(app_module, tasksync)
+
+    corpus, skipped = load_corpus(args.transcripts_dir, args.sample)
+    print(f"Replaying {len(corpus)} transcripts ({skipped} without speech skipped), scales {scales}, "
+          f"tokens counted with {'tiktoken' if transcript_preprocess.get_encoding() is not None else 'the word estimate'}")
+    rows = []
+    for name, entries, members in corpus:
+        for scale in scales:
+            for mode in modes:
+                row = run_transcript(app_module, probe, llm, name, entries, members, scale, mode, args.repeat)
+                rows.append(row)
+                print(f"  {name[:40]:<41}x{scale:<4}{mode:<14}{row['prompt_tokens']:>7} tok "
+                      f"{row['total_ms']:>8.1f} ms{'  parse failed' if row['parse_failures'] else ''}")
+
+    summary = summarize(rows)
+    print_summary(summary)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"revision": git_revision(), "created_at": datetime.now().isoformat(),
+                       "config": vars(args), "summary": summary, "results": rows}, f, indent=2)
+        print(f"\nResults written to {args.output}")
+    if args.compare:
+        compare(rows, args.compare)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,393 @@
+"""
+Local stand-ins for the external services used by app.py.
+
+Benchmarks install these before importing the application so that a run only
+measures our own handler code plus a configurable, deterministic latency for
+each upstream (AssemblyAI, Cerebras, MongoDB).
+"""
+import copy
+import itertools
+import json
+import threading
+import time
+import wave
+
+
+# ---------------------------------------------------------------------------
+# In-memory MongoDB substitute
+# ---------------------------------------------------------------------------
+
+def _resolve(doc, path):
+    """Return every value reachable through a dotted path, descending into arrays"""
+    values = [doc]
+    for part in path.split("."):
+        next_values = []
+        for value in values:
+            if isinstance(value, dict):
+                if part in value:
+                    next_values.append(value[part])
+            elif isinstance(value, list):
+                if part.isdigit() and int(part) < len(value):
+                    next_values.append(value[int(part)])
+                else:
+                    for item in value:
+                        if isinstance(item, dict) and part in item:
+                            next_values.append(item[part])
+        values = next_values
+    # Arrays match if any element matches, like MongoDB
+    flattened = []
+    for value in values:
+        flattened.append(value)
+        if isinstance(value, list):
+            flattened.extend(value)
+    return flattened
+
+
+def _compare(op, candidate, operand):
+    try:
+        if op == "$eq":
+            return candidate == operand
+        if op == "$ne":
+            return candidate != operand
+        if op == "$gt":
+            return candidate is not None and candidate > operand
+        if op == "$gte":
+            return candidate is not None and candidate >= operand
+        if op == "$lt":
+            return candidate is not None and candidate < operand
+        if op == "$lte":
+            return candidate is not None and candidate <= operand
+        if op == "$in":
+            return candidate in operand
+    except TypeError:
+        return False
+    raise NotImplementedError(f"Unsupported query operator: {op}")
+
+
+def matches(doc, query):
+    for key, condition in query.items():
+        if key == "$or":
+            if not any(matches(doc, sub) for sub in condition):
+                return False
+            continue
+        if key == "$and":
+            if not all(matches(doc, sub) for sub in condition):
+                return False
+            continue
+        values = _resolve(doc, key)
+        if isinstance(condition, dict) and condition and all(k.startswith("$") for k in condition):
+            for op, operand in condition.items():
+                if op == "$exists":
+                    if bool(values) != bool(operand):
+                        return False
+                elif op == "$nin":
+                    if any(v in operand for v in values):
+                        return False
+                elif op == "$ne":
+                    if any(v == operand for v in values):
+                        return False
+                elif not any(_compare(op, v, operand) for v in values):
+                    return False
+        else:
+            if condition is None and not values:
+                continue
+            if not any(v == condition for v in values):
+                return False
+    return True
+
+
+def _project(doc, projection):
+    if not projection:
+        return copy.deepcopy(doc)
+    include = {k for k, v in projection.items() if v and k != "_id"}
+    if not include:
+        result = copy.deepcopy(doc)
+        for key, value in projection.items():
+            if not value:
+                result.pop(key, None)
+        return result
+    result = {}
+    if projection.get("_id", 1) and "_id" in doc:
+        result["_id"] = doc["_id"]
+    for key in include:
+        top = key.split(".")[0]
+        if top in doc:
+            result[top] = copy.deepcopy(doc[top])
+    return result
+
+
+def _set_path(doc, path, value):
+    parts = path.split(".")
+    for part in parts[:-1]:
+        doc = doc.setdefault(part, {})
+    doc[parts[-1]] = value
+
+
+def _get_path(doc, path, default=None):
+    for part in path.split("."):
+        if not isinstance(doc, dict) or part not in doc:
+            return default
+        doc = doc[part]
+    return doc
+
+
+class FakeResult:
+    def __init__(self, matched_count=0, modified_count=0, inserted_id=None, deleted_count=0, upserted_id=None):
+        self.matched_count = matched_count
+        self.modified_count = modified_count
+        self.inserted_id = inserted_id
+        self.deleted_count = deleted_count
+        self.upserted_id = upserted_id
+        self.acknowledged = True
+
+
+class FakeCursor:
+    def __init__(self, docs):
+        self._docs = docs
+
+    def sort(self, key, direction=1):
+        keys = key if isinstance(key, list) else [(key, direction)]
+        for field, order in reversed(keys):
+            self._docs.sort(key=lambda d: (_get_path(d, field) is None, _get_path(d, field)), reverse=order < 0)
+        return self
+
+    def skip(self, count):
+        self._docs = self._docs[count:]
+        return self
+
+    def limit(self, count):
+        if count:
+            self._docs = self._docs[:count]
+        return self
+
+    def __iter__(self):
+        return iter(self._docs)
+
+
+class FakeCollection:
+    def __init__(self, name):
+        self.name = name
+        self.docs = []
+        self.indexes = []
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def create_index(self, keys, **kwargs):
+        self.indexes.append((keys, kwargs))
+        return kwargs.get("name", str(keys))
+
+    def insert_one(self, doc):
+        with self._lock:
+            doc.setdefault("_id", next(self._ids))
+            self.docs.append(copy.deepcopy(doc))
+            return FakeResult(inserted_id=doc["_id"])
+
+    def insert_many(self, docs, ordered=True):
+        for doc in docs:
+            self.insert_one(doc)
+        return FakeResult()
+
+    def find_one(self, query=None, projection=None, **kwargs):
+        with self._lock:
+            for doc in self.docs:
+                if matches(doc, query or {}):
+                    return _project(doc, projection)
+        return None
+
+    def find(self, query=None, projection=None, **kwargs):
+        with self._lock:
+            found = [_project(doc, projection) for doc in self.docs if matches(doc, query or {})]
+        return FakeCursor(found)
+
+    def count_documents(self, query, **kwargs):
+        with self._lock:
+            return sum(1 for doc in self.docs if matches(doc, query))
+
+    def _apply(self, doc, update):
+        for op, fields in update.items():
+            for path, value in fields.items():
+                if op == "$set":
+                    _set_path(doc, path, copy.deepcopy(value))
+                elif op == "$setOnInsert":
+                    continue
+                elif op == "$inc":
+                    _set_path(doc, path, _get_path(doc, path, 0) + value)
+                elif op == "$max":
+                    current = _get_path(doc, path)
+                    if current is None or value > current:
+                        _set_path(doc, path, value)
+                elif op == "$push":
+                    target = _get_path(doc, path)
+                    if target is None:
+                        target = []
+                        _set_path(doc, path, target)
+                    target.append(copy.deepcopy(value))
+                elif op == "$pull":
+                    target = _get_path(doc, path) or []
+                    _set_path(doc, path, [item for item in target if item != value])
+                else:
+                    raise NotImplementedError(f"Unsupported update operator: {op}")
+
+    def update_one(self, query, update, upsert=False):
+        with self._lock:
+            for doc in self.docs:
+                if matches(doc, query):
+                    self._apply(doc, update)
+                    return FakeResult(matched_count=1, modified_count=1)
+            if upsert:
+                doc = {k: v for k, v in query.items() if not k.startswith("$")}
+                self._apply(doc, {k: v for k, v in update.items() if k != "$setOnInsert"})
+                doc.update(copy.deepcopy(update.get("$setOnInsert", {})))
+                doc.setdefault("_id", next(self._ids))
+                self.docs.append(doc)
+                return FakeResult(upserted_id=doc["_id"])
+        return FakeResult()
+
+    def find_one_and_update(self, query, update, projection=None, return_document=False, **kwargs):
+        # return_document is pymongo's ReturnDocument: False (BEFORE) or True (AFTER)
+        with self._lock:
+            for doc in self.docs:
+                if matches(doc, query):
+                    before = _project(doc, projection)
+                    self._apply(doc, update)
+                    return _project(doc, projection) if return_document else before
+        return None
+
+    def update_many(self, query, update, upsert=False):
+        with self._lock:
+            count = 0
+            for doc in self.docs:
+                if matches(doc, query):
+                    self._apply(doc, update)
+                    count += 1
+        return FakeResult(matched_count=count, modified_count=count)
+
+    def delete_many(self, query):
+        with self._lock:
+            keep = [doc for doc in self.docs if not matches(doc, query)]
+            deleted = len(self.docs) - len(keep)
+            self.docs = keep
+        return FakeResult(deleted_count=deleted)
+
+
+class FakeDatabase:
+    def __init__(self, name):
+        self.name = name
+        self._collections = {}
+
+    def __getattr__(self, name):
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return self[name]
+
+    def __getitem__(self, name):
+        if name not in self._collections:
+            self._collections[name] = FakeCollection(name)
+        return self._collections[name]
+
+    def command(self, name, *args, **kwargs):
+        return {"ok": 1.0}
+
+
+class FakeMongoClient:
+    def __init__(self, *args, **kwargs):
+        self._databases = {}
+
+    def __getitem__(self, name):
+        if name not in self._databases:
+            self._databases[name] = FakeDatabase(name)
+        return self._databases[name]
+
+    def close(self):
+        pass
+
+
+# ---------------------------------------------------------------------------
+# AssemblyAI transcriber stand-in
+# ---------------------------------------------------------------------------
+
+class FakeTranscript:
+    def __init__(self, text, words=None):
+        self.status = "completed"
+        self.error = None
+        self.text = text
+        self.words = words or []
+
+
+class FakeWord:
+    def __init__(self, text, start, end):
+        self.text = text
+        self.start = start
+        self.end = end
+
+
+def fake_transcriber_factory(latency_ms=300.0, words_per_second=2.5):
+    """Build a drop-in replacement for aai.Transcriber that sleeps for latency_ms"""
+
+    class FakeTranscriber:
+        calls = 0
+        _lock = threading.Lock()
+
+        def __init__(self, config=None):
+            self.config = config
+
+        def transcribe(self, audio_file_path):
+            with FakeTranscriber._lock:
+                FakeTranscriber.calls += 1
+                call = FakeTranscriber.calls
+            time.sleep(latency_ms / 1000.0)
+            try:
+                # Coalesced jobs are WAV; size the word list to the real duration
+                with wave.open(audio_file_path, "rb") as wav:
+                    seconds = wav.getnframes() / float(wav.getframerate())
+            except (wave.Error, EOFError, OSError):
+                seconds = 4.0
+            words = [FakeWord(f"word{call}_{i}", int(i * 1000 / words_per_second), int((i + 1) * 1000 / words_per_second))
+                     for i in range(int(seconds * words_per_second))]
+            return FakeTranscript(" ".join(w.text for w in words), words)
+
+    return FakeTranscriber
+
+
+# ---------------------------------------------------------------------------
+# Cerebras client stand-in
+# ---------------------------------------------------------------------------
+
+class _Message:
+    def __init__(self, content):
+        self.content = content
+
+
+class _Choice:
+    def __init__(self, content):
+        self.message = _Message(content)
+
+
+class _Completion:
+    def __init__(self, content):
+        self.choices = [_Choice(content)]
+
+
+def fake_cerebras_factory(latency_ms=800.0, responder=None):
+    """
+    Build a drop-in replacement for cerebras.cloud.sdk.Cerebras.
+
+    responder(messages) -> str produces the completion text; by default an empty
+    JSON task list is returned.
+    """
+
+    class FakeCompletions:
+        def create(self, messages, **kwargs):
+            time.sleep(latency_ms / 1000.0)
+            content = responder(messages) if responder else json.dumps([])
+            return _Completion(content)
+
+    class FakeChat:
+        def __init__(self):
+            self.completions = FakeCompletions()
+
+    class FakeCerebras:
+        def __init__(self, *args, **kwargs):
+            self.chat = FakeChat()
+
+    return FakeCerebras
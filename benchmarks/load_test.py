@@ -0,0 +1,426 @@
+"""
+Socket.IO load test for app.py.
+
+Starts the application in-process against local stand-ins (in-memory Mongo,
+fake AssemblyAI transcriber, fake Cerebras client) and drives simulated clients
+through join-room, offer/answer/ice-candidate relays, audio-chunk streams at the
+real 4-second cadence and a final leave storm. Reports p50/p95/p99 handler
+latency and throughput per event.
+
+Audio chunks are real encoded audio, so the VAD and coalescing stages do the same work
+as in production: WebM/Opus like the browser's MediaRecorder (encoded with PyAV, which
+aiortc installs) or WAV, synthesized as speech-like bursts with a silent chunk every
+--pause-every chunks, or the files in --audio-dir. A listener client in every room
+records when each 'new-transcription' arrives, and the "transcription" row is the
+end-to-end latency from the audio-chunk emit to that entry. VAD needs ffmpeg to decode
+WebM (FFMPEG_PATH), so without it synthesized chunks are sent as WAV instead.
+
+Usage:
+    python benchmarks/load_test.py --rooms 10 --speakers 6 --duration 20
+    python benchmarks/load_test.py --rooms 50 --speakers 4 --json bench_output.json
+    python benchmarks/load_test.py --audio-dir recordings/ --duration 60
+"""
+import argparse
+import base64
+import io
+import json
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+import wave
+from collections import defaultdict
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.fakes import FakeMongoClient, fake_transcriber_factory, fake_cerebras_factory
+
+
+SAMPLE_RATE = 16000
+# How often listener clients collect the messages their room received
+LISTEN_INTERVAL = 0.005
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, int(round(pct / 100.0 * (len(sorted_values) - 1)))))
+    return sorted_values[index]
+
+
+class AudioFixture:
+    def __init__(self, name, audio_bytes, audio_format, silent=False):
+        self.name = name
+        self.audio_data = base64.b64encode(audio_bytes).decode("ascii")
+        self.audio_format = audio_format
+        self.silent = silent
+
+
+def speech_like(seconds, rng):
+    """Voiced syllables (a gliding pitch with harmonics) separated by short gaps, at -10 to -20 dBFS"""
+    pcm = np.zeros(int(seconds * SAMPLE_RATE), dtype=np.float32)
+    position = int(rng.uniform(0.05, 0.3) * SAMPLE_RATE)
+    while position < len(pcm):
+        length = min(int(rng.uniform(0.12, 0.35) * SAMPLE_RATE), len(pcm) - position)
+        t = np.arange(length) / SAMPLE_RATE
+        pitch = rng.uniform(100, 220) * (1 + 0.1 * t / max(t[-1], 1e-3))
+        phase = 2 * np.pi * np.cumsum(pitch) / SAMPLE_RATE
+        syllable = sum(np.sin(k * phase) / k for k in range(1, 6)) * np.hanning(length)
+        pcm[position:position + length] = rng.uniform(0.1, 0.3) * syllable / 2
+        position += length + int(rng.uniform(0.04, 0.2) * SAMPLE_RATE)
+    return pcm + rng.normal(0, 0.001, len(pcm)).astype(np.float32)
+
+
+def room_tone(seconds, rng):
+    """Microphone noise with nobody speaking"""
+    return rng.normal(0, 0.001, int(seconds * SAMPLE_RATE)).astype(np.float32)
+
+
+def encode_wav(pcm):
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(SAMPLE_RATE)
+        wav.writeframes((np.clip(pcm, -1, 1) * 32767).astype(np.int16).tobytes())
+    return buffer.getvalue()
+
+
+def encode_webm(pcm):
+    """One self-contained WebM/Opus file, like each chunk the client's MediaRecorder produces"""
+    import av
+
+    buffer = io.BytesIO()
+    with av.open(buffer, "w", format="webm") as container:
+        stream = container.add_stream("libopus", rate=48000)
+        stream.layout = "mono"
+        frame = av.AudioFrame.from_ndarray((np.clip(pcm, -1, 1) * 32767).astype(np.int16)[None, :],
+                                           format="s16", layout="mono")
+        frame.sample_rate = SAMPLE_RATE
+        for packet in stream.encode(frame):
+            container.mux(packet)
+        for packet in stream.encode(None):
+            container.mux(packet)
+    return buffer.getvalue()
+
+
+def build_fixtures(args):
+    """
+    The chunks each speaker cycles through.
+
+    Returns:
+        List[AudioFixture]: the files in --audio-dir, or synthesized speech with a silent
+        chunk every --pause-every chunks
+    """
+    if args.audio_dir:
+        fixtures = []
+        for name in sorted(os.listdir(args.audio_dir)):
+            path = os.path.join(args.audio_dir, name)
+            if os.path.isfile(path):
+                with open(path, "rb") as f:
+                    fixtures.append(AudioFixture(name, f.read(), os.path.splitext(name)[1].lstrip(".") or "wav"))
+        if not fixtures:
+            raise SystemExit(f"No audio files in {args.audio_dir}")
+        return fixtures
+
+    import vad
+
+    audio_format = args.audio_format
+    if audio_format == "webm":
+        try:
+            import av  # noqa: F401
+        except ImportError:
+            print("PyAV is not installed; sending WAV chunks instead of WebM/Opus")
+            audio_format = "wav"
+        else:
+            if not vad.FFMPEG_PATH:
+                print("ffmpeg not found (set FFMPEG_PATH); sending WAV chunks, which VAD decodes without it")
+                audio_format = "wav"
+    encode = encode_webm if audio_format == "webm" else encode_wav
+    rng = np.random.default_rng(0)
+    fixtures = []
+    for i in range(max(args.pause_every, 1)):
+        if args.pause_every and i == args.pause_every - 1:
+            fixtures.append(AudioFixture(f"silence{i}", encode(room_tone(args.cadence, rng)), audio_format, True))
+        else:
+            fixtures.append(AudioFixture(f"speech{i}", encode(speech_like(args.cadence, rng)), audio_format))
+    return fixtures
+
+
+class Recorder:
+    """Thread-safe collection of handler latencies per event name"""
+
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)
+        self.messages_received = 0
+        self.chunks_sent = 0
+        self.silent_chunks_sent = 0
+        self.unmatched_transcriptions = 0
+        self._sent_at = {}  # {(room, speaker, timestamp): perf_counter at emit}
+        self._lock = threading.Lock()
+
+    def audio_sent(self, room, speaker, timestamp, started, silent):
+        with self._lock:
+            self.chunks_sent += 1
+            self.silent_chunks_sent += silent
+            self._sent_at[(room, speaker, timestamp)] = started
+
+    def listen(self, client, room):
+        """Collect what a listener client received, timing each new-transcription against its chunk's emit"""
+        received_at = time.perf_counter()
+        messages = client.get_received()
+        with self._lock:
+            self.messages_received += len(messages)
+            for message in messages:
+                if message["name"] != "new-transcription":
+                    continue
+                entry = message["args"][0]
+                started = self._sent_at.pop((room, entry["speaker"], entry["timestamp"]), None)
+                if started is None:
+                    self.unmatched_transcriptions += 1
+                else:
+                    self.latencies["transcription"].append(received_at - started)
+
+    def transcription_summary(self):
+        with self._lock:
+            transcribed = len(self.latencies["transcription"])
+            return {
+                "chunks_sent": self.chunks_sent,
+                "silent_chunks_sent": self.silent_chunks_sent,
+                "transcribed": transcribed,
+                "not_transcribed": len(self._sent_at),
+                "unmatched": self.unmatched_transcriptions,
+            }
+
+    def drain(self, client):
+        """Discard the messages a client has received so far, counting them"""
+        count = len(client.get_received())
+        with self._lock:
+            self.messages_received += count
+
+    def timed_emit(self, client, event, *args):
+        """Emit an event and record how long its handler took; returns the start time, or None on error"""
+        started = time.perf_counter()
+        try:
+            client.emit(event, *args)
+        except Exception:
+            with self._lock:
+                self.errors[event] += 1
+            return None
+        elapsed = time.perf_counter() - started
+        with self._lock:
+            self.latencies[event].append(elapsed)
+        return started
+
+    def summary(self, wall_seconds):
+        rows = {}
+        for event, values in sorted(self.latencies.items()):
+            ordered = sorted(values)
+            rows[event] = {
+                "count": len(ordered),
+                "errors": self.errors.get(event, 0),
+                "p50_ms": percentile(ordered, 50) * 1000,
+                "p95_ms": percentile(ordered, 95) * 1000,
+                "p99_ms": percentile(ordered, 99) * 1000,
+                "max_ms": ordered[-1] * 1000 if ordered else 0.0,
+                "throughput_per_s": len(ordered) / wall_seconds if wall_seconds else 0.0,
+            }
+        return rows
+
+
+def install_stand_ins(args):
+    """Point every external dependency of app.py at a local stand-in, then import app"""
+    os.environ.setdefault("SOCKETIO_ASYNC_MODE", "threading")
+    os.environ.setdefault("LOG_LEVEL", "WARNING")
+    # Every simulated client shares one address, so per-address budgets would reject most events
+    os.environ.setdefault("RATE_LIMIT_ENABLED", "true" if getattr(args, "rate_limit", False) else "false")
+    os.environ["TRANSCRIPTS_DIR"] = tempfile.mkdtemp(prefix="tasksync-bench-")
+
+    import assemblyai
+    import services
+
+    services.override('mongo', FakeMongoClient())
+    services.override('cerebras', fake_cerebras_factory(args.llm_latency_ms)())
+    services.override('assemblyai', assemblyai)
+    assemblyai.Transcriber = fake_transcriber_factory(args.transcribe_latency_ms)
+    assemblyai.TranscriptionConfig = lambda **kwargs: kwargs
+    if not hasattr(assemblyai, "SpeechModel"):
+        # Older SDK pins predate SpeechModel; the stand-in only needs the attribute to exist
+        assemblyai.SpeechModel = type("SpeechModel", (), {"universal": "universal"})
+
+    import app
+    return app
+
+
+def seed_rooms(app_module, room_names, speakers):
+    import db
+    for room_name in room_names:
+        db.get_db().rooms.insert_one({
+            "room_code": room_name,
+            "room_name": room_name,
+            "owner": "user0",
+            "members": [{"username": f"user{i}", "tasks": [], "role": "host" if i == 0 else "member"}
+                        for i in range(speakers)],
+        })
+
+
+def run_room(app_module, recorder, room_name, args, fixtures, start_barrier, leave_barrier):
+    socketio, flask_app = app_module.socketio, app_module.app
+    # Receives the room's broadcasts on its own thread so transcriptions are timed when they arrive
+    listener = socketio.test_client(flask_app)
+    listener.emit("join-room", {"room": room_name, "name": "listener"})
+    listener.get_received()
+    listening = threading.Event()
+    listening.set()
+
+    def listen():
+        while listening.is_set():
+            recorder.listen(listener, room_name)
+            time.sleep(LISTEN_INTERVAL)
+
+    listener_thread = threading.Thread(target=listen, daemon=True)
+    listener_thread.start()
+
+    clients = [socketio.test_client(flask_app) for _ in range(args.speakers)]
+    sids = []
+    for i, client in enumerate(clients):
+        recorder.timed_emit(client, "join-room", {"room": room_name, "name": f"user{i}"})
+        sids.append(client.eio_sid and socketio.server.manager.sid_from_eio_sid(client.eio_sid, "/"))
+
+    # Full-mesh signaling: each pair exchanges an offer, an answer and a burst of ICE candidates
+    for i in range(len(clients)):
+        for j in range(i + 1, len(clients)):
+            recorder.timed_emit(clients[i], "offer", {"userId": sids[j], "offer": {"type": "offer", "sdp": "v=0"}})
+            recorder.timed_emit(clients[j], "answer", {"userId": sids[i], "answer": {"type": "answer", "sdp": "v=0"}})
+            for k in range(args.ice_candidates):
+                candidate = {"candidate": f"candidate:{k} 1 udp 2122260223 10.0.0.{k} 5000{k} typ host",
+                             "sdpMid": "0", "sdpMLineIndex": 0}
+                recorder.timed_emit(clients[i], "ice-candidate", {"userId": sids[j], "candidate": candidate})
+                recorder.timed_emit(clients[j], "ice-candidate", {"userId": sids[i], "candidate": candidate})
+
+    start_barrier.wait()
+
+    def speak(index, client):
+        # Stagger speakers so chunks do not all arrive in the same instant
+        time.sleep(random.uniform(0, args.cadence))
+        deadline = time.monotonic() + args.duration
+        speaker = f"user{index}"
+        chunk = index  # Speakers start at different points of the fixture cycle
+        while time.monotonic() < deadline:
+            fixture = fixtures[chunk % len(fixtures)]
+            timestamp = int(time.time() * 1000)
+            started = recorder.timed_emit(client, "audio-chunk", {
+                "audioData": fixture.audio_data,
+                "speaker": speaker,
+                "timestamp": timestamp,
+                "format": fixture.audio_format,
+            })
+            if started is not None:
+                recorder.audio_sent(room_name, speaker, timestamp, started, fixture.silent)
+            recorder.drain(client)
+            chunk += 1
+            time.sleep(args.cadence)
+
+    threads = [threading.Thread(target=speak, args=(i, c), daemon=True) for i, c in enumerate(clients)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    # Leave storm: every client in every room leaves at once
+    leave_barrier.wait()
+    for client in clients:
+        recorder.timed_emit(client, "leave-room", room_name)
+        recorder.drain(client)
+    for client in clients:
+        client.disconnect()
+
+    # Leaving flushed every speaker's buffered audio; wait for it to be transcribed and delivered
+    deadline = time.monotonic() + args.drain_timeout
+    while not app_module.audio_queue.room_idle(room_name) and time.monotonic() < deadline:
+        time.sleep(0.05)
+    time.sleep(0.1)
+    listening.clear()
+    listener_thread.join()
+    recorder.listen(listener, room_name)
+    listener.disconnect()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Socket.IO load test for app.py")
+    parser.add_argument("--rooms", type=int, default=5)
+    parser.add_argument("--speakers", type=int, default=4, help="clients per room")
+    parser.add_argument("--duration", type=float, default=12.0, help="seconds of audio streaming")
+    parser.add_argument("--cadence", type=float, default=4.0, help="seconds between audio chunks per speaker")
+    parser.add_argument("--audio-format", choices=("webm", "wav"), default="webm",
+                        help="encoding of the synthesized chunks (webm needs PyAV)")
+    parser.add_argument("--audio-dir", help="send the audio files in this directory instead of synthesized chunks")
+    parser.add_argument("--pause-every", type=int, default=3,
+                        help="every Nth synthesized chunk is silence (0 for none)")
+    parser.add_argument("--drain-timeout", type=float, default=30.0,
+                        help="seconds to wait after the leave storm for the last transcriptions")
+    parser.add_argument("--ice-candidates", type=int, default=4, help="ICE candidates per peer per direction")
+    parser.add_argument("--transcribe-latency-ms", type=float, default=300.0)
+    parser.add_argument("--llm-latency-ms", type=float, default=800.0)
+    parser.add_argument("--rate-limit", action="store_true", help="keep the per-client rate limiter enabled")
+    parser.add_argument("--json", help="write the results to this file")
+    args = parser.parse_args()
+
+    app_module = install_stand_ins(args)
+    fixtures = build_fixtures(args)
+    import vad
+    if not vad.FFMPEG_PATH and any(fixture.audio_format != "wav" for fixture in fixtures):
+        print("ffmpeg not found (set FFMPEG_PATH): non-WAV chunks from --audio-dir will not be decoded, "
+              "so VAD and coalescing are bypassed for them")
+    room_names = [f"BENCH{i:03d}" for i in range(args.rooms)]
+    seed_rooms(app_module, room_names, args.speakers)
+
+    recorder = Recorder()
+    start_barrier = threading.Barrier(args.rooms)
+    leave_barrier = threading.Barrier(args.rooms)
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=run_room,
+                                args=(app_module, recorder, name, args, fixtures, start_barrier, leave_barrier),
+                                daemon=True)
+               for name in room_names]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    wall_seconds = time.perf_counter() - started
+
+    results = {
+        "config": vars(args),
+        "wall_seconds": wall_seconds,
+        "messages_received": recorder.messages_received,
+        "events": recorder.summary(wall_seconds),
+        "transcription": recorder.transcription_summary(),
+        "pipeline": {"vad": vad.stats.to_dict(), "coalescer": app_module.coalescer.stats()},
+    }
+
+    print(f"{args.rooms} rooms x {args.speakers} speakers, {wall_seconds:.1f}s wall, "
+          f"{recorder.messages_received} messages delivered")
+    print(f"{'event':<16}{'count':>8}{'err':>6}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'max ms':>10}{'ev/s':>10}")
+    for event, row in results["events"].items():
+        print(f"{event:<16}{row['count']:>8}{row['errors']:>6}{row['p50_ms']:>10.2f}{row['p95_ms']:>10.2f}"
+              f"{row['p99_ms']:>10.2f}{row['max_ms']:>10.2f}{row['throughput_per_s']:>10.1f}")
+    transcription = results["transcription"]
+    print(f"audio chunks: {transcription['chunks_sent']} sent ({transcription['silent_chunks_sent']} silent), "
+          f"{transcription['transcribed']} transcribed, {transcription['not_transcribed']} not transcribed")
+    print(f"vad: {json.dumps(results['pipeline']['vad'], default=str)}")
+    print(f"coalescer: {json.dumps(results['pipeline']['coalescer'], default=str)}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"Results written to {args.json}")
+
+
+if __name__ == "__main__":
+    main()
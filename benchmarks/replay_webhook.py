@@ -0,0 +1,73 @@
+"""
+Send recorded GitHub webhook payloads to a local server, signed like GitHub signs them.
+
+Replays a push (or any event) payload against /github/webhook, optionally several times
+in quick succession to exercise the per-branch debouncing.
+
+Usage:
+    python benchmarks/replay_webhook.py --secret "$GITHUB_WEBHOOK_SECRET"
+    python benchmarks/replay_webhook.py benchmarks/payloads/github_push.json --count 5 --interval 0.5
+    python benchmarks/replay_webhook.py --repo my-org/my-repo --branch feature-x
+"""
+import argparse
+import json
+import os
+import sys
+import time
+import uuid
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import requests
+from github_webhook import sign
+
+DEFAULT_PAYLOAD = os.path.join(os.path.dirname(os.path.abspath(__file__)), "payloads", "github_push.json")
+
+
+def load_payload(path, repo=None, branch=None):
+    with open(path, encoding="utf-8") as f:
+        payload = json.load(f)
+    if repo:
+        payload.setdefault("repository", {})["full_name"] = repo
+        payload["repository"]["name"] = repo.split("/", 1)[-1]
+    if branch:
+        payload["ref"] = f"refs/heads/{branch}"
+    return payload
+
+
+def deliver(url, secret, event, payload):
+    body = json.dumps(payload).encode("utf-8")
+    headers = {
+        "Content-Type": "application/json",
+        "X-GitHub-Event": event,
+        "X-GitHub-Delivery": str(uuid.uuid4()),
+        "X-Hub-Signature-256": sign(secret, body),
+    }
+    return requests.post(url, data=body, headers=headers, timeout=10)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay signed GitHub webhook deliveries")
+    parser.add_argument("payloads", nargs="*", default=[DEFAULT_PAYLOAD], help="recorded payload JSON files")
+    parser.add_argument("--url", default="http://localhost:5001/github/webhook")
+    parser.add_argument("--secret", default=os.getenv("GITHUB_WEBHOOK_SECRET"))
+    parser.add_argument("--event", default="push")
+    parser.add_argument("--repo", help="override repository.full_name")
+    parser.add_argument("--branch", help="override the pushed branch")
+    parser.add_argument("--count", type=int, default=1, help="deliveries per payload")
+    parser.add_argument("--interval", type=float, default=0.2, help="seconds between deliveries")
+    args = parser.parse_args()
+    if not args.secret:
+        parser.error("--secret or GITHUB_WEBHOOK_SECRET is required")
+
+    for path in args.payloads:
+        payload = load_payload(path, args.repo, args.branch)
+        for i in range(args.count):
+            response = deliver(args.url, args.secret, args.event, payload)
+            print(f"{os.path.basename(path)} #{i + 1}: {response.status_code} {response.text.strip()}")
+            if i + 1 < args.count:
+                time.sleep(args.interval)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,178 @@
+"""
+Smoke test for SFU rooms with local WebRTC peers.
+
+Starts N aiortc peers that join one room on a running `python async_app.py` with ?sfu=1
+semantics, publish a synthetic tone (and optionally video) and follow the server's
+renegotiation offers. Passes when every peer receives media from every other peer,
+then reports how long that took and the server's /stats "sfu" counters. The tone is
+also transcribed if AssemblyAI is configured on the server (it will usually be VAD-skipped).
+
+Requires aiortc (pip install aiortc) on both sides.
+
+Usage:
+    python benchmarks/sfu_smoke.py --peers 8
+    python benchmarks/sfu_smoke.py --url http://localhost:5001 --peers 12 --video --timeout 60
+"""
+import argparse
+import asyncio
+import fractions
+import json
+import math
+import os
+import sys
+import time
+import uuid
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+import requests
+import socketio
+from av import AudioFrame
+from aiortc import RTCPeerConnection, RTCSessionDescription, RTCConfiguration
+from aiortc.mediastreams import AudioStreamTrack, VideoStreamTrack, MediaStreamError
+
+SAMPLE_RATE = 48000
+FRAME_SAMPLES = 960  # 20 ms
+
+
+class ToneTrack(AudioStreamTrack):
+    """A sine tone, distinct per peer"""
+
+    def __init__(self, frequency):
+        super().__init__()
+        self.frequency = frequency
+        self.samples = 0
+
+    async def recv(self):
+        await asyncio.sleep(FRAME_SAMPLES / SAMPLE_RATE)
+        t = (np.arange(FRAME_SAMPLES) + self.samples) / SAMPLE_RATE
+        pcm = (0.3 * np.sin(2 * math.pi * self.frequency * t) * 32767).astype(np.int16)
+        frame = AudioFrame.from_ndarray(pcm.reshape(1, -1), format="s16", layout="mono")
+        frame.sample_rate = SAMPLE_RATE
+        frame.pts = self.samples
+        frame.time_base = fractions.Fraction(1, SAMPLE_RATE)
+        self.samples += FRAME_SAMPLES
+        return frame
+
+
+class SmokePeer:
+    def __init__(self, index, url, room, video):
+        self.index = index
+        self.url = url
+        self.room = room
+        self.video = video
+        self.sio = socketio.AsyncClient()
+        self.pc = RTCPeerConnection(RTCConfiguration(iceServers=[]))
+        self.tracks = {}  # {mid: userId}
+        self.receiving = set()  # (userId, kind) with at least one decoded frame
+        self.renegotiations = 0
+        self.signaling = asyncio.Lock()
+        self.mode = None
+
+    async def start(self):
+        self.pc.addTrack(ToneTrack(220 + 40 * self.index))
+        if self.video:
+            self.pc.addTrack(VideoStreamTrack())
+
+        @self.pc.on("track")
+        def on_track(track):
+            asyncio.ensure_future(self.consume(track))
+
+        @self.sio.on('room-mode')
+        async def on_room_mode(data):
+            self.mode = data["mode"]
+            if self.mode == 'sfu':
+                await self.pc.setLocalDescription(await self.pc.createOffer())
+                await self.sio.emit('sfu-offer', {"offer": {"sdp": self.pc.localDescription.sdp,
+                                                            "type": self.pc.localDescription.type}})
+
+        @self.sio.on('sfu-answer')
+        async def on_sfu_answer(data):
+            async with self.signaling:
+                self.tracks = data.get("tracks") or {}
+                await self.pc.setRemoteDescription(RTCSessionDescription(**data["answer"]))
+
+        @self.sio.on('sfu-offer')
+        async def on_sfu_offer(data):
+            async with self.signaling:
+                self.renegotiations += 1
+                self.tracks = data.get("tracks") or {}
+                await self.pc.setRemoteDescription(RTCSessionDescription(**data["offer"]))
+                await self.pc.setLocalDescription(await self.pc.createAnswer())
+                await self.sio.emit('sfu-answer', {"answer": {"sdp": self.pc.localDescription.sdp,
+                                                              "type": self.pc.localDescription.type}})
+
+        await self.sio.connect(self.url, transports=['websocket'])
+        await self.sio.emit('join-room', {"room": self.room, "name": f"peer-{self.index}", "sfu": True})
+
+    async def consume(self, track):
+        mid = next((t.mid for t in self.pc.getTransceivers() if t.receiver.track is track), None)
+        while True:
+            try:
+                await track.recv()
+            except MediaStreamError:
+                return
+            # The mid map may arrive with a later offer than the track itself
+            user_id = self.tracks.get(mid)
+            if user_id:
+                self.receiving.add((user_id, track.kind))
+
+    def senders(self, kind):
+        return {user_id for user_id, track_kind in self.receiving if track_kind == kind}
+
+    async def stop(self):
+        await self.pc.close()
+        await self.sio.disconnect()
+
+
+async def run(args):
+    room = f"sfu-smoke-{uuid.uuid4().hex[:8]}"
+    peers = [SmokePeer(i, args.url, room, args.video) for i in range(args.peers)]
+    started = time.perf_counter()
+    for peer in peers:
+        await peer.start()
+    kinds = ["audio", "video"] if args.video else ["audio"]
+
+    complete = False
+    deadline = started + args.timeout
+    while time.perf_counter() < deadline:
+        ids = {peer.sio.get_sid() for peer in peers}
+        complete = all(peer.senders(kind) >= ids - {peer.sio.get_sid()} for peer in peers for kind in kinds)
+        if complete:
+            break
+        await asyncio.sleep(0.25)
+    elapsed = time.perf_counter() - started
+
+    if peers[0].mode != 'sfu':
+        print(f"Server answered room-mode {peers[0].mode!r}; is aiortc installed on the server and "
+              f"are you running async_app.py?")
+    for peer in peers:
+        received = {kind: len(peer.senders(kind)) for kind in kinds}
+        print(f"peer-{peer.index}: receiving {received} of {args.peers - 1}, "
+              f"{peer.renegotiations} renegotiations")
+    print(f"{'OK' if complete else 'INCOMPLETE'}: {args.peers} peers fully connected in {elapsed:.1f}s")
+
+    try:
+        stats = requests.get(args.url.rstrip('/') + '/stats', timeout=5).json()
+        print(json.dumps(stats.get("sfu", {}).get(room, {}), indent=2))
+    except Exception as e:
+        print(f"Could not read /stats: {e}")
+
+    for peer in peers:
+        await peer.stop()
+    return 0 if complete else 1
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Connect local WebRTC peers to an SFU room")
+    parser.add_argument("--url", default="http://localhost:5001")
+    parser.add_argument("--peers", type=int, default=4)
+    parser.add_argument("--video", action="store_true", help="publish a video track too")
+    parser.add_argument("--timeout", type=float, default=30.0)
+    args = parser.parse_args()
+    sys.exit(asyncio.run(run(args)))
+
+
+if __name__ == "__main__":
+    main()
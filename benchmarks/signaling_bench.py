@@ -0,0 +1,136 @@
+"""
+Join-time signaling benchmark for app.py.
+
+For each room size, N simulated clients join one room and every pair then goes through the
+mesh handshake at once: an offer, an answer and a trickle of ICE candidates in each direction.
+Candidates are sent either one event per candidate ("single", as older clients do) or one
+'ice-candidates' event per peer ("batched", as index.html does). Reports the events the
+server handled, the messages it delivered, how long the burst took to send and until every
+candidate was delivered, and candidate throughput.
+
+Usage:
+    python benchmarks/signaling_bench.py --sizes 2,4,8,12,16,20 --candidates 6
+    python benchmarks/signaling_bench.py --window-ms 0 --json no_window.json
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.load_test import install_stand_ins
+
+MODES = ("single", "batched")
+CANDIDATE_EVENTS = ("ice-candidate", "ice-candidates")
+
+
+def make_candidate(k):
+    return {"candidate": f"candidate:{k} 1 udp 2122260223 10.0.0.{k % 250} {50000 + k} typ host",
+            "sdpMid": "0", "sdpMLineIndex": 0}
+
+
+def count_delivered(client):
+    """(messages, candidates) of candidate relays in what the client has received since the last call"""
+    messages = candidates = 0
+    for packet in client.get_received():
+        if packet["name"] == "ice-candidate":
+            messages += 1
+            candidates += 1
+        elif packet["name"] == "ice-candidates":
+            messages += 1
+            candidates += len(packet["args"][0]["candidates"])
+    return messages, candidates
+
+
+def run_room(app_module, size, mode, args):
+    socketio, flask_app = app_module.socketio, app_module.app
+    room_name = f"SIGNAL-{mode}-{size}"
+    clients = [socketio.test_client(flask_app) for _ in range(size)]
+    sids = []
+    for i, client in enumerate(clients):
+        client.emit("join-room", {"room": room_name, "name": f"user{i}"})
+        sids.append(socketio.server.manager.sid_from_eio_sid(client.eio_sid, "/"))
+    for client in clients:
+        client.get_received()
+
+    candidates = [make_candidate(k) for k in range(args.candidates)]
+    events = 0
+    started = time.perf_counter()
+    for i in range(size):
+        for j in range(i + 1, size):
+            clients[i].emit("offer", {"userId": sids[j], "offer": {"type": "offer", "sdp": "v=0"}})
+            clients[j].emit("answer", {"userId": sids[i], "answer": {"type": "answer", "sdp": "v=0"}})
+            events += 2
+            for sender, target in ((i, j), (j, i)):
+                if mode == "batched":
+                    clients[sender].emit("ice-candidates", {"userId": sids[target], "candidates": candidates})
+                    events += 1
+                else:
+                    for candidate in candidates:
+                        clients[sender].emit("ice-candidate", {"userId": sids[target], "candidate": candidate})
+                        events += 1
+    burst_seconds = time.perf_counter() - started
+
+    # Batches are relayed from background tasks once their window closes
+    expected = size * (size - 1) * args.candidates
+    delivered_messages = delivered_candidates = 0
+    deadline = time.perf_counter() + args.timeout
+    while delivered_candidates < expected and time.perf_counter() < deadline:
+        for client in clients:
+            messages, count = count_delivered(client)
+            delivered_messages += messages
+            delivered_candidates += count
+        if delivered_candidates < expected:
+            time.sleep(0.001)
+    total_seconds = time.perf_counter() - started
+
+    for client in clients:
+        client.disconnect()
+    return {
+        "peers": size,
+        "mode": mode,
+        "events_in": events,
+        "candidate_messages_out": delivered_messages,
+        "candidates_delivered": delivered_candidates,
+        "candidates_expected": expected,
+        "burst_ms": burst_seconds * 1000,
+        "delivered_ms": total_seconds * 1000,
+        "candidates_per_s": delivered_candidates / total_seconds if total_seconds else 0.0,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Join-time signaling benchmark for app.py")
+    parser.add_argument("--sizes", default="2,4,8,12,16,20", help="comma-separated peers per room")
+    parser.add_argument("--candidates", type=int, default=6, help="ICE candidates per peer per direction")
+    parser.add_argument("--window-ms", type=float, help="override ICE_BATCH_WINDOW_MS")
+    parser.add_argument("--timeout", type=float, default=10.0, help="seconds to wait for delivery")
+    parser.add_argument("--json", help="write the results to this file")
+    args = parser.parse_args()
+    if args.window_ms is not None:
+        os.environ["ICE_BATCH_WINDOW_MS"] = str(args.window_ms)
+    # install_stand_ins reads the upstream latencies; signaling never reaches them
+    args.transcribe_latency_ms = args.llm_latency_ms = 0.0
+
+    app_module = install_stand_ins(args)
+    results = [run_room(app_module, int(size), mode, args)
+               for size in args.sizes.split(",") for mode in MODES]
+
+    print(f"ICE batch window {app_module.ICE_BATCH_WINDOW_MS:g} ms, {args.candidates} candidates per direction")
+    print(f"{'peers':>5} {'mode':<8}{'events in':>10}{'msgs out':>10}{'burst ms':>10}{'deliv ms':>10}{'cand/s':>10}")
+    for row in results:
+        missing = "" if row["candidates_delivered"] == row["candidates_expected"] else \
+            f"  ({row['candidates_expected'] - row['candidates_delivered']} missing)"
+        print(f"{row['peers']:>5} {row['mode']:<8}{row['events_in']:>10}{row['candidate_messages_out']:>10}"
+              f"{row['burst_ms']:>10.1f}{row['delivered_ms']:>10.1f}{row['candidates_per_s']:>10.0f}{missing}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"config": vars(args), "results": results}, f, indent=2)
+        print(f"Results written to {args.json}")
+
+
+if __name__ == "__main__":
+    main()
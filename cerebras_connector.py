@@ -1,22 +1,16 @@
-import os
-from cerebras.cloud.sdk import Cerebras
+import time
 from dotenv import load_dotenv
+from logger import get_logger
+import services
 
 # Load environment variables
 load_dotenv()
 
-# Get API key from environment
-api_key = os.getenv('CEREBRAS_API_KEY')
-if not api_key:
-    raise ValueError("CEREBRAS_API_KEY environment variable is required")
+logger = get_logger(__name__)
 
-client = Cerebras(
-    api_key=api_key
-)
 
-
-def send_message(message: str, system_prompt: str, model: str = "qwen-3-coder-480b") -> str:
-    response = client.chat.completions.create(
+def _completion_request(message: str, system_prompt: str, model: str) -> dict:
+    return dict(
         messages=[
             {"role": "system", "content": system_prompt},
             {
@@ -31,5 +25,29 @@ def send_message(message: str, system_prompt: str, model: str = "qwen-3-coder-48
         top_p=0.8
     )
 
-    return response.choices[0].message.content
 
+def _log_completion(model: str, started: float, message: str, content: str):
+    logger.debug("Cerebras %s completion in %.3fs", model, time.perf_counter() - started,
+                 extra={"fields": {"prompt_chars": len(message), "response_chars": len(content or "")}})
+
+
+def send_message(message: str, system_prompt: str, model: str = "qwen-3-coder-480b") -> str:
+    started = time.perf_counter()
+    # The Cerebras client is created on first use (requires CEREBRAS_API_KEY)
+    client = services.get('cerebras')
+    response = client.chat.completions.create(**_completion_request(message, system_prompt, model))
+
+    content = response.choices[0].message.content
+    _log_completion(model, started, message, content)
+    return content
+
+
+async def send_message_async(message: str, system_prompt: str, model: str = "qwen-3-coder-480b") -> str:
+    """Async version of send_message for the asyncio server mode"""
+    started = time.perf_counter()
+    client = services.get('cerebras_async')
+    response = await client.chat.completions.create(**_completion_request(message, system_prompt, model))
+
+    content = response.choices[0].message.content
+    _log_completion(model, started, message, content)
+    return content
@@ -1,217 +1,263 @@
-from pymongo import MongoClient
-import uuid
-import os
 from datetime import datetime
 from dotenv import load_dotenv
+from pymongo import ReturnDocument
+from logger import get_logger
+from db_common import (MONGO_DB_NAME, INDEXES, BACKFILL_MIGRATION, BACKFILL_ROOM_PROJECTION, MEMBERSHIP_PROJECTION,
+                       MEMBERSHIP_SORT, TASK_PROJECTION, TASK_SORT, generate_room_code, new_member, join_room_query,
+                       new_room_document, membership_document, normalize_members, get_member_usernames,
+                       user_rooms_query, task_creation_error, new_task, members_with_task, task_document,
+                       backfill_membership_updates, backfill_task_updates, task_page_size, build_task_query,
+                       is_paginated, page_tasks)
+import services
 
 load_dotenv()
 
-MONGO_URI = os.getenv('MONGO_URI')
-if not MONGO_URI:
-    raise ValueError("MONGO_URI environment variable is required")
+logger = get_logger(__name__)
 
-client = MongoClient(MONGO_URI)
-db = client['rooms_db']
+_indexes_ready = False
 
-try:
-    db.command("ping")
-    print("MongoDB connection: SUCCESS")
-except Exception as e:
-    print("MongoDB connection: FAILED", e)
 
+def get_db():
+    """Return the rooms database; the MongoClient is created (and indexes ensured) on first use"""
+    database = services.get('mongo')[MONGO_DB_NAME]
+    if not _indexes_ready:
+        ensure_indexes(database)
+    return database
 
-def generate_room_code():
-    return uuid.uuid4().hex[:6].upper()
 
+def ensure_indexes(database=None):
+    """Create the collection indexes; create_index is a no-op for indexes that already exist"""
+    global _indexes_ready
+    database = database if database is not None else services.get('mongo')[MONGO_DB_NAME]
+    for collection, indexes in INDEXES.items():
+        for keys, options in indexes:
+            database[collection].create_index(keys, **options)
+    _indexes_ready = True
+    ensure_backfilled(database)
 
-def normalize_members(members):
-    """Convert legacy string members to object format"""
-    normalized = []
-    for member in members:
-        if isinstance(member, str):
-            # Legacy format: convert string to object
-            normalized.append({
-                "username": member,
-                "tasks": [],
-                "role": "member"
-            })
-        elif isinstance(member, dict):
-            # Already in correct format
-            normalized.append(member)
-    return normalized
 
-
-def get_member_usernames(members):
-    """Safely extract usernames from members array"""
-    usernames = []
-    for member in members:
-        if isinstance(member, str):
-            usernames.append(member)
-        elif isinstance(member, dict) and "username" in member:
-            usernames.append(member["username"])
-    return usernames
+def ensure_backfilled(database):
+    """
+    Copy rooms created before the memberships and tasks collections existed into them, once per
+    database. The backfills only upsert, so two servers starting together just repeat the work.
+    """
+    if database.migrations.find_one({"_id": BACKFILL_MIGRATION}) is not None:
+        return
+    backfill_memberships(database)
+    backfill_tasks(database)
+    database.migrations.update_one({"_id": BACKFILL_MIGRATION}, {"$set": {"completed_at": datetime.utcnow()}},
+                                   upsert=True)
 
 
 def create_room(owner, room_name):
     for _ in range(5):
         room_code = generate_room_code()
-        if not db.rooms.find_one({"room_code": room_code}):
-            room = {
-                "room_code": room_code,
-                "room_name": room_name,
-                "owner": owner,
-                "members": [
-                    {
-                        "username": owner,
-                        "tasks": [],
-                        "role": "host"
-                    }
-                ],
-                "created_at": datetime.utcnow()
-            }
+        if not get_db().rooms.find_one({"room_code": room_code}):
+            room = new_room_document(room_code, owner, room_name)
             try:
-                db.rooms.insert_one(room)
+                get_db().rooms.insert_one(room)
+                get_db().memberships.insert_one(membership_document(room, owner, "host", 1))
                 return room_code
             except Exception as e:
-                print("Error inserting room:", e)
+                logger.error("Error inserting room %s: %s", room_code, e)
                 return None
-    print("Failed to generate a unique room code.")
+    logger.error("Failed to generate a unique room code.")
     return None
 
 
 def join_room(room_code, username):
-    room = db.rooms.find_one({"room_code": room_code})
-    if not room:
-        return False, "Room not found"
-
-    # Get existing member usernames safely
-    existing_usernames = get_member_usernames(room.get("members", []))
-
-    # Check if user is already in room
-    if username in existing_usernames:
+    # The membership check is part of the update, so a user joining twice at once is added once
+    room = get_db().rooms.find_one_and_update(
+        join_room_query(room_code, username),
+        {"$push": {"members": new_member(username)}},
+        return_document=ReturnDocument.AFTER
+    )
+    if room is None:
+        if get_db().rooms.find_one({"room_code": room_code}, {"_id": 1}) is None:
+            return False, "Room not found"
         return False, "User already in room"
 
-    # Add new member
-    db.rooms.update_one(
-        {"room_code": room_code},
-        {"$push": {"members": {"username": username, "tasks": [], "role": "member"}}}
+    # Counted from the room as updated; $max keeps a slower concurrent join from lowering it
+    member_count = len(get_member_usernames(room["members"]))
+    get_db().memberships.update_many({"room_code": room_code}, {"$max": {"member_count": member_count}})
+    get_db().memberships.update_one(
+        {"username": username, "room_code": room_code},
+        {"$set": membership_document(room, username, "member", member_count)},
+        upsert=True
     )
     return True, "Joined room successfully"
 
 
 def get_room(room_code):
-    room = db.rooms.find_one({"room_code": room_code})
+    room = get_db().rooms.find_one({"room_code": room_code})
     if room and "members" in room:
         # Normalize members format
         room["members"] = normalize_members(room["members"])
         # Update the database with normalized format
-        db.rooms.update_one(
+        get_db().rooms.update_one(
             {"room_code": room_code},
             {"$set": {"members": room["members"]}}
         )
     return room
 
 
-def add_task_to_user_in_room(room_code, creator, assigned_to, title, description=""):
-    room = db.rooms.find_one({"room_code": room_code})
-    if not room:
-        return False, "Room not found"
-    if room["owner"] != creator:
-        return False, "Only room owner can create tasks"
-
-    # Handle both string and dict formats for members
-    member_usernames = []
-    for m in room.get("members", []):
-        if isinstance(m, str):
-            member_usernames.append(m)
-        elif isinstance(m, dict) and "username" in m:
-            member_usernames.append(m["username"])
-
-    if assigned_to not in member_usernames:
-        return False, "Assigned user not in room"
-
-    task = {
-        "task_id": str(uuid.uuid4()),
-        "title": title,
-        "description": description,
-        "created_by": creator,
-        "timestamp": datetime.utcnow()
-    }
-
-    # Find the member and update their tasks
-    members = room.get("members", [])
-    for i, member in enumerate(members):
-        if isinstance(member, str) and member == assigned_to:
-            # Convert string to dict format and add task
-            members[i] = {
-                "username": member,
-                "tasks": [task],
-                "role": "host" if member == room["owner"] else "member"
-            }
-            break
-        elif isinstance(member, dict) and member.get("username") == assigned_to:
-            # Add task to existing dict
-            if "tasks" not in member:
-                member["tasks"] = []
-            member["tasks"].append(task)
-            break
+def add_task_to_user_in_room(room_code, creator, assigned_to, title, description="", due_date=None, status="open",
+                             repo=None, branch=None):
+    room = get_db().rooms.find_one({"room_code": room_code})
+    error = task_creation_error(room, creator, assigned_to, status)
+    if error:
+        return False, error
+
+    task = new_task(creator, title, description, due_date, status, repo, branch)
+    members = members_with_task(room, assigned_to, task)
 
     # Update the entire members array
-    result = db.rooms.update_one(
+    result = get_db().rooms.update_one(
         {"room_code": room_code},
         {"$set": {"members": members}}
     )
 
     if result.modified_count == 1:
+        get_db().tasks.insert_one(task_document(task, room_code, assigned_to))
         return True, task
     else:
         return False, "Failed to add task"
 
 
-def get_tasks_for_user_in_room(room_code, username):
-    room = db.rooms.find_one({"room_code": room_code})
-    if not room:
-        return None
+def find_tasks(username, room_code=None, created_by=None, status=None, due_before=None, due_after=None,
+               limit=None, cursor=None):
+    """
+    Query a user's tasks, oldest first, from the tasks collection.
+
+    Args:
+        username (str): User the tasks are assigned to
+        room_code (str, optional): Only tasks in this room; all rooms when omitted
+        created_by (str, optional): Only tasks created by this user
+        status (str, optional): Only tasks with this status
+        due_before (datetime, optional): Only tasks due before this time
+        due_after (datetime, optional): Only tasks due at or after this time
+        limit (int, optional): Page size, capped at TASK_PAGE_MAX
+        cursor (str, optional): next_cursor from the previous page
+
+    Without limit or cursor every matching task is returned.
+
+    Returns:
+        Tuple[List[dict], Optional[str]]: The page of tasks and the cursor for the next page
+    """
+    query = build_task_query(username, room_code, created_by, status, due_before, due_after, cursor)
+    results = get_db().tasks.find(query, TASK_PROJECTION).sort(TASK_SORT)
+    if not is_paginated(limit, cursor):
+        return list(results), None
+    limit = task_page_size(limit)
+    return page_tasks(list(results.limit(limit + 1)), limit)
+
+
+def get_trackable_tasks(repo=None, branches=None):
+    """
+    Open and in-progress tasks linked to a repository, with their progress watermark.
+
+    Args:
+        repo (str, optional): Only tasks for this "owner/name"
+        branches (list, optional): Only tasks for these branches (requires repo); None
+            matches tasks that track the default branch
+
+    Returns:
+        List[dict]: {task_id, title, description, repo, branch, timestamp, progress} per task
+    """
+    query = {"repo": {"$ne": None} if repo is None else repo, "status": {"$in": ["open", "in_progress"]}}
+    if repo is not None and branches is not None:
+        query["branch"] = {"$in": list(branches)}
+    projection = {"_id": 0, "task_id": 1, "title": 1, "description": 1, "repo": 1, "branch": 1, "timestamp": 1,
+                  "progress.head_sha": 1, "progress.result": 1}
+    return list(get_db().tasks.find(query, projection))
+
+
+def save_task_progress(task_id, head_sha, result, commits_analyzed):
+    """Store the latest progress result and the head SHA it was computed at (the watermark)"""
+    get_db().tasks.update_one(
+        {"task_id": task_id},
+        {"$set": {"progress": {
+            "head_sha": head_sha,
+            "result": result,
+            "commits_analyzed": commits_analyzed,
+            "analyzed_at": datetime.utcnow()
+        }}}
+    )
 
-    # Get existing usernames safely
-    existing_usernames = []
-    for m in room.get("members", []):
-        if isinstance(m, str):
-            existing_usernames.append(m)
-        elif isinstance(m, dict) and "username" in m:
-            existing_usernames.append(m["username"])
-
-    member = next((m for m in room["members"] if isinstance(m, dict) and m.get("username") == username), None)
-    if member:
-        return member.get("tasks", [])
-    return None
+
+def is_room_member(room_code, username):
+    return get_db().memberships.find_one({"username": username, "room_code": room_code}, {"_id": 1}) is not None
+
+
+def get_tasks_for_user_in_room(room_code, username, **filters):
+    """
+    Tasks assigned to a user in one room; None if the room or user is not found.
+    Accepts the filters and paging arguments of find_tasks and returns its (tasks, next_cursor).
+    """
+    if not is_room_member(room_code, username):
+        return None
+    return find_tasks(username, room_code=room_code, **filters)
 
 
 # NEW FUNCTION: Get all rooms for a user
 def get_user_rooms(username):
     """Get all rooms where the user is either the owner or a member"""
     try:
-        # Find rooms where user is owner OR user is in members array
-        rooms = list(db.rooms.find({
-            "$or": [
-                {"owner": username},
-                {"members.username": username},
-                {"members": username}  # Handle legacy string format
-            ]
-        }))
-
-        return rooms
+        return list(get_db().rooms.find(user_rooms_query(username)))
     except Exception as e:
-        print(f"Error in get_user_rooms: {e}")
+        logger.error("Error in get_user_rooms for %s: %s", username, e)
         return []
 
+def get_user_room_summaries(username, limit=None, offset=0):
+    """
+    List a user's rooms, newest first, from the memberships collection.
+
+    Args:
+        username (str): Member or owner to list rooms for
+        limit (int, optional): Maximum number of rooms to return
+        offset (int): Number of rooms to skip
+
+    Returns:
+        List[dict]: {room_code, room_name, owner, role, member_count, created_at} per room
+    """
+    cursor = get_db().memberships.find({"username": username}, MEMBERSHIP_PROJECTION) \
+        .sort(MEMBERSHIP_SORT).skip(offset)
+    if limit:
+        cursor = cursor.limit(limit)
+    return list(cursor)
+
+
+def backfill_tasks(database=None):
+    """Rebuild the tasks collection from the tasks embedded in room members"""
+    database = database if database is not None else get_db()
+    count = 0
+    for room in database.rooms.find({"members.tasks.0": {"$exists": True}}, BACKFILL_ROOM_PROJECTION):
+        for query, update in backfill_task_updates(room):
+            database.tasks.update_one(query, update, upsert=True)
+            count += 1
+    logger.info("Backfilled %d tasks", count)
+    return count
+
+
+def backfill_memberships(database=None):
+    """Rebuild the memberships collection from rooms, e.g. for data created before it existed"""
+    database = database if database is not None else get_db()
+    count = 0
+    for room in database.rooms.find({}, BACKFILL_ROOM_PROJECTION):
+        for query, update in backfill_membership_updates(room):
+            database.memberships.update_one(query, update, upsert=True)
+            count += 1
+    logger.info("Backfilled %d memberships", count)
+    return count
+
+
 def get_room_by_name(room_name):
-    room = db.rooms.find_one({"room_name": room_name})
+    room = get_db().rooms.find_one({"room_name": room_name})
     if room and "members" in room:
         # Normalize members format
         room["members"] = normalize_members(room["members"])
         # Update the database with normalized format
-        db.rooms.update_one(
+        get_db().rooms.update_one(
             {"room_name": room_name},
             {"$set": {"members": room["members"]}}
         )
@@ -0,0 +1,301 @@
+"""
+Documents, queries and request parsing shared by db.py (pymongo) and async_db.py (motor).
+
+Nothing here touches the database: the two modules run the same queries and write the same
+documents through their own driver, so both servers can share one database.
+"""
+import base64
+import json
+import os
+import uuid
+from datetime import datetime
+from dotenv import load_dotenv
+
+load_dotenv()
+
+MONGO_DB_NAME = os.getenv('MONGO_DB_NAME', 'rooms_db')
+# Default and maximum page sizes for task queries
+TASK_PAGE_SIZE = int(os.getenv('TASK_PAGE_SIZE', '50'))
+TASK_PAGE_MAX = int(os.getenv('TASK_PAGE_MAX', '200'))
+
+TASK_STATUSES = ('open', 'in_progress', 'done')
+
+# memberships holds one small document per (user, room) so a user's rooms can be listed
+# without loading room documents: {username, room_code, role, room_name, owner,
+# member_count, created_at}. create_room and join_room keep it in sync.
+# tasks holds one document per task: the embedded member task plus room_code, assigned_to,
+# status and due_date. add_task_to_user_in_room writes both.
+INDEXES = {
+    "memberships": [
+        ([("username", 1), ("room_code", 1)], {"unique": True}),
+        # Covers the newest-first listing in get_user_room_summaries
+        ([("username", 1), ("created_at", -1), ("room_code", 1)], {}),
+        # member_count updates touch every membership of one room
+        ([("room_code", 1)], {}),
+    ],
+    "tasks": [
+        ([("task_id", 1)], {"unique": True}),
+        # Keyset pagination for one user in one room, and across all their rooms
+        ([("assigned_to", 1), ("room_code", 1), ("timestamp", 1), ("task_id", 1)], {}),
+        ([("assigned_to", 1), ("timestamp", 1), ("task_id", 1)], {}),
+        # Progress sweeps select open tasks by repository and branch
+        ([("repo", 1), ("branch", 1), ("status", 1)], {}),
+    ],
+}
+# Marker in the migrations collection, written once rooms have been copied into both collections
+BACKFILL_MIGRATION = "memberships_and_tasks"
+BACKFILL_ROOM_PROJECTION = {"room_code": 1, "room_name": 1, "owner": 1, "members": 1, "created_at": 1}
+MEMBERSHIP_PROJECTION = {"_id": 0, "room_code": 1, "room_name": 1, "owner": 1, "role": 1,
+                         "member_count": 1, "created_at": 1}
+MEMBERSHIP_SORT = [("created_at", -1), ("room_code", 1)]
+TASK_PROJECTION = {"_id": 0}
+TASK_SORT = [("timestamp", 1), ("task_id", 1)]
+
+
+def generate_room_code():
+    return uuid.uuid4().hex[:6].upper()
+
+
+def new_member(username, role="member"):
+    return {"username": username, "tasks": [], "role": role}
+
+
+def join_room_query(room_code, username):
+    """
+    Match a room only while username is not in it yet, so that of two concurrent joins by
+    the same user exactly one pushes a member entry.
+    """
+    # Legacy rooms may list members as bare usernames
+    return {"room_code": room_code, "members.username": {"$ne": username}, "members": {"$ne": username}}
+
+
+def new_room_document(room_code, owner, room_name):
+    """A room with its owner as the only member (the host)"""
+    return {
+        "room_code": room_code,
+        "room_name": room_name,
+        "owner": owner,
+        "members": [new_member(owner, "host")],
+        "created_at": datetime.utcnow()
+    }
+
+
+def membership_document(room, username, role, member_count):
+    return {
+        "username": username,
+        "room_code": room["room_code"],
+        "role": role,
+        "room_name": room["room_name"],
+        "owner": room["owner"],
+        "member_count": member_count,
+        "created_at": room.get("created_at"),
+    }
+
+
+def normalize_members(members):
+    """Convert legacy string members to object format"""
+    normalized = []
+    for member in members:
+        if isinstance(member, str):
+            # Legacy format: convert string to object
+            normalized.append(new_member(member))
+        elif isinstance(member, dict):
+            # Already in correct format
+            normalized.append(member)
+    return normalized
+
+
+def get_member_usernames(members):
+    """Safely extract usernames from members array"""
+    usernames = []
+    for member in members:
+        if isinstance(member, str):
+            usernames.append(member)
+        elif isinstance(member, dict) and "username" in member:
+            usernames.append(member["username"])
+    return usernames
+
+
+def user_rooms_query(username):
+    """Rooms where the user is either the owner or a member"""
+    return {
+        "$or": [
+            {"owner": username},
+            {"members.username": username},
+            {"members": username}  # Handle legacy string format
+        ]
+    }
+
+
+def task_creation_error(room, creator, assigned_to, status):
+    """Why a task cannot be created in a room, or None if it can"""
+    if not room:
+        return "Room not found"
+    if room["owner"] != creator:
+        return "Only room owner can create tasks"
+    if assigned_to not in get_member_usernames(room.get("members", [])):
+        return "Assigned user not in room"
+    if status not in TASK_STATUSES:
+        return f"status must be one of {', '.join(TASK_STATUSES)}"
+    return None
+
+
+def new_task(creator, title, description="", due_date=None, status="open", repo=None, branch=None):
+    return {
+        "task_id": str(uuid.uuid4()),
+        "title": title,
+        "description": description,
+        "created_by": creator,
+        "timestamp": datetime.utcnow(),
+        "status": status,
+        "due_date": due_date,
+        # GitHub "owner/name" and branch whose commits progress_tracker.py analyzes for this task
+        "repo": repo,
+        "branch": branch
+    }
+
+
+def members_with_task(room, assigned_to, task):
+    """The room's members array with task appended to the assignee's tasks"""
+    members = room.get("members", [])
+    for i, member in enumerate(members):
+        if isinstance(member, str) and member == assigned_to:
+            # Convert string to dict format and add task
+            members[i] = {
+                "username": member,
+                "tasks": [task],
+                "role": "host" if member == room["owner"] else "member"
+            }
+            break
+        elif isinstance(member, dict) and member.get("username") == assigned_to:
+            member.setdefault("tasks", []).append(task)
+            break
+    return members
+
+
+def task_document(task, room_code, assigned_to):
+    # A copy, so insert_one does not add an _id to the task returned to the caller
+    return dict(task, room_code=room_code, assigned_to=assigned_to)
+
+
+def backfill_membership_updates(room):
+    """(filter, update) upserts that rebuild a room's memberships from its embedded members"""
+    usernames = get_member_usernames(room.get("members", []))
+    member_count = len(usernames)
+    # get_user_rooms also matched owners that are not listed as members
+    if room["owner"] not in usernames:
+        usernames.append(room["owner"])
+    return [({"username": username, "room_code": room["room_code"]},
+             {"$set": membership_document(room, username, "host" if username == room["owner"] else "member",
+                                          member_count)})
+            for username in usernames]
+
+
+def backfill_task_updates(room):
+    """(filter, update) upserts that rebuild a room's tasks documents from its embedded member tasks"""
+    updates = []
+    for member in normalize_members(room.get("members", [])):
+        for task in member.get("tasks", []):
+            document = task_document(task, room["room_code"], member["username"])
+            document.setdefault("status", "open")
+            document.setdefault("due_date", None)
+            updates.append(({"task_id": task["task_id"]}, {"$set": document}))
+    return updates
+
+
+def encode_task_cursor(task):
+    """Opaque cursor pointing just after a task in (timestamp, task_id) order"""
+    raw = json.dumps([task["timestamp"].isoformat(), task["task_id"]])
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii")
+
+
+def decode_task_cursor(cursor):
+    """Inverse of encode_task_cursor; raises ValueError for a malformed cursor"""
+    try:
+        timestamp, task_id = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+        return datetime.fromisoformat(timestamp), str(task_id)
+    except (TypeError, ValueError, UnicodeError) as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
+
+
+def task_page_size(limit):
+    return max(1, min(limit or TASK_PAGE_SIZE, TASK_PAGE_MAX))
+
+
+def build_task_query(username, room_code=None, created_by=None, status=None, due_before=None, due_after=None,
+                     cursor=None):
+    query = {"assigned_to": username}
+    if room_code:
+        query["room_code"] = room_code
+    if created_by:
+        query["created_by"] = created_by
+    if status:
+        query["status"] = status
+    if due_before or due_after:
+        query["due_date"] = {}
+        if due_before:
+            query["due_date"]["$lt"] = due_before
+        if due_after:
+            query["due_date"]["$gte"] = due_after
+    if cursor:
+        timestamp, task_id = decode_task_cursor(cursor)
+        query["$or"] = [
+            {"timestamp": {"$gt": timestamp}},
+            {"timestamp": timestamp, "task_id": {"$gt": task_id}},
+        ]
+    return query
+
+
+def is_paginated(limit, cursor):
+    return limit is not None or bool(cursor)
+
+
+def page_tasks(tasks, limit):
+    """Split a limit + 1 result into (page, next cursor or None)"""
+    if len(tasks) > limit:
+        return tasks[:limit], encode_task_cursor(tasks[limit - 1])
+    return tasks, None
+
+
+def parse_datetime(value):
+    """Parse an ISO 8601 date or datetime from a request; None for empty values"""
+    if not value:
+        return None
+    return datetime.fromisoformat(value.replace("Z", "+00:00")).replace(tzinfo=None)
+
+
+def task_filters_from_args(args):
+    """
+    Turn request query arguments (created_by, status, due_before, due_after, limit, cursor)
+    into find_tasks keyword arguments; raises ValueError for malformed values.
+    """
+    status = args.get("status")
+    if status and status not in TASK_STATUSES:
+        raise ValueError(f"status must be one of {', '.join(TASK_STATUSES)}")
+    cursor = args.get("cursor")
+    if cursor:
+        decode_task_cursor(cursor)
+    # Without limit or cursor every matching task is returned, as before pagination existed
+    limit = int(args["limit"]) if "limit" in args else None
+    if limit is not None and limit < 1:
+        raise ValueError("limit must be at least 1")
+    return {
+        "created_by": args.get("created_by"),
+        "status": status,
+        "due_before": parse_datetime(args.get("due_before")),
+        "due_after": parse_datetime(args.get("due_after")),
+        "limit": limit,
+        "cursor": cursor,
+    }
+
+
+def format_room_summary(membership):
+    """Shape a membership document for the /user/<username>/rooms response"""
+    return {
+        "id": membership["room_code"],
+        "name": membership["room_name"],
+        "owner": membership["owner"],
+        "role": membership.get("role"),
+        "member_count": membership.get("member_count", 0),
+        "created_at": membership.get("created_at")
+    }
@@ -1,9 +1,14 @@
-import requests
+from logger import get_logger
+import services
+
+logger = get_logger(__name__)
 
 
 def list_repos(token: str) -> list:
     headers = {"Authorization": f"Bearer {token}"}
-    response = requests.get("https://api.github.com/user/repos", headers=headers)
+    url = "https://api.github.com/user/repos"
+    response = services.get('github').get(url, headers=headers)
+    logger.debug("GitHub GET %s -> %s", url, response.status_code)
     if response.status_code == 200:
         return response.json()
     else:
@@ -12,16 +17,26 @@ def list_repos(token: str) -> list:
 def get_branches(token: str, owner: str, repo: str) -> list:
     headers = {"Authorization": f"Bearer {token}"}
     url = f"https://api.github.com/repos/{owner}/{repo}/branches"
-    response = requests.get(url, headers=headers)
+    response = services.get('github').get(url, headers=headers)
+    logger.debug("GitHub GET %s -> %s", url, response.status_code)
     if response.status_code == 200:
         return response.json()
     else:
         raise Exception(f"Error fetching branches: {response.status_code} - {response.text}")
 
-def get_commits(token: str, owner: str, repo: str, branch: str) -> list:
+def get_commits(token: str, owner: str, repo: str, branch: str, per_page: int = None, page: int = None) -> list:
+    """List commits newest first (default branch if branch is None); per_page/page select one page"""
     headers = {"Authorization": f"Bearer {token}"}
-    url = f"https://api.github.com/repos/{owner}/{repo}/commits?sha={branch}"
-    response = requests.get(url, headers=headers)
+    params = [f"sha={branch}"] if branch else []
+    if per_page:
+        params.append(f"per_page={per_page}")
+    if page:
+        params.append(f"page={page}")
+    url = f"https://api.github.com/repos/{owner}/{repo}/commits"
+    if params:
+        url += "?" + "&".join(params)
+    response = services.get('github').get(url, headers=headers)
+    logger.debug("GitHub GET %s -> %s", url, response.status_code)
     if response.status_code == 200:
         return response.json()
     else:
@@ -30,7 +45,8 @@ def get_commits(token: str, owner: str, repo: str, branch: str) -> list:
 def get_commit_diff(token: str, owner: str, repo: str, commit_sha: str) -> dict:
     headers = {"Authorization": f"Bearer {token}"}
     url = f"https://api.github.com/repos/{owner}/{repo}/commits/{commit_sha}"
-    response = requests.get(url, headers=headers)
+    response = services.get('github').get(url, headers=headers)
+    logger.debug("GitHub GET %s -> %s", url, response.status_code)
     if response.status_code == 200:
         return response.json()
     else:
@@ -44,7 +60,8 @@ def create_issue(token: str, owner: str, repo: str, title: str, body: str, assig
         "body": body,
         "assignees": assignees
     }
-    response = requests.post(url, headers=headers, json=data)
+    response = services.get('github').post(url, headers=headers, json=data)
+    logger.debug("GitHub POST %s -> %s", url, response.status_code)
     if response.status_code == 201:
         return response.json()
     else:
@@ -53,7 +70,8 @@ def create_issue(token: str, owner: str, repo: str, title: str, body: str, assig
 def get_diff_between_commits(token: str, owner: str, repo: str, base_sha: str, head_sha: str) -> dict:
     headers = {"Authorization": f"Bearer {token}"}
     url = f"https://api.github.com/repos/{owner}/{repo}/compare/{base_sha}...{head_sha}"
-    response = requests.get(url, headers=headers)
+    response = services.get('github').get(url, headers=headers)
+    logger.debug("GitHub GET %s -> %s", url, response.status_code)
     if response.status_code == 200:
         return response.json()
     else:
@@ -0,0 +1,104 @@
+"""
+GitHub webhook handling: signature verification, push parsing and per-branch debouncing.
+
+app.py and async_app.py expose POST /github/webhook on top of this module. A push records
+the repository and branch in a PushDebouncer; once pushes to that branch have been quiet
+for WEBHOOK_DEBOUNCE_SECONDS, the server runs progress_tracker.sweep for just the tasks
+that track it.
+"""
+import hashlib
+import hmac
+import os
+import threading
+import time
+from dotenv import load_dotenv
+
+load_dotenv()
+
+GITHUB_WEBHOOK_SECRET = os.getenv('GITHUB_WEBHOOK_SECRET', '')
+# Quiet period after the last push to a branch before its tasks are evaluated, and the
+# longest a steady stream of pushes can postpone the evaluation
+WEBHOOK_DEBOUNCE_SECONDS = float(os.getenv('WEBHOOK_DEBOUNCE_SECONDS', '10'))
+WEBHOOK_DEBOUNCE_MAX_SECONDS = float(os.getenv('WEBHOOK_DEBOUNCE_MAX_SECONDS', '60'))
+
+
+def sign(secret: str, body: bytes) -> str:
+    """The X-Hub-Signature-256 header value GitHub sends for body"""
+    return "sha256=" + hmac.new(secret.encode("utf-8"), body, hashlib.sha256).hexdigest()
+
+
+def verify_signature(secret: str, body: bytes, signature: str) -> bool:
+    """Check an X-Hub-Signature-256 header in constant time"""
+    if not secret or not signature:
+        return False
+    return hmac.compare_digest(sign(secret, body), signature)
+
+
+def parse_push(payload: dict):
+    """
+    Extract what a progress sweep needs from a push event payload.
+
+    Returns:
+        Tuple[str, List[Optional[str]]] or None: ("owner/name", branches) where branches also
+        contains None when the default branch was pushed; None for tag pushes and deleted branches
+    """
+    ref = payload.get("ref") or ""
+    repository = payload.get("repository") or {}
+    if not ref.startswith("refs/heads/") or payload.get("deleted") or not repository.get("full_name"):
+        return None
+    branch = ref[len("refs/heads/"):]
+    branches = [branch]
+    if branch == repository.get("default_branch"):
+        # Tasks created without a branch track the default branch
+        branches.append(None)
+    return repository["full_name"], branches
+
+
+class PushDebouncer:
+    """
+    Collapses bursts of pushes to the same repository branch into one pending evaluation.
+
+    push() (re)starts the quiet period for a branch; due() returns the branches whose quiet
+    period has passed, or that have been pending longer than max_delay.
+    """
+
+    def __init__(self, delay=WEBHOOK_DEBOUNCE_SECONDS, max_delay=WEBHOOK_DEBOUNCE_MAX_SECONDS):
+        self.delay = delay
+        self.max_delay = max_delay
+        self._lock = threading.Lock()
+        self._pending = {}  # {(repo, branch): [first_push, last_push, branches]}
+        self.counters = {"pushes": 0, "debounced": 0, "dispatched": 0}
+
+    def push(self, repo, branches) -> bool:
+        """Record a push; returns False if it was folded into an evaluation already pending"""
+        now = time.monotonic()
+        key = (repo, branches[0])
+        with self._lock:
+            self.counters["pushes"] += 1
+            pending = self._pending.get(key)
+            if pending is not None:
+                pending[1] = now
+                self.counters["debounced"] += 1
+                return False
+            self._pending[key] = [now, now, list(branches)]
+            return True
+
+    def due(self):
+        """Remove and return [(repo, branches)] whose evaluation should run now"""
+        now = time.monotonic()
+        ready = []
+        with self._lock:
+            for key, (first, last, branches) in list(self._pending.items()):
+                if now - last >= self.delay or now - first >= self.max_delay:
+                    del self._pending[key]
+                    ready.append((key[0], branches))
+            self.counters["dispatched"] += len(ready)
+        return ready
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "pending": len(self._pending),
+                "delay_seconds": self.delay,
+                **self.counters,
+            }
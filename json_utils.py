@@ -0,0 +1,96 @@
+import json
+from datetime import date, datetime
+from bson import ObjectId
+from flask.json.provider import DefaultJSONProvider
+
+# orjson is several times faster than the standard library encoder; use it when installed
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def json_default(obj):
+    """Serialize the non-JSON types that come out of MongoDB and VideoCall objects"""
+    if isinstance(obj, (datetime, date)):
+        return obj.isoformat()
+    if isinstance(obj, ObjectId):
+        return str(obj)
+    if isinstance(obj, (set, frozenset, tuple)):
+        return list(obj)
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def dumps(obj, pretty: bool = False) -> str:
+    """Encode obj as compact JSON (or indented if pretty), handling datetime and ObjectId"""
+    if orjson is not None:
+        option = orjson.OPT_NON_STR_KEYS | (orjson.OPT_INDENT_2 if pretty else 0)
+        return orjson.dumps(obj, default=json_default, option=option).decode('utf-8')
+    if pretty:
+        return json.dumps(obj, default=json_default, indent=2)
+    return json.dumps(obj, default=json_default, separators=(',', ':'))
+
+
+class TaskSyncJSONProvider(DefaultJSONProvider):
+    """Flask JSON provider so jsonify() encodes datetime and ObjectId the same way as dumps()"""
+
+    def dumps(self, obj, **kwargs):
+        return dumps(obj)
+
+
+def stream_object(items, stream_lists: bool = False):
+    """
+    Yield a JSON object piece by piece from an iterable of (key, value) pairs,
+    so large responses never have to be built as a single string.
+    With stream_lists, list values (e.g. transcripts) are streamed element by element too.
+    """
+    yield '{'
+    first = True
+    for key, value in items:
+        if not first:
+            yield ','
+        first = False
+        yield dumps(str(key))
+        yield ':'
+        if stream_lists and isinstance(value, list):
+            yield from stream_array(value)
+        elif stream_lists and isinstance(value, dict):
+            yield from stream_object(value.items(), stream_lists=True)
+        else:
+            yield dumps(value)
+    yield '}'
+
+
+def stream_array(values):
+    """Yield a JSON array piece by piece from an iterable of values"""
+    yield '['
+    first = True
+    for value in values:
+        if not first:
+            yield ','
+        first = False
+        yield dumps(value)
+    yield ']'
+
+
+def buffered(chunks, size: int = 64 * 1024):
+    """Join the many small pieces from stream_object/stream_array into ~size-byte response chunks"""
+    parts = []
+    pending = 0
+    for chunk in chunks:
+        parts.append(chunk)
+        pending += len(chunk)
+        if pending >= size:
+            yield ''.join(parts)
+            parts = []
+            pending = 0
+    if parts:
+        yield ''.join(parts)
+
+
+def parse_fields(value):
+    """Parse a "?fields=a,b,c" query value into a list of field names, or None for all fields"""
+    if not value:
+        return None
+    fields = [field.strip() for field in value.split(',') if field.strip()]
+    return fields or None
@@ -0,0 +1,143 @@
+import json
+import logging
+import os
+import random
+import sys
+from datetime import datetime, timezone
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# LOG_LEVEL controls the minimum level emitted; LOG_FORMAT is "text" or "json"
+LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO').upper()
+LOG_FORMAT = os.getenv('LOG_FORMAT', 'text').lower()
+
+# Fraction of events that are logged for high-frequency Socket.IO events.
+# Override with LOG_SAMPLE_RATES="audio-chunk=0.1,ice-candidate=0"
+DEFAULT_SAMPLE_RATES = {
+    'audio-chunk': 0.02,
+    'ice-candidate': 0.01,
+    'ice-candidates': 0.01,
+    'offer': 0.1,
+    'answer': 0.1,
+}
+
+
+def parse_sample_rates(value: str) -> dict:
+    """Parse a "event=rate,event=rate" string into a {event: rate} dict"""
+    rates = {}
+    for item in (value or "").split(","):
+        if "=" not in item:
+            continue
+        event, rate = item.split("=", 1)
+        try:
+            rates[event.strip()] = min(max(float(rate), 0.0), 1.0)
+        except ValueError:
+            continue
+    return rates
+
+
+sample_rates = dict(DEFAULT_SAMPLE_RATES)
+sample_rates.update(parse_sample_rates(os.getenv('LOG_SAMPLE_RATES', '')))
+
+
+class Lazy:
+    """
+    Defer an expensive value until a log record is actually formatted.
+
+    Usage: logger.debug("rooms: %s", Lazy(lambda: dict(rooms)))
+    """
+
+    def __init__(self, func):
+        self.func = func
+
+    def __str__(self) -> str:
+        return str(self.func())
+
+    def __repr__(self) -> str:
+        return repr(self.func())
+
+
+class StructuredFormatter(logging.Formatter):
+    """Render records as "time level logger: message key=value ..." or as one JSON object per line"""
+
+    def __init__(self, fmt: str = 'text'):
+        super().__init__()
+        self.fmt = fmt
+
+    def format(self, record: logging.LogRecord) -> str:
+        fields = getattr(record, 'fields', None) or {}
+        timestamp = datetime.fromtimestamp(record.created, tz=timezone.utc).isoformat(timespec='milliseconds')
+        message = record.getMessage()
+
+        if self.fmt == 'json':
+            payload = {
+                "ts": timestamp,
+                "level": record.levelname,
+                "logger": record.name,
+                "msg": message,
+            }
+            payload.update(fields)
+            if record.exc_info:
+                payload["exc"] = self.formatException(record.exc_info)
+            return json.dumps(payload, default=str)
+
+        line = f"{timestamp} {record.levelname} {record.name}: {message}"
+        if fields:
+            line += " " + " ".join(f"{key}={value}" for key, value in fields.items())
+        if record.exc_info:
+            line += "\n" + self.formatException(record.exc_info)
+        return line
+
+
+_configured = False
+
+
+def configure_logging():
+    """
+    Install the structured handler on the root logger once per process.
+
+    Only entry points (app.py, async_app.py, the CLIs and benchmarks) call this; importing a
+    module never changes the logging configuration of the process that imported it.
+    """
+    global _configured
+    if _configured:
+        return
+    handler = logging.StreamHandler(sys.stdout)
+    handler.setFormatter(StructuredFormatter(LOG_FORMAT))
+    root = logging.getLogger()
+    root.handlers = [handler]
+    root.setLevel(LOG_LEVEL)
+    _configured = True
+
+
+def get_logger(name: str) -> logging.Logger:
+    return logging.getLogger(name)
+
+
+def should_sample(event: str) -> bool:
+    rate = sample_rates.get(event, 1.0)
+    if rate >= 1.0:
+        return True
+    return rate > 0.0 and random.random() < rate
+
+
+def log_event(logger: logging.Logger, level: int, event: str, msg: str, *args, **fields):
+    """
+    Log a per-event message subject to the level check and the event's sample rate.
+
+    Only records below WARNING are sampled; warnings and errors are always emitted.
+
+    Formatting of msg and args only happens if the record is emitted, so callers
+    should pass values as arguments (or wrapped in Lazy) instead of pre-formatting.
+    """
+    if not logger.isEnabledFor(level):
+        return
+    sampled = level < logging.WARNING
+    if sampled and not should_sample(event):
+        return
+    fields["event"] = event
+    rate = sample_rates.get(event, 1.0)
+    if sampled and rate < 1.0:
+        fields["sample_rate"] = rate
+    logger.log(level, msg, *args, extra={"fields": fields})
@@ -0,0 +1,326 @@
+"""
+On-demand profiling for live workers, exposed on the /admin/profile endpoints of app.py
+and async_app.py (requires ADMIN_TOKEN).
+
+Sampler records the stack of every thread (and, under eventlet/gevent, every suspended
+greenlet) every few milliseconds from a native OS thread, so it also sees a worker whose
+event loop is busy. Results are returned as collapsed stacks (flamegraph.pl, speedscope)
+or as a marshalled pstats file (python -m pstats, snakeviz).
+
+ProfileToggle runs one handler under cProfile. Socket.IO handlers are registered once with
+the wrapper, which only checks a flag while profiling is disabled; other targets can supply
+install/uninstall callbacks that swap the wrapper in and out instead.
+"""
+import cProfile
+import gc
+import hmac
+import io
+import marshal
+import os
+import pstats
+import sys
+import threading
+import time
+from collections import Counter
+from functools import wraps
+from dotenv import load_dotenv
+
+load_dotenv()
+
+ADMIN_TOKEN = os.getenv('ADMIN_TOKEN', '')
+PROFILE_MAX_SECONDS = float(os.getenv('PROFILE_MAX_SECONDS', '60'))
+PROFILE_INTERVAL_MS = float(os.getenv('PROFILE_INTERVAL_MS', '5'))
+# Stacks deeper than this are truncated at the root
+MAX_STACK_DEPTH = 128
+# How often the sampler rescans the heap for greenlets
+GREENLET_REFRESH_SECONDS = 1.0
+
+
+def authorized(authorization: str) -> bool:
+    """Check an "Authorization: Bearer <ADMIN_TOKEN>" header in constant time"""
+    if not ADMIN_TOKEN or not authorization:
+        return False
+    scheme, _, token = authorization.partition(" ")
+    return scheme.lower() == "bearer" and hmac.compare_digest(token.strip(), ADMIN_TOKEN)
+
+
+def _native(module_name):
+    """The unpatched module if eventlet has monkey-patched it; the sampler must be a real OS thread"""
+    patcher = sys.modules.get('eventlet.patcher')
+    if patcher is not None and patcher.is_monkey_patched(module_name):
+        return patcher.original(module_name)
+    return __import__(module_name)
+
+
+def _stack(frame):
+    """Root-to-leaf tuple of (filename, first line, function name)"""
+    stack = []
+    while frame is not None and len(stack) < MAX_STACK_DEPTH:
+        code = frame.f_code
+        stack.append((code.co_filename, code.co_firstlineno, code.co_name))
+        frame = frame.f_back
+    stack.reverse()
+    return tuple(stack)
+
+
+def _label(func) -> str:
+    filename, line, name = func
+    return f"{name} ({os.path.basename(filename)}:{line})"
+
+
+class SampleProfile:
+    """Stack counts collected by a Sampler"""
+
+    def __init__(self, interval):
+        self.interval = interval
+        self.stacks = Counter()  # {(root label, stack): samples}
+        self.samples = 0
+
+    def to_collapsed(self) -> str:
+        """One "root;frame;...;leaf count" line per distinct stack"""
+        lines = []
+        for (root, stack), count in self.stacks.most_common():
+            lines.append(";".join([root] + [_label(func) for func in stack]) + f" {count}")
+        return "\n".join(lines) + "\n"
+
+    def to_pstats(self) -> bytes:
+        """Marshalled pstats data; time is the sample count times the sampling interval"""
+        stats = {}  # {func: [cc, nc, tt, ct, {caller: [cc, nc, tt, ct]}]}
+        for (_, stack), count in self.stacks.items():
+            if not stack:
+                continue
+            seconds = count * self.interval
+            seen = set()
+            for i, func in enumerate(stack):
+                entry = stats.setdefault(func, [0, 0, 0.0, 0.0, {}])
+                # Recursive frames count once towards cumulative time
+                if func not in seen:
+                    seen.add(func)
+                    entry[0] += count
+                    entry[1] += count
+                    entry[3] += seconds
+                if i > 0:
+                    edge = entry[4].setdefault(stack[i - 1], [0, 0, 0.0, 0.0])
+                    edge[0] += count
+                    edge[1] += count
+                    edge[3] += seconds
+                    if i == len(stack) - 1:
+                        edge[2] += seconds
+            stats[stack[-1]][2] += seconds
+        return marshal.dumps({
+            func: (cc, nc, tt, ct, {caller: tuple(edge) for caller, edge in callers.items()})
+            for func, (cc, nc, tt, ct, callers) in stats.items()
+        })
+
+
+class Sampler:
+    """
+    Samples every thread's stack (and suspended greenlets) for a fixed duration.
+
+    start() returns immediately; callers wait for finished with their server's own sleep
+    (socketio.sleep, asyncio.sleep) so the worker keeps serving while it is profiled.
+    The sampler needs the GIL to take a sample, so it tends to wake when a thread releases it
+    (select, socket reads): work that yields every few hundred microseconds is undercounted,
+    while handlers that hold the CPU for milliseconds, the ones that stall a worker, show up.
+    """
+
+    def __init__(self, seconds, interval_ms=PROFILE_INTERVAL_MS, include_greenlets=True):
+        self.seconds = min(max(seconds, 0.1), PROFILE_MAX_SECONDS)
+        self.interval = max(interval_ms, 1.0) / 1000
+        self.include_greenlets = include_greenlets
+        self.profile = SampleProfile(self.interval)
+        self._done = _native('threading').Event()
+        self._thread_id = None
+
+    @property
+    def finished(self) -> bool:
+        return self._done.is_set()
+
+    def start(self):
+        _native('threading').Thread(target=self._run, name="profiler-sampler", daemon=True).start()
+        return self
+
+    def _greenlets(self):
+        greenlet = sys.modules.get('greenlet')
+        if greenlet is None:
+            return []
+        return [obj for obj in gc.get_objects() if isinstance(obj, greenlet.greenlet) and obj.gr_frame is not None]
+
+    def _run(self):
+        clock = _native('time')
+        self._thread_id = threading.get_ident()
+        names = {}
+        greenlets = []
+        refreshed_at = 0.0
+        deadline = clock.monotonic() + self.seconds
+        try:
+            while clock.monotonic() < deadline:
+                now = clock.monotonic()
+                if self.include_greenlets and now - refreshed_at >= GREENLET_REFRESH_SECONDS:
+                    greenlets = self._greenlets()
+                    names = {thread.ident: thread.name for thread in threading.enumerate()}
+                    refreshed_at = now
+                for thread_id, frame in sys._current_frames().items():
+                    if thread_id != self._thread_id:
+                        root = names.get(thread_id) or f"thread-{thread_id}"
+                        self.profile.stacks[(root, _stack(frame))] += 1
+                for green in greenlets:
+                    frame = green.gr_frame
+                    if frame is not None:
+                        self.profile.stacks[("greenlet", _stack(frame))] += 1
+                self.profile.samples += 1
+                clock.sleep(self.interval)
+        finally:
+            greenlets = None
+            self._done.set()
+
+
+# The toggle that may be profiling; the interpreter runs a single cProfile profiler at a time
+_current_toggle = None
+_current_lock = threading.Lock()
+
+
+class ProfileToggle:
+    """
+    cProfile statistics for one handler while profiling is enabled.
+
+    Wrapped calls share one profiler: it is switched on when the first call starts and off
+    when the last running call returns, so calls that overlap (greenlets, coroutines) are all
+    recorded instead of each call's profiler replacing the others'. A profiler only sees the
+    OS thread that enabled it, so calls from other threads while it runs are not profiled and
+    go straight through. Only one toggle can be enabled at a time.
+
+    Args:
+        name (str): Target name used by the admin endpoints
+        install (callable, optional): install(toggle) registers the handler wrapped with toggle.wrap
+        uninstall (callable, optional): uninstall(toggle) restores the original handler
+    """
+
+    def __init__(self, name, install=None, uninstall=None):
+        self.name = name
+        self._install = install
+        self._uninstall = uninstall
+        self._lock = threading.Lock()
+        self._thread_id = _native('threading').get_ident
+        self._profile = None  # cProfile.Profile shared by the wrapped calls running now
+        self._active = 0
+        self._owner = None  # thread the shared profiler was enabled in
+        self.enabled = False
+        self.stats = None
+        self.calls = 0
+        self.total_seconds = 0.0
+
+    @property
+    def busy(self) -> bool:
+        return self.enabled or self._active > 0
+
+    def enable(self) -> bool:
+        """
+        Reset the statistics and install the profiling wrapper.
+
+        Returns:
+            bool: False if another toggle is already profiling
+        """
+        global _current_toggle
+        with _current_lock:
+            if _current_toggle is not None and _current_toggle is not self and _current_toggle.busy:
+                return False
+            _current_toggle = self
+            with self._lock:
+                if self.enabled:
+                    return True
+                self.stats = None
+                self.calls = 0
+                self.total_seconds = 0.0
+                self.enabled = True
+        if self._install is not None:
+            self._install(self)
+        return True
+
+    def disable(self):
+        with self._lock:
+            if not self.enabled:
+                return
+            self.enabled = False
+        if self._uninstall is not None:
+            self._uninstall(self)
+
+    def _start(self) -> bool:
+        """Count a call in; False if it runs unprofiled (toggle disabled or another thread owns the profiler)"""
+        if not self.enabled:
+            return False
+        thread_id = self._thread_id()
+        with self._lock:
+            if not self.enabled or (self._active and self._owner != thread_id):
+                return False
+            if not self._active:
+                self._profile = cProfile.Profile()
+                self._owner = thread_id
+                self._profile.enable()
+            self._active += 1
+            return True
+
+    def _stop(self, seconds):
+        with self._lock:
+            self.calls += 1
+            self.total_seconds += seconds
+            self._active -= 1
+            if self._active:
+                return
+            self._profile.disable()
+            if self.stats is None:
+                self.stats = pstats.Stats(self._profile)
+            else:
+                self.stats.add(self._profile)
+            self._profile = None
+            self._owner = None
+
+    def wrap(self, func):
+        """Profile each call of a synchronous handler (other greenlets run during it are included)"""
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            if not self._start():
+                return func(*args, **kwargs)
+            started = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                self._stop(time.perf_counter() - started)
+        return wrapper
+
+    def wrap_async(self, func):
+        """Profile each call of a coroutine handler (coroutines run during its awaits are included)"""
+        @wraps(func)
+        async def wrapper(*args, **kwargs):
+            if not self._start():
+                return await func(*args, **kwargs)
+            started = time.perf_counter()
+            try:
+                return await func(*args, **kwargs)
+            finally:
+                self._stop(time.perf_counter() - started)
+        return wrapper
+
+    def dump(self) -> bytes:
+        """Marshalled pstats data for the calls profiled so far"""
+        with self._lock:
+            return marshal.dumps(self.stats.stats if self.stats is not None else {})
+
+    def report(self, limit=40) -> str:
+        """Top functions by cumulative time as pstats text"""
+        with self._lock:
+            if self.stats is None:
+                return f"No calls to {self.name} profiled yet\n"
+            output = io.StringIO()
+            self.stats.stream = output
+            self.stats.sort_stats("cumulative").print_stats(limit)
+            return output.getvalue()
+
+    def summary(self) -> dict:
+        with self._lock:
+            return {
+                "enabled": self.enabled,
+                "calls": self.calls,
+                "total_seconds": round(self.total_seconds, 6),
+                "mean_ms": round(self.total_seconds * 1000 / self.calls, 3) if self.calls else None,
+            }
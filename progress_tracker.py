@@ -0,0 +1,189 @@
+"""
+Incremental progress tracking for tasks linked to a GitHub repository.
+
+Each task in the tasks collection stores a watermark: the head SHA its last progress
+result was computed at. A sweep groups open tasks by (repo, branch), lists only the
+commits newer than the oldest watermark in the group through get_commits, diffs each
+task from its watermark to the new head and asks get_progress to update the previous
+result with just those changes. Tasks whose watermark is already the head cost nothing.
+
+Usage:
+    python progress_tracker.py [--repo owner/name] [--branch main]
+"""
+import argparse
+import json
+import os
+from datetime import datetime
+from dotenv import load_dotenv
+from logger import configure_logging, get_logger
+from db import get_trackable_tasks, save_task_progress
+from github_connector import get_commits
+from tasksync import get_progress, get_pretty_diff
+
+load_dotenv()
+
+logger = get_logger(__name__)
+
+# Commits per get_commits page, and how far back a sweep may page to find a watermark
+COMMIT_PAGE_SIZE = int(os.getenv('PROGRESS_COMMIT_PAGE_SIZE', '30'))
+COMMIT_PAGES_MAX = int(os.getenv('PROGRESS_COMMIT_PAGES_MAX', '10'))
+
+
+class SweepStats:
+    """Counters for one sweep; every external call is counted so cost can be compared with new work"""
+
+    def __init__(self):
+        self.groups = 0
+        self.tasks = 0
+        self.unchanged = 0
+        self.analyzed = 0
+        self.commit_pages = 0
+        self.commits_listed = 0
+        self.diffs_fetched = 0
+        self.progress_calls = 0
+        self.errors = 0
+
+    def to_dict(self) -> dict:
+        return dict(self.__dict__)
+
+
+def commit_time(commit) -> datetime:
+    """Committer date of a get_commits entry as a naive UTC datetime"""
+    value = commit["commit"]["committer"]["date"]
+    return datetime.fromisoformat(value.replace("Z", "+00:00")).replace(tzinfo=None)
+
+
+def list_new_commits(token, owner, repo, branch, watermarks, oldest_untracked, stats):
+    """
+    Page through get_commits (newest first) only as far as the sweep needs.
+
+    Args:
+        watermarks (set): Head SHAs the group's tasks were last analyzed at
+        oldest_untracked (datetime, optional): Creation time of the oldest task without a watermark
+
+    Returns:
+        Tuple[List[dict], bool]: The commits listed, and whether the start of history was reached
+    """
+    commits = []
+    pending = set(watermarks)
+    for page in range(1, COMMIT_PAGES_MAX + 1):
+        batch = get_commits(token, owner, repo, branch, per_page=COMMIT_PAGE_SIZE, page=page)
+        stats.commit_pages += 1
+        stats.commits_listed += len(batch)
+        commits.extend(batch)
+        pending.difference_update(commit["sha"] for commit in batch)
+        if len(batch) < COMMIT_PAGE_SIZE:
+            return commits, True
+        reached_untracked = oldest_untracked is None or commit_time(batch[-1]) <= oldest_untracked
+        if not pending and reached_untracked:
+            break
+    return commits, False
+
+
+def find_base(task, commits, positions, history_complete):
+    """
+    The SHA to diff a task from: its watermark, or for a task never analyzed (or whose
+    watermark was rewritten away) the newest commit made before the task was created.
+    Returns None when the listed commits do not reach back far enough.
+    """
+    watermark = (task.get("progress") or {}).get("head_sha")
+    if watermark in positions:
+        return watermark
+    for commit in commits:
+        if commit_time(commit) <= task["timestamp"]:
+            return commit["sha"]
+    # Every listed commit is newer than the task; diff from the root if we have all of history
+    return commits[-1]["sha"] if history_complete and commits else None
+
+
+def sweep_branch(token, repo_full_name, branch, tasks, stats):
+    """Bring every task tracking one repository branch up to the branch head"""
+    owner, repo = repo_full_name.split("/", 1)
+    watermarks = {(task.get("progress") or {}).get("head_sha") for task in tasks} - {None}
+    untracked = [task["timestamp"] for task in tasks if not (task.get("progress") or {}).get("head_sha")]
+
+    commits, history_complete = list_new_commits(token, owner, repo, branch, watermarks,
+                                                 min(untracked) if untracked else None, stats)
+    if not commits:
+        return
+    head = commits[0]["sha"]
+    positions = {commit["sha"]: i for i, commit in enumerate(commits)}
+    diffs = {}  # {base_sha: pretty diff}, shared by tasks with the same watermark
+
+    for task in tasks:
+        previous = task.get("progress") or {}
+        if previous.get("head_sha") == head:
+            stats.unchanged += 1
+            continue
+        base = find_base(task, commits, positions, history_complete)
+        if base is None:
+            logger.warning("Watermark for task %s is older than %d commits on %s@%s; skipping",
+                           task["task_id"], len(commits), repo_full_name, branch)
+            stats.errors += 1
+            continue
+        try:
+            if base == head:
+                # No commits since the task was created: record the watermark, nothing to analyze
+                save_task_progress(task["task_id"], head, previous.get("result"), 0)
+                stats.unchanged += 1
+                continue
+            if base not in diffs:
+                diffs[base] = get_pretty_diff(token, owner, repo, base, head)
+                stats.diffs_fetched += 1
+            result = get_progress(task["title"], task.get("description", ""), diffs[base], previous.get("result"))
+            stats.progress_calls += 1
+            if not result:
+                # Unparseable reply: keep the old watermark so the next sweep retries these commits
+                logger.warning("Empty progress result for task %s on %s@%s; keeping watermark %s",
+                               task["task_id"], repo_full_name, branch, previous.get("head_sha"))
+                stats.errors += 1
+                continue
+            save_task_progress(task["task_id"], head, result, positions[base])
+            stats.analyzed += 1
+        except Exception as e:
+            logger.exception("Progress analysis failed for task %s on %s@%s: %s",
+                             task["task_id"], repo_full_name, branch, e)
+            stats.errors += 1
+
+
+def sweep(token, repo=None, branches=None) -> dict:
+    """
+    Analyze new commits for all open tasks, or only those on one repository (and branches).
+    A None entry in branches selects tasks that track the repository's default branch.
+
+    Returns:
+        dict: SweepStats counters
+    """
+    stats = SweepStats()
+    groups = {}
+    for task in get_trackable_tasks(repo, branches):
+        groups.setdefault((task["repo"], task.get("branch")), []).append(task)
+    stats.groups = len(groups)
+    stats.tasks = sum(len(tasks) for tasks in groups.values())
+
+    for (repo_full_name, task_branch), tasks in groups.items():
+        try:
+            sweep_branch(token, repo_full_name, task_branch, tasks, stats)
+        except Exception as e:
+            logger.exception("Progress sweep failed for %s@%s: %s", repo_full_name, task_branch, e)
+            stats.errors += 1
+
+    logger.info("Progress sweep: %s", stats.to_dict())
+    return stats.to_dict()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Update task progress from new commits")
+    parser.add_argument("--repo", help="only tasks for this owner/name")
+    parser.add_argument("--branch", help="only tasks for this branch (with --repo)")
+    args = parser.parse_args()
+
+    token = os.getenv("GITHUB_TOKEN")
+    if not token:
+        parser.error("GITHUB_TOKEN environment variable is required")
+    print(json.dumps(sweep(token, args.repo, [args.branch] if args.branch else None), indent=2))
+
+
+if __name__ == "__main__":
+    configure_logging()
+    main()
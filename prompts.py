@@ -26,4 +26,16 @@ The response should be in JSON format as follows:
 "progress_summary": "Concise summary of the progress made on the task",
 "progress": "some progress out of 100%"
 }}
-"""
\ No newline at end of file
+"""
+
+COMMIT_PROGRESS_UPDATE_PROMPT = """
+You are an expert project manager. You previously assessed the progress on the task titled "{task_title}" with the description "{task_description}" as follows:
+{previous_progress}
+The following commit diffs contain only the changes made since that assessment. Update the assessment: keep the progress already made, add what the new changes accomplish, and describe what remains to be done. If the new changes are not relevant to the task, keep the previous progress.
+The response should be in JSON format as follows:
+{{
+"task_title": "Title of the task",
+"progress_summary": "Concise summary of the progress made on the task",
+"progress": "some progress out of 100%"
+}}
+"""
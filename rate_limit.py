@@ -0,0 +1,195 @@
+import os
+import threading
+import time
+from functools import wraps
+from flask import request, jsonify
+from dotenv import load_dotenv
+
+load_dotenv()
+
+RATE_LIMIT_ENABLED = os.getenv('RATE_LIMIT_ENABLED', 'true').lower() == 'true'
+# Only trust X-Forwarded-For when running behind a reverse proxy that sets it
+TRUST_PROXY = os.getenv('TRUST_PROXY', 'false').lower() == 'true'
+# Socket.IO events also have a per-address budget this many connections' worth; offices and
+# campuses put many participants behind one NAT address
+RATE_LIMIT_ADDR_MULTIPLIER = float(os.getenv('RATE_LIMIT_ADDR_MULTIPLIER', '50'))
+
+# Token-bucket budgets as (requests per second, burst). Socket.IO events are keyed by
+# request.sid and remote address, HTTP routes by remote address only.
+DEFAULT_EVENT_BUDGETS = {
+    'audio-chunk': (1.0, 4),
+    'ice-candidate': (50.0, 200),
+    # Clients send one event per peer every 10 ms while candidates are gathered, so joining a
+    # 20-peer room is 19 peers x ~10 flushes in about a second, and the peers answer the same way
+    'ice-candidates': (100.0, 400),
+    'offer': (5.0, 20),
+    'answer': (5.0, 20),
+    'sfu-offer': (1.0, 5),
+    'sfu-answer': (5.0, 20),
+    'update-name': (0.5, 3),
+    'join-room': (1.0, 5),
+    'leave-room': (1.0, 5),
+}
+DEFAULT_ROUTE_BUDGETS = {
+    'create-room': (0.2, 5),
+    'join-room-http': (0.5, 10),
+    'create-task': (2.0, 20),
+    'videocalls': (1.0, 5),
+    'videocall': (2.0, 10),
+    'github-webhook': (5.0, 50),
+}
+DEFAULT_BUDGETS = {**DEFAULT_EVENT_BUDGETS, **DEFAULT_ROUTE_BUDGETS}
+
+
+def parse_budgets(value: str) -> dict:
+    """Parse "event=rate/burst,event=rate/burst" into {event: (rate, burst)}"""
+    budgets = {}
+    for item in (value or "").split(","):
+        if "=" not in item or "/" not in item:
+            continue
+        name, budget = item.split("=", 1)
+        rate, burst = budget.split("/", 1)
+        try:
+            budgets[name.strip()] = (float(rate), int(burst))
+        except ValueError:
+            continue
+    return budgets
+
+
+class TokenBucketLimiter:
+    """
+    Token buckets keyed by (budget name, client key).
+
+    Each bucket refills at `rate` tokens per second up to `burst`; a call is allowed if a
+    token is available. Buckets that have been idle long enough to be full again are
+    evicted lazily so the table does not grow with every client ever seen.
+    """
+
+    def __init__(self, budgets):
+        self.budgets = budgets
+        self._lock = threading.Lock()
+        self._buckets = {}  # {key: {name: [tokens, last_refill]}}
+        self.allowed = {}
+        self.rejected = {}
+        self._last_sweep = time.monotonic()
+
+    def allow(self, name, key) -> bool:
+        return self.allow_all([(name, key)])
+
+    def allow_all(self, checks) -> bool:
+        """
+        Take one token from every (budget name, client key) bucket in checks, or from none.
+
+        A call rejected by one bucket does not use up tokens in the others, so a client held
+        back by its address budget keeps its per-connection budget. The rejection is counted
+        against the first bucket that is empty.
+        """
+        now = time.monotonic()
+        with self._lock:
+            buckets = []
+            for name, key in checks:
+                budget = self.budgets.get(name)
+                if budget is None:
+                    continue
+                rate, burst = budget
+                client_buckets = self._buckets.setdefault(key, {})
+                bucket = client_buckets.get(name)
+                if bucket is None:
+                    bucket = client_buckets[name] = [float(burst), now]
+                else:
+                    bucket[0] = min(burst, bucket[0] + (now - bucket[1]) * rate)
+                    bucket[1] = now
+                if bucket[0] < 1.0:
+                    self.rejected[name] = self.rejected.get(name, 0) + 1
+                    allowed = False
+                    break
+                buckets.append((name, bucket))
+            else:
+                for name, bucket in buckets:
+                    bucket[0] -= 1.0
+                    self.allowed[name] = self.allowed.get(name, 0) + 1
+                allowed = True
+            if now - self._last_sweep > 60:
+                self._sweep(now)
+        return allowed
+
+    def forget(self, key):
+        """Drop every bucket for a client key, e.g. when a socket disconnects"""
+        with self._lock:
+            self._buckets.pop(key, None)
+
+    def _sweep(self, now):
+        self._last_sweep = now
+        for key, client_buckets in list(self._buckets.items()):
+            for name, (tokens, last) in list(client_buckets.items()):
+                rate, burst = self.budgets[name]
+                if tokens + (now - last) * rate >= burst:
+                    del client_buckets[name]
+            if not client_buckets:
+                del self._buckets[key]
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "enabled": RATE_LIMIT_ENABLED,
+                "tracked_clients": len(self._buckets),
+                "allowed": dict(self.allowed),
+                "rejected": dict(self.rejected),
+            }
+
+
+budgets = dict(DEFAULT_BUDGETS)
+budgets.update(parse_budgets(os.getenv('RATE_LIMITS', '')))
+# Per-address budgets for Socket.IO events only; RATE_LIMITS may set "<event>:addr" directly
+for _name in DEFAULT_EVENT_BUDGETS:
+    _rate, _burst = budgets[_name]
+    budgets.setdefault(_name + ':addr', (_rate * RATE_LIMIT_ADDR_MULTIPLIER,
+                                         int(_burst * RATE_LIMIT_ADDR_MULTIPLIER)))
+limiter = TokenBucketLimiter(budgets)
+
+
+def resolve_address(forwarded_for: str, remote_addr: str) -> str:
+    """First X-Forwarded-For hop when TRUST_PROXY is set, otherwise the peer address"""
+    forwarded = forwarded_for if TRUST_PROXY else ''
+    if forwarded:
+        return forwarded.split(',')[0].strip()
+    return remote_addr or 'unknown'
+
+
+def client_address() -> str:
+    """Remote address of the current Flask request"""
+    return resolve_address(request.headers.get('X-Forwarded-For', ''), request.remote_addr)
+
+
+def limit_event(name: str):
+    """
+    Rate-limit a Socket.IO handler per connection (request.sid) and per remote address.
+    Rejected events are dropped without running the handler.
+    """
+    def decorator(handler):
+        if not RATE_LIMIT_ENABLED:
+            return handler
+
+        @wraps(handler)
+        def wrapper(*args, **kwargs):
+            # The larger per-address budget catches clients that open many sockets
+            if not limiter.allow_all([(name + ':addr', client_address()), (name, request.sid)]):
+                return None
+            return handler(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def limit_route(name: str):
+    """Rate-limit a Flask route per remote address; rejected requests get a 429"""
+    def decorator(view):
+        if not RATE_LIMIT_ENABLED:
+            return view
+
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            if not limiter.allow(name, client_address()):
+                return jsonify({"error": "Too many requests"}), 429
+            return view(*args, **kwargs)
+        return wrapper
+    return decorator
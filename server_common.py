@@ -0,0 +1,307 @@
+"""
+Room state, request parsing and response bodies shared by app.py (Flask-SocketIO) and
+async_app.py (aiohttp + AsyncServer).
+
+Nothing here emits, awaits or touches a request object: each server reads the request and
+sends the result through its own framework, so both serve the same API from one implementation.
+"""
+import os
+import uuid
+from collections import defaultdict
+from datetime import datetime
+from dotenv import load_dotenv
+
+from db_common import is_paginated, parse_datetime
+from github_webhook import GITHUB_WEBHOOK_SECRET, verify_signature, parse_push
+from logger import get_logger
+from video_call import VideoCall
+
+load_dotenv()
+
+logger = get_logger(__name__)
+
+# Lists longer than this are streamed instead of serialized into one string
+STREAM_MIN_ITEMS = int(os.getenv('STREAM_MIN_ITEMS', '200'))
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+# Directory for the legacy per-room transcript files
+TRANSCRIPTS_DIR = os.getenv('TRANSCRIPTS_DIR', os.path.join(BASE_DIR, 'transcripts'))
+
+
+class RoomState:
+    """
+    Who is in which room, each room's VideoCall and the legacy transcript storage.
+
+    Handlers call these methods and then notify the room; the caller decides how to emit.
+    """
+
+    def __init__(self, transcripts_dir=TRANSCRIPTS_DIR):
+        self.transcripts_dir = transcripts_dir
+        self.rooms = defaultdict(dict)  # {room: {userId: {"name": "John", "socketId": "abc123"}}}
+        self.user_rooms = {}  # {socketId: room}
+        self.video_calls = {}  # {room: VideoCall}
+        # Deprecated, kept for backward compatibility
+        self.transcriptions = defaultdict(list)  # {room: [{"speaker": "John", "transcription": "Hello world"}]}
+        self.transcript_files = {}  # {room: file_path}
+
+    def user_list(self, room):
+        """The room-users payload"""
+        return [{"userId": uid, "name": user_data["name"]} for uid, user_data in self.rooms[room].items()]
+
+    def join(self, user_id, room_name, user_name):
+        """Add a user to a room, creating its VideoCall and transcript file on first join"""
+        self.rooms[room_name][user_id] = {"name": user_name, "socketId": user_id}
+        self.user_rooms[user_id] = room_name
+        if room_name not in self.video_calls:
+            self.video_calls[room_name] = VideoCall(room_name)
+            logger.info("Created new VideoCall object for room: %s", room_name)
+        self.video_calls[room_name].add_attendee(user_id, user_name, user_id)
+        if room_name not in self.transcript_files:
+            self.create_transcript_file(room_name)
+
+    def leave(self, user_id, room):
+        """
+        Take a user out of a room.
+
+        Returns:
+            The users left in the room (the room-users payload)
+        """
+        if self.user_rooms.get(user_id) == room:
+            del self.user_rooms[user_id]
+        self.rooms[room].pop(user_id, None)
+        if room in self.video_calls:
+            self.video_calls[room].remove_attendee(user_id)
+        return self.user_list(room)
+
+    def rename(self, user_id, new_name):
+        """
+        Change a user's display name.
+
+        Returns:
+            The user's room, or None if they are not in one
+        """
+        room = self.user_rooms.get(user_id)
+        if room is None or user_id not in self.rooms[room]:
+            return None
+        self.rooms[room][user_id]["name"] = new_name or 'Anonymous'
+        if room in self.video_calls:
+            self.video_calls[room].update_attendee_name(user_id, new_name or 'Anonymous')
+        return room
+
+    def add_transcription(self, room, speaker_name, transcription_text, timestamp):
+        """
+        Store a transcription on the room's VideoCall and in the legacy format.
+
+        Returns:
+            The new-transcription payload
+        """
+        if room in self.video_calls:
+            self.video_calls[room].add_transcript_entry(speaker_name, transcription_text, timestamp)
+        transcription_entry = {
+            "speaker": speaker_name,
+            "transcription": transcription_text,
+            "timestamp": timestamp
+        }
+        self.transcriptions[room].append(transcription_entry)
+        return transcription_entry
+
+    def transcript(self, room_name):
+        """A room's transcript from its VideoCall, falling back to the legacy storage"""
+        if room_name in self.video_calls:
+            return self.video_calls[room_name].get_transcript()
+        return list(self.transcriptions.get(room_name, []))
+
+    def extraction_transcript(self, room_name):
+        """The transcript task extraction should run on, or None (logged) if there is nothing to extract"""
+        if room_name not in self.video_calls:
+            logger.warning("No VideoCall object for room %s, cannot create tasks.", room_name)
+            return None
+        transcript = self.video_calls[room_name].get_transcript()
+        if not transcript:
+            logger.info("No transcript available for room %s, cannot create tasks.", room_name)
+            return None
+        return transcript
+
+    def create_transcript_file(self, room_name):
+        """Create a new transcript file for a room"""
+        room_uuid = str(uuid.uuid4())
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        filename = f"transcript_{room_name}_{timestamp}_{room_uuid[:8]}.txt"
+        filepath = os.path.join(self.transcripts_dir, filename)
+        os.makedirs(os.path.dirname(filepath), exist_ok=True)
+        with open(filepath, 'w', encoding='utf-8') as f:
+            f.write("Video Call Transcript\n")
+            f.write(f"Room: {room_name}\n")
+            f.write(f"UUID: {room_uuid}\n")
+            f.write(f"Started: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
+            f.write("=" * 50 + "\n\n")
+        self.transcript_files[room_name] = filepath
+        logger.info("Created transcript file: %s", filepath)
+        return filepath
+
+
+def parse_join_event(data):
+    """
+    Read a join-room event, either {"room", "name", "sfu"} or a bare room name from old clients.
+
+    Returns:
+        (room_name, user_name, wants_sfu)
+    """
+    if isinstance(data, dict):
+        return data.get('room', 'default'), data.get('name', 'Anonymous'), bool(data.get('sfu'))
+    return data, 'Anonymous', False
+
+
+def parse_page(args):
+    """
+    Read ?offset= and ?limit= (optional) from query arguments.
+
+    Returns:
+        (offset, limit or None); raises ValueError with a client-facing message
+    """
+    try:
+        offset = max(int(args.get('offset', 0)), 0)
+        limit = int(args['limit']) if 'limit' in args else None
+    except ValueError:
+        raise ValueError("limit and offset must be integers") from None
+    if limit is not None and limit < 1:
+        raise ValueError("limit must be at least 1")
+    return offset, limit
+
+
+def video_call_view(video_call, fields, summary):
+    if summary:
+        return video_call.to_summary()
+    return video_call.to_dict(fields)
+
+
+def video_calls_page(video_calls, fields, summary, offset, limit):
+    """
+    One page of calls ordered by room name for /videocalls.
+
+    Returns:
+        (generator of (room_name, info), response headers)
+    """
+    # Snapshot so joins/leaves during streaming do not break iteration
+    room_names = sorted(video_calls.keys())
+    page = room_names[offset:offset + limit] if limit is not None else room_names[offset:]
+
+    def items():
+        for room_name in page:
+            video_call = video_calls.get(room_name)
+            if video_call is not None:
+                yield room_name, video_call_view(video_call, fields, summary)
+
+    headers = {"X-Total-Count": str(len(room_names))}
+    if limit is not None and offset + limit < len(room_names):
+        headers["X-Next-Offset"] = str(offset + limit)
+    return items(), headers
+
+
+def created_room_view(room_code, room_name, owner):
+    return {
+        "status": "Room created",
+        "room_code": room_code,
+        "room_name": room_name,
+        "owner": owner,
+        "members": [owner]  # Host included in members
+    }
+
+
+def joined_room_view(room, message):
+    return {
+        "status": message,
+        "room_code": room["room_code"],
+        "room_name": room["room_name"],
+        "owner": room["owner"],
+        "members": [m["username"] for m in room["members"]]
+    }
+
+
+def room_view(room):
+    """A room document for /room/<code>, with members as {username: tasks}"""
+    if "_id" in room:
+        room["_id"] = str(room["_id"])
+    members_dict = {}
+    for member in room.get("members", []):
+        if isinstance(member, dict) and "username" in member:
+            members_dict[member["username"]] = member.get("tasks", [])
+        elif isinstance(member, str):
+            # Handle legacy data where members might be just strings
+            members_dict[member] = []
+    room["members"] = members_dict
+    return room
+
+
+def tasks_view(tasks, next_cursor, filters):
+    """The /tasks body; next_cursor is only included when the request asked for a page"""
+    if not is_paginated(filters.get("limit"), filters.get("cursor")):
+        return {"tasks": tasks}
+    return {"tasks": tasks, "next_cursor": next_cursor}
+
+
+def parse_create_task(data):
+    """
+    Read a /create-task body into add_task_to_user_in_room positional arguments.
+
+    Returns:
+        (room_code, creator, assigned_to, title, description, due_date, status, repo, branch);
+        raises ValueError with a client-facing message
+    """
+    room_code = data.get('room_code')
+    creator = data.get('creator')
+    assigned_to = data.get('assigned_to')
+    title = data.get('title')
+    if not all([room_code, creator, assigned_to, title]):
+        raise ValueError("room_code, creator, assigned_to, and title required")
+    try:
+        due_date = parse_datetime(data.get('due_date'))
+    except ValueError:
+        raise ValueError("due_date must be an ISO 8601 date") from None
+    return (room_code, creator, assigned_to, title, data.get('description', ""), due_date,
+            data.get('status') or "open", data.get('repo'), data.get('branch'))
+
+
+def github_webhook_response(body, headers, payload, schedule):
+    """
+    Verify a GitHub delivery and schedule a progress sweep for pushed branches.
+
+    Args:
+        body: Raw request body, checked against X-Hub-Signature-256
+        headers: Request headers
+        payload: The body parsed as JSON, or None if it is not valid JSON
+        schedule: schedule(repo, branches) -> True if a sweep was scheduled, False if debounced
+
+    Returns:
+        (response body, status)
+    """
+    if not GITHUB_WEBHOOK_SECRET:
+        return {"error": "Webhook secret not configured"}, 503
+    if not verify_signature(GITHUB_WEBHOOK_SECRET, body, headers.get('X-Hub-Signature-256', '')):
+        return {"error": "Invalid signature"}, 401
+
+    event = headers.get('X-GitHub-Event', '')
+    if event == 'ping':
+        return {"status": "pong"}, 200
+    if event != 'push':
+        return {"status": "ignored", "event": event}, 202
+
+    push = parse_push(payload if isinstance(payload, dict) else {})
+    if push is None:
+        return {"status": "ignored", "event": event}, 202
+    repo, branches = push
+    scheduled = schedule(repo, branches)
+    logger.info("Push to %s %s (delivery %s): %s", repo, branches[0], headers.get('X-GitHub-Delivery'),
+                "scheduled" if scheduled else "debounced")
+    return {"status": "scheduled" if scheduled else "debounced", "repo": repo, "branch": branches[0]}, 202
+
+
+def pipeline_stats(vad_stats, coalescer, audio_queue, limiter, push_debouncer, candidate_batcher):
+    """The /stats counters both servers report"""
+    return {
+        "vad": vad_stats.to_dict(),
+        "coalescer": coalescer.stats(),
+        "audio_queue": audio_queue.stats(),
+        "rate_limit": limiter.stats(),
+        "webhooks": push_debouncer.stats(),
+        "signaling": candidate_batcher.stats()
+    }
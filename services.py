@@ -0,0 +1,194 @@
+import os
+import threading
+import time
+from dotenv import load_dotenv
+from logger import get_logger
+
+load_dotenv()
+
+logger = get_logger(__name__)
+
+_factories = {}  # {name: factory()}
+_health_checks = {}  # {name: check(instance)}
+_instances = {}  # {name: instance}
+_lock = threading.RLock()
+
+
+def register(name: str, factory, health_check=None):
+    """
+    Register a lazily created service.
+
+    Args:
+        name (str): Service name used with get()
+        factory (callable): Builds the client; called on first get(name)
+        health_check (callable, optional): check(instance) that raises if the service is unhealthy
+    """
+    with _lock:
+        _factories[name] = factory
+        if health_check is not None:
+            _health_checks[name] = health_check
+
+
+def get(name: str):
+    """Return the service instance, creating it on first use"""
+    instance = _instances.get(name)
+    if instance is not None:
+        return instance
+    with _lock:
+        instance = _instances.get(name)
+        if instance is None:
+            if name not in _factories:
+                raise KeyError(f"Unknown service: {name}")
+            started = time.perf_counter()
+            instance = _factories[name]()
+            _instances[name] = instance
+            logger.info("Initialized service %s in %.3fs", name, time.perf_counter() - started)
+        return instance
+
+
+def override(name: str, instance):
+    """Use a pre-built instance for a service (tests, benchmarks, local stand-ins)"""
+    with _lock:
+        _instances[name] = instance
+
+
+def reset(name: str = None):
+    """Forget created instances so the next get() builds them again"""
+    with _lock:
+        if name is None:
+            _instances.clear()
+        else:
+            _instances.pop(name, None)
+
+
+def is_initialized(name: str) -> bool:
+    return name in _instances
+
+
+def check(name: str):
+    """Run a service's health check, creating the service if needed; raises on failure"""
+    instance = get(name)
+    health_check = _health_checks.get(name)
+    if health_check is not None:
+        health_check(instance)
+
+
+def warmup(names=None) -> dict:
+    """
+    Create and health-check services ahead of the first request.
+
+    Returns:
+        dict: {name: "ok" or error message}
+    """
+    results = {}
+    for name in names or list(_factories):
+        try:
+            check(name)
+            results[name] = "ok"
+        except Exception as e:
+            logger.error("Warmup of service %s failed: %s", name, e)
+            results[name] = str(e)
+    return results
+
+
+def health(names=None) -> dict:
+    """
+    Report on services without creating the ones that have not been used yet.
+
+    Returns:
+        dict: {name: {"initialized": bool, "ok": bool or None, "error": str or None}}
+    """
+    report = {}
+    for name in names or list(_factories):
+        if not is_initialized(name):
+            report[name] = {"initialized": False, "ok": None, "error": None}
+            continue
+        try:
+            check(name)
+            report[name] = {"initialized": True, "ok": True, "error": None}
+        except Exception as e:
+            report[name] = {"initialized": True, "ok": False, "error": str(e)}
+    return report
+
+
+# --- Default services -------------------------------------------------------
+
+def _require_env(name: str) -> str:
+    value = os.getenv(name)
+    if not value:
+        raise ValueError(f"{name} environment variable is required")
+    return value
+
+
+def _create_mongo():
+    from pymongo import MongoClient
+    return MongoClient(_require_env('MONGO_URI'))
+
+
+def _check_mongo(client):
+    client.admin.command("ping")
+
+
+def _create_cerebras():
+    from cerebras.cloud.sdk import Cerebras
+    return Cerebras(api_key=_require_env('CEREBRAS_API_KEY'))
+
+
+def _create_assemblyai():
+    import assemblyai as aai
+    aai.settings.api_key = _require_env('ASSEMBLYAI_API_KEY')
+    return aai
+
+
+def _check_assemblyai(aai):
+    if not aai.settings.api_key:
+        raise ValueError("AssemblyAI API key is not configured")
+
+
+def _create_github():
+    # One pooled session keeps connections to api.github.com alive between calls
+    import requests
+    from requests.adapters import HTTPAdapter
+    session = requests.Session()
+    session.mount("https://", HTTPAdapter(pool_connections=4, pool_maxsize=16))
+    session.headers.update({"Accept": "application/vnd.github+json"})
+    return session
+
+
+def _create_tiktoken():
+    # Downloads the BPE ranks on first use unless TIKTOKEN_CACHE_DIR already holds them
+    import tiktoken
+    return tiktoken.get_encoding("cl100k_base")
+
+
+def _create_mongo_async():
+    from motor.motor_asyncio import AsyncIOMotorClient
+    return AsyncIOMotorClient(_require_env('MONGO_URI'))
+
+
+def _create_cerebras_async():
+    from cerebras.cloud.sdk import AsyncCerebras
+    return AsyncCerebras(api_key=_require_env('CEREBRAS_API_KEY'))
+
+
+def _create_http_async():
+    # Must be created from inside the running event loop; async_app.py closes it on shutdown
+    import aiohttp
+    return aiohttp.ClientSession(connector=aiohttp.TCPConnector(limit=100))
+
+
+def _create_assemblyai_async():
+    from async_transcriber import AsyncAssemblyAI
+    return AsyncAssemblyAI(_require_env('ASSEMBLYAI_API_KEY'), get('http_async'))
+
+
+register('mongo', _create_mongo, _check_mongo)
+register('cerebras', _create_cerebras)
+register('assemblyai', _create_assemblyai, _check_assemblyai)
+register('github', _create_github)
+register('tiktoken', _create_tiktoken)
+# Clients used by the asyncio server mode (async_app.py); health is checked there
+register('mongo_async', _create_mongo_async)
+register('cerebras_async', _create_cerebras_async)
+register('http_async', _create_http_async)
+register('assemblyai_async', _create_assemblyai_async)
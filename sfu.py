@@ -0,0 +1,270 @@
+"""
+Selective forwarding (SFU) mode for large rooms, served by async_app.py.
+
+In a mesh room every participant uploads its stream to each of the other N-1 participants
+and the server relays N^2 signaling messages. In an SFU room each participant keeps a
+single RTCPeerConnection to the server: it publishes its tracks once, and the server
+forwards every other participant's tracks to it over the same connection. The server also
+reads each participant's audio directly and hands it to the transcription pipeline as PCM,
+so SFU clients do not upload base64 audio-chunk events.
+
+Signaling over Socket.IO:
+    client -> server  sfu-offer   {offer}           publish local tracks (sent once, after ICE gathering)
+    server -> client  sfu-answer  {answer, tracks}
+    server -> client  sfu-offer   {offer, tracks}   tracks were added or removed
+    client -> server  sfu-answer  {answer}
+tracks maps each m-line's mid to the userId whose media it carries.
+
+Requires aiortc (pip install aiortc); SFU_AVAILABLE is False without it.
+"""
+import asyncio
+import os
+import time
+import numpy as np
+from dotenv import load_dotenv
+from logger import get_logger
+from vad import SAMPLE_RATE
+
+load_dotenv()
+
+logger = get_logger(__name__)
+
+try:
+    import av
+    from aiortc import RTCConfiguration, RTCIceServer, RTCPeerConnection, RTCSessionDescription
+    from aiortc.contrib.media import MediaRelay
+    from aiortc.mediastreams import MediaStreamError
+    SFU_AVAILABLE = True
+except ImportError:
+    SFU_AVAILABLE = False
+
+SFU_ENABLED = os.getenv('SFU_ENABLED', 'true').lower() == 'true'
+# STUN server the server gathers reflexive candidates from; empty for host candidates only
+SFU_STUN_SERVER = os.getenv('SFU_STUN_SERVER', 'stun:stun.l.google.com:19302')
+# Forward video as well as audio; video costs a decode plus an encode per subscriber
+SFU_FORWARD_VIDEO = os.getenv('SFU_FORWARD_VIDEO', 'true').lower() == 'true'
+# Milliseconds of received audio handed to the transcription pipeline at a time
+SFU_AUDIO_CHUNK_MS = int(os.getenv('SFU_AUDIO_CHUNK_MS', '4000'))
+# How long the server waits for a client to answer a renegotiation offer
+SFU_NEGOTIATION_TIMEOUT = float(os.getenv('SFU_NEGOTIATION_TIMEOUT', '10'))
+# How long removing a participant waits for its audio reader to deliver the last partial chunk
+SFU_TAIL_TIMEOUT = float(os.getenv('SFU_TAIL_TIMEOUT', '2'))
+
+
+def _without_send(direction: str) -> str:
+    return {"sendrecv": "recvonly", "sendonly": "inactive"}.get(direction, direction)
+
+
+def description_to_dict(description) -> dict:
+    return {"sdp": description.sdp, "type": description.type}
+
+
+class SfuPeer:
+    """One participant's connection to the server"""
+
+    def __init__(self, user_id, pc):
+        self.user_id = user_id
+        self.pc = pc
+        self.published = []  # [remote track]
+        self.readers = []  # [asyncio.Task reading a published audio track]
+        self.forwarded = {}  # {sender: publisher user id}
+        self.pending = []  # [(publisher user id, track)] to add before the next offer
+        self.ready = False  # initial publish answered; the server may send offers from now on
+        self.dirty = False  # tracks changed since the last offer was sent
+        self.negotiating = None  # asyncio.Task running renegotiate()
+        self.pending_answer = None  # asyncio.Future for the client's sfu-answer
+
+    def track_map(self) -> dict:
+        """{mid: publisher user id} for every m-line currently carrying forwarded media"""
+        return {
+            transceiver.mid: self.forwarded[transceiver.sender]
+            for transceiver in self.pc.getTransceivers()
+            if transceiver.mid is not None and transceiver.sender in self.forwarded
+        }
+
+
+class SfuRoom:
+    """
+    Forwards tracks between the participants of one room.
+
+    Args:
+        name (str): Room name
+        emit (callable): async emit(event, data, to) used to send signaling to a client
+        on_audio (callable): on_audio(room, user_id, pcm, timestamp) for each SFU_AUDIO_CHUNK_MS of a
+            participant's audio, as 16 kHz mono float32 PCM with a wall-clock start time in ms.
+            A participant's last partial chunk is delivered before remove() returns.
+    """
+
+    def __init__(self, name, emit, on_audio):
+        self.name = name
+        self.emit = emit
+        self.on_audio = on_audio
+        self.peers = {}  # {user_id: SfuPeer}
+        self.relay = MediaRelay()
+        self._tasks = set()
+        self.counters = {"publishes": 0, "renegotiations": 0, "forwarded_tracks": 0, "audio_chunks": 0}
+
+    def _spawn(self, coro):
+        task = asyncio.get_running_loop().create_task(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return task
+
+    def _configuration(self):
+        servers = [RTCIceServer(urls=SFU_STUN_SERVER)] if SFU_STUN_SERVER else []
+        return RTCConfiguration(iceServers=servers)
+
+    async def publish(self, user_id, offer) -> dict:
+        """
+        Accept a participant's publish offer and return the answer, after which the
+        participant receives everyone else's tracks through renegotiation.
+        """
+        await self.remove(user_id, renegotiate_others=False)
+        pc = RTCPeerConnection(self._configuration())
+        peer = self.peers[user_id] = SfuPeer(user_id, pc)
+        self.counters["publishes"] += 1
+
+        @pc.on("track")
+        def on_track(track):
+            peer.published.append(track)
+            if track.kind == "audio":
+                peer.readers.append(self._spawn(self._read_audio(user_id, self.relay.subscribe(track))))
+            if track.kind == "audio" or SFU_FORWARD_VIDEO:
+                for other in self.peers.values():
+                    if other.user_id != user_id:
+                        self._forward(other, user_id, track)
+
+        @pc.on("connectionstatechange")
+        async def on_connectionstatechange():
+            if pc.connectionState == "failed" and self.peers.get(user_id) is peer:
+                logger.warning("SFU connection for %s in room %s failed", user_id, self.name)
+                await self.remove(user_id)
+
+        await pc.setRemoteDescription(RTCSessionDescription(offer["sdp"], offer["type"]))
+        # Tracks already published in the room go out in a follow-up offer from the server
+        for other in self.peers.values():
+            if other.user_id != user_id:
+                for track in other.published:
+                    if track.kind == "audio" or SFU_FORWARD_VIDEO:
+                        self._forward(peer, other.user_id, track)
+        await pc.setLocalDescription(await pc.createAnswer())
+        peer.ready = True
+        if peer.dirty:
+            self._schedule_negotiation(peer)
+        return {"answer": description_to_dict(pc.localDescription), "tracks": peer.track_map()}
+
+    def _forward(self, subscriber, publisher_id, track):
+        # Senders are only added between negotiations; a pending offer/answer must not see new transceivers
+        subscriber.pending.append((publisher_id, track))
+        self._schedule_negotiation(subscriber)
+
+    def _schedule_negotiation(self, peer):
+        """Renegotiate once for a burst of track changes (e.g. a publisher's audio and video)"""
+        peer.dirty = True
+        if peer.ready and peer.negotiating is None:
+            peer.negotiating = self._spawn(self._negotiate_loop(peer))
+
+    async def _negotiate_loop(self, peer):
+        try:
+            while peer.dirty and self.peers.get(peer.user_id) is peer:
+                peer.dirty = False
+                await self.renegotiate(peer)
+        except Exception as e:
+            logger.warning("SFU renegotiation with %s in room %s failed: %s", peer.user_id, self.name, e)
+            await self.remove(peer.user_id)
+        finally:
+            peer.negotiating = None
+
+    async def renegotiate(self, peer):
+        """Send the participant an offer describing its current forwarded tracks and apply the answer"""
+        pc = peer.pc
+        if pc.signalingState != "stable":
+            return
+        for publisher_id, track in peer.pending:
+            peer.forwarded[pc.addTrack(self.relay.subscribe(track))] = publisher_id
+            self.counters["forwarded_tracks"] += 1
+        peer.pending = []
+        await pc.setLocalDescription(await pc.createOffer())
+        peer.pending_answer = asyncio.get_running_loop().create_future()
+        self.counters["renegotiations"] += 1
+        await self.emit('sfu-offer', {"offer": description_to_dict(pc.localDescription),
+                                      "tracks": peer.track_map()}, peer.user_id)
+        try:
+            answer = await asyncio.wait_for(peer.pending_answer, SFU_NEGOTIATION_TIMEOUT)
+        finally:
+            peer.pending_answer = None
+        await pc.setRemoteDescription(RTCSessionDescription(answer["sdp"], answer["type"]))
+
+    def answer(self, user_id, answer):
+        """Deliver a client's sfu-answer to the renegotiation waiting for it"""
+        peer = self.peers.get(user_id)
+        if peer is None or peer.pending_answer is None or peer.pending_answer.done():
+            return False
+        peer.pending_answer.set_result(answer)
+        return True
+
+    async def remove(self, user_id, renegotiate_others=True):
+        """
+        Close a participant's connection and stop forwarding its tracks to the others.
+        Returns once the participant's audio readers have delivered their last partial chunk.
+        """
+        peer = self.peers.pop(user_id, None)
+        if peer is None:
+            return
+        if peer.negotiating is not None and peer.negotiating is not asyncio.current_task():
+            peer.negotiating.cancel()
+        for other in self.peers.values():
+            other.pending = [(publisher_id, track) for publisher_id, track in other.pending if publisher_id != user_id]
+            removed = False
+            for transceiver in other.pc.getTransceivers():
+                if other.forwarded.get(transceiver.sender) == user_id:
+                    del other.forwarded[transceiver.sender]
+                    transceiver.sender.replaceTrack(None)
+                    transceiver.direction = _without_send(transceiver.direction)
+                    removed = True
+            if removed and renegotiate_others:
+                self._schedule_negotiation(other)
+        await peer.pc.close()
+        # Closing ends the published tracks, which makes each reader deliver what it buffered
+        if peer.readers:
+            await asyncio.wait(peer.readers, timeout=SFU_TAIL_TIMEOUT)
+
+    async def close(self):
+        for user_id in list(self.peers):
+            await self.remove(user_id, renegotiate_others=False)
+        for task in list(self._tasks):
+            task.cancel()
+
+    async def _read_audio(self, user_id, track):
+        """Resample a participant's audio to pipeline PCM and pass it on in SFU_AUDIO_CHUNK_MS pieces"""
+        resampler = av.AudioResampler(format="s16", layout="mono", rate=SAMPLE_RATE)
+        chunk_samples = SAMPLE_RATE * SFU_AUDIO_CHUNK_MS // 1000
+        parts = []
+        buffered = 0
+        started_ms = None
+        while True:
+            try:
+                frame = await track.recv()
+            except MediaStreamError:
+                break
+            if started_ms is None:
+                started_ms = int(time.time() * 1000)
+            for resampled in resampler.resample(frame):
+                samples = resampled.to_ndarray().reshape(-1)
+                parts.append(samples.astype(np.float32) / 32768.0)
+                buffered += len(samples)
+            if buffered >= chunk_samples:
+                self._deliver_audio(user_id, parts, started_ms)
+                parts, buffered, started_ms = [], 0, None
+        if parts:
+            self._deliver_audio(user_id, parts, started_ms)
+
+    def _deliver_audio(self, user_id, parts, started_ms):
+        self.counters["audio_chunks"] += 1
+        try:
+            self.on_audio(self.name, user_id, np.concatenate(parts), started_ms)
+        except Exception as e:
+            logger.exception("SFU audio handler failed for %s in room %s: %s", user_id, self.name, e)
+
+    def stats(self) -> dict:
+        return {"peers": len(self.peers), **self.counters}
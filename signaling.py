@@ -0,0 +1,88 @@
+"""
+Batched ICE candidate relay.
+
+When N peers join a mesh room each pair trickles several ICE candidates in each direction,
+so relaying them one event at a time means O(N^2 x candidates) tiny messages at join time.
+Clients send candidates as 'ice-candidates' {userId, candidates: [...]}; the server
+validates that the target is in the sender's room and coalesces everything a sender has
+for one target over ICE_BATCH_WINDOW_MS into a single 'ice-candidates' message.
+"""
+import os
+import threading
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# How long candidates for one (sender, target) pair are collected before they are relayed;
+# 0 relays each event's candidates immediately
+ICE_BATCH_WINDOW_MS = float(os.getenv('ICE_BATCH_WINDOW_MS', '5'))
+# A batch is relayed as soon as it holds this many candidates
+ICE_BATCH_MAX = int(os.getenv('ICE_BATCH_MAX', '32'))
+# Candidates accepted from one 'ice-candidates' event; a browser gathers far fewer per peer
+# in 10 ms, and the rest of an oversized list is dropped
+ICE_CANDIDATES_MAX = int(os.getenv('ICE_CANDIDATES_MAX', '20'))
+
+
+def same_room(user_rooms: dict, sender, target) -> bool:
+    """Whether target is connected and in the same room as sender"""
+    room = user_rooms.get(sender)
+    return room is not None and user_rooms.get(target) == room
+
+
+class CandidateBatcher:
+    """
+    Collects ICE candidates per (sender, target) pair.
+
+    add() returns "new" when it opened a batch, so the caller schedules flush() for the pair
+    after window_ms; "full" when the batch reached max_batch and should be flushed now.
+    """
+
+    def __init__(self, window_ms=ICE_BATCH_WINDOW_MS, max_batch=ICE_BATCH_MAX, max_per_event=ICE_CANDIDATES_MAX):
+        self.window_ms = window_ms
+        self.max_batch = max_batch
+        self.max_per_event = max_per_event
+        self._lock = threading.Lock()
+        self._pending = {}  # {(sender, target): [candidate]}
+        self.counters = {"candidates_in": 0, "events_in": 0, "batches_out": 0, "rejected": 0, "truncated": 0}
+
+    def add(self, sender, target, candidates) -> str:
+        """Queue at most max_per_event of one event's candidates for a pair; returns "new", "full" or "pending" """
+        key = (sender, target)
+        with self._lock:
+            if len(candidates) > self.max_per_event:
+                candidates = candidates[:self.max_per_event]
+                self.counters["truncated"] += 1
+            self.counters["events_in"] += 1
+            self.counters["candidates_in"] += len(candidates)
+            batch = self._pending.get(key)
+            if batch is None:
+                self._pending[key] = list(candidates)
+                outcome = "new"
+            else:
+                batch.extend(candidates)
+                outcome = "pending"
+            if len(self._pending[key]) >= self.max_batch:
+                outcome = "full"
+        return outcome
+
+    def flush(self, sender, target) -> list:
+        """Remove and return the pair's pending candidates (empty if already flushed)"""
+        with self._lock:
+            batch = self._pending.pop((sender, target), None) or []
+            if batch:
+                self.counters["batches_out"] += 1
+        return batch
+
+    def reject(self):
+        with self._lock:
+            self.counters["rejected"] += 1
+
+    def forget(self, user_id):
+        """Drop pending batches from or to a user who left"""
+        with self._lock:
+            for key in [key for key in self._pending if user_id in key]:
+                del self._pending[key]
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"pending_pairs": len(self._pending), "window_ms": self.window_ms, **self.counters}
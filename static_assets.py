@@ -0,0 +1,215 @@
+"""
+In-memory, precompressed serving of the client page and its static assets.
+
+Everything under STATIC_DIR plus INDEX_HTML is read once, fingerprinted and compressed
+(gzip, and brotli when the brotli package is installed) when the store is created, so a
+page load only picks the stored representation that matches Accept-Encoding. index.html
+references assets as /static/<name>; those references are rewritten to fingerprinted
+URLs (/static/app.3f2a1b9c.js) that are served with a one-year immutable Cache-Control.
+index.html itself and un-fingerprinted URLs are revalidated with their ETag (304).
+
+Set STATIC_RELOAD=true in development to pick up edited files without a restart.
+"""
+import gzip
+import hashlib
+import mimetypes
+import os
+import re
+import threading
+import time
+from dotenv import load_dotenv
+from logger import get_logger
+
+load_dotenv()
+
+logger = get_logger(__name__)
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+STATIC_DIR = os.getenv('STATIC_DIR', os.path.join(BASE_DIR, 'static'))
+INDEX_HTML = os.getenv('INDEX_HTML', os.path.join(BASE_DIR, 'index.html'))
+# Re-read changed files (checked at most once per STATIC_RELOAD_INTERVAL seconds)
+STATIC_RELOAD = os.getenv('STATIC_RELOAD', 'false').lower() == 'true'
+STATIC_RELOAD_INTERVAL = float(os.getenv('STATIC_RELOAD_INTERVAL', '1'))
+
+IMMUTABLE_CACHE = "public, max-age=31536000, immutable"
+REVALIDATE_CACHE = "no-cache"
+# Smaller files are not worth the Content-Encoding header
+COMPRESS_MIN_BYTES = 512
+COMPRESSIBLE_TYPES = ('text/', 'application/javascript', 'application/json', 'image/svg+xml')
+
+_ASSET_REFERENCE = re.compile(r'(["\'])/static/([\w./-]+)\1')
+
+
+def parse_accept_encoding(header: str) -> set:
+    """Codings the client accepts (q > 0)"""
+    accepted = set()
+    for part in (header or "").split(","):
+        coding, _, params = part.strip().partition(";")
+        quality = params.strip()
+        if quality.startswith("q="):
+            try:
+                if float(quality[2:]) <= 0:
+                    continue
+            except ValueError:
+                continue
+        if coding:
+            accepted.add(coding.strip().lower())
+    return accepted
+
+
+class Asset:
+    """
+    One file with its stored representations.
+
+    Attributes:
+        path (str): URL path without the leading slash, e.g. "static/app.3f2a1b9c.js"
+        content_type (str): Content-Type header value
+        etag (str): Quoted content hash
+        bodies (dict): {"identity" | "gzip" | "br": bytes}
+        cache_control (str): Cache-Control header value
+    """
+
+    def __init__(self, path, content_type, body, cache_control):
+        self.path = path
+        self.content_type = content_type
+        self.etag = '"' + hashlib.sha256(body).hexdigest()[:16] + '"'
+        self.cache_control = cache_control
+        self.bodies = {"identity": body}
+        if len(body) >= COMPRESS_MIN_BYTES and content_type.startswith(COMPRESSIBLE_TYPES):
+            compressed = gzip.compress(body, compresslevel=9, mtime=0)
+            if len(compressed) < len(body):
+                self.bodies["gzip"] = compressed
+            if brotli is not None:
+                compressed = brotli.compress(body, quality=11)
+                if len(compressed) < len(body):
+                    self.bodies["br"] = compressed
+
+    def respond(self, accept_encoding: str = "", if_none_match: str = ""):
+        """
+        Pick the representation for a request.
+
+        Returns:
+            Tuple[int, dict, bytes]: status (200 or 304), headers and body
+        """
+        accepted = parse_accept_encoding(accept_encoding)
+        coding = next((c for c in ("br", "gzip") if c in self.bodies and c in accepted), "identity")
+        etag = self.etag if coding == "identity" else self.etag[:-1] + "-" + coding + '"'
+        headers = {"ETag": etag, "Cache-Control": self.cache_control}
+        if len(self.bodies) > 1:
+            headers["Vary"] = "Accept-Encoding"
+        if if_none_match and self._matches(if_none_match):
+            return 304, headers, b""
+        headers["Content-Type"] = self.content_type
+        if coding != "identity":
+            headers["Content-Encoding"] = coding
+        return 200, headers, self.bodies[coding]
+
+    def _matches(self, if_none_match: str) -> bool:
+        if if_none_match.strip() == "*":
+            return True
+        base = self.etag.strip('"')
+        for tag in if_none_match.split(","):
+            tag = tag.strip()
+            if tag.startswith("W/"):
+                tag = tag[2:]
+            # Any stored representation of the same content is still current
+            if tag.strip('"').split("-")[0] == base:
+                return True
+        return False
+
+
+class AssetStore:
+    """Loads, fingerprints and compresses the client page and STATIC_DIR at creation"""
+
+    def __init__(self, static_dir=STATIC_DIR, index_html=INDEX_HTML, reload=STATIC_RELOAD):
+        self.static_dir = static_dir
+        self.index_html = index_html
+        self.reload = reload
+        self._lock = threading.Lock()
+        self._assets = {}  # {url path: Asset}
+        self._mtimes = {}  # {file path: mtime} for reload checks
+        self._checked_at = 0.0
+        self.load()
+
+    def _source_files(self):
+        files = {}
+        if os.path.isdir(self.static_dir):
+            for directory, _, names in os.walk(self.static_dir):
+                for name in names:
+                    full_path = os.path.join(directory, name)
+                    files["static/" + os.path.relpath(full_path, self.static_dir).replace(os.sep, "/")] = full_path
+        return files
+
+    def load(self):
+        """(Re)build every stored asset from disk"""
+        started = time.perf_counter()
+        assets = {}
+        mtimes = {}
+        fingerprinted = {}  # {"static/app.js": "static/app.3f2a1b9c.js"}
+        for path, full_path in self._source_files().items():
+            with open(full_path, "rb") as f:
+                body = f.read()
+            mtimes[full_path] = os.path.getmtime(full_path)
+            content_type = mimetypes.guess_type(path)[0] or "application/octet-stream"
+            if content_type.startswith("text/") or content_type == "application/javascript":
+                content_type += "; charset=utf-8"
+            stem, ext = os.path.splitext(path)
+            hashed_path = f"{stem}.{hashlib.sha256(body).hexdigest()[:8]}{ext}"
+            fingerprinted[path] = hashed_path
+            assets[path] = Asset(path, content_type, body, REVALIDATE_CACHE)
+            assets[hashed_path] = Asset(hashed_path, content_type, body, IMMUTABLE_CACHE)
+
+        if os.path.exists(self.index_html):
+            with open(self.index_html, "r", encoding="utf-8") as f:
+                html = f.read()
+            mtimes[self.index_html] = os.path.getmtime(self.index_html)
+
+            def fingerprint(match):
+                hashed = fingerprinted.get("static/" + match.group(2))
+                return f"{match.group(1)}/{hashed}{match.group(1)}" if hashed else match.group(0)
+            html = _ASSET_REFERENCE.sub(fingerprint, html)
+            assets["index.html"] = Asset("index.html", "text/html; charset=utf-8", html.encode("utf-8"),
+                                         REVALIDATE_CACHE)
+        else:
+            logger.warning("Client page %s not found", self.index_html)
+
+        with self._lock:
+            self._assets = assets
+            self._mtimes = mtimes
+            self._checked_at = time.monotonic()
+        logger.info("Loaded %d static assets in %.3fs (brotli %s)", len(assets), time.perf_counter() - started,
+                    "enabled" if brotli is not None else "unavailable")
+
+    def _changed(self) -> bool:
+        files = set(self._source_files().values())
+        if os.path.exists(self.index_html):
+            files.add(self.index_html)
+        if files != set(self._mtimes):
+            return True
+        return any(os.path.getmtime(path) != mtime for path, mtime in self._mtimes.items() if os.path.exists(path))
+
+    def get(self, path: str):
+        """The Asset for a URL path ("index.html", "static/app.js", ...), or None"""
+        if self.reload and time.monotonic() - self._checked_at >= STATIC_RELOAD_INTERVAL:
+            self._checked_at = time.monotonic()
+            try:
+                if self._changed():
+                    logger.info("Static files changed, reloading")
+                    self.load()
+            except OSError as e:
+                logger.warning("Static reload failed: %s", e)
+        return self._assets.get(path)
+
+    def stats(self) -> dict:
+        assets = list(self._assets.values())
+        return {
+            "assets": len(assets),
+            "identity_bytes": sum(len(asset.bodies["identity"]) for asset in assets),
+            "gzip_bytes": sum(len(asset.bodies.get("gzip", asset.bodies["identity"])) for asset in assets),
+            "brotli": brotli is not None,
+        }
@@ -1,43 +1,75 @@
 import prompts
-from cerebras_connector import send_message
+from cerebras_connector import send_message, send_message_async
 import json
+from logger import get_logger
 from github_connector import list_repos, get_branches, get_commits, get_commit_diff, get_diff_between_commits
 
+logger = get_logger(__name__)
 
-def extract_tasks(transcript: str) -> list:
-    response = send_message(transcript, prompts.TRANSCRIPT_ANALYSIS_PROMPT)
+
+def build_extraction_input(transcript: list, members: list) -> str:
+    """Render VideoCall transcript entries and room members as the extraction prompt input"""
+    transcript_text = "\n".join([f"{entry['speaker']}: {entry['transcription']}" for entry in transcript])
+    attendees = [{"username": m["username"], "role": m["role"]} for m in members if isinstance(m, dict) and "username" in m]
+    transcript_text += "\n\nTeam Members and Roles:\n"
+    for attendee in attendees:
+        transcript_text += f"- {attendee['username']}: {attendee.get('role', 'member')}\n"
+    return transcript_text
+
+
+def parse_tasks(response: str) -> list:
     try:
         tasks = json.loads(response)
         return tasks
     except json.JSONDecodeError as e:
-        print("Error decoding JSON:", e)
-        print("Response was:", response)
+        logger.error("Error decoding JSON: %s", e)
+        logger.debug("Response was: %s", response)
         return []
 
 
-def get_progress(task_title: str, task_description: str, commit_diffs: list) -> str:
-    response = send_message(
-        message=json.dumps(commit_diffs),
-        system_prompt=prompts.COMMIT_ANALYSIS_PROMPT.format(
+def extract_tasks(transcript: str) -> list:
+    response = send_message(transcript, prompts.TRANSCRIPT_ANALYSIS_PROMPT)
+    return parse_tasks(response)
+
+
+async def extract_tasks_async(transcript: str) -> list:
+    response = await send_message_async(transcript, prompts.TRANSCRIPT_ANALYSIS_PROMPT)
+    return parse_tasks(response)
+
+
+def get_progress(task_title: str, task_description: str, commit_diffs: list, previous_progress: dict = None) -> str:
+    """
+    Assess progress on a task from commit diffs. With previous_progress, commit_diffs are
+    only the changes since that assessment and the model updates it instead of starting over.
+    """
+    if previous_progress:
+        system_prompt = prompts.COMMIT_PROGRESS_UPDATE_PROMPT.format(
+            task_title=task_title,
+            task_description=task_description,
+            previous_progress=json.dumps(previous_progress)
+        )
+    else:
+        system_prompt = prompts.COMMIT_ANALYSIS_PROMPT.format(
             task_title=task_title,
             task_description=task_description
         )
-    )
+    response = send_message(message=json.dumps(commit_diffs), system_prompt=system_prompt)
     try:
         progress = json.loads(response)
         return progress
     except json.JSONDecodeError as e:
-        print("Error decoding JSON:", e)
-        print("Response was:", response)
+        logger.error("Error decoding JSON: %s", e)
+        logger.debug("Response was: %s", response)
         return {}    
     
 def get_pretty_diff(token:str, owner:str, repo:str, selected_base_commit:str, selected_head_commit:str) -> list:
     commit_diff = get_diff_between_commits(token, owner, repo, selected_base_commit, selected_head_commit)
     diffs_pretty = []
     for diff in commit_diff.get('files', []): 
+        # Binary and very large files come without a patch
         diffs_pretty.append({
             "filename": diff['filename'],
-            "patch": diff['patch']
+            "patch": diff.get('patch', '')
         })
     return diffs_pretty
 
@@ -0,0 +1,15 @@
+import pytest
+
+import app
+
+
+@pytest.fixture
+def client():
+    return app.app.test_client()
+
+
+@pytest.mark.parametrize("url", ["/videocalls?limit=0", "/videocalls?limit=-5", "/user/bob/rooms?limit=0"])
+def test_non_positive_limit_is_rejected(client, url):
+    response = client.get(url)
+    assert response.status_code == 400
+    assert response.get_json() == {"error": "limit must be at least 1"}
@@ -0,0 +1,81 @@
+import base64
+import io
+import time
+import types
+import wave
+
+import numpy as np
+import pytest
+
+import app
+import services
+from audio_queue import QueuedChunk, QueuedFlush
+from benchmarks.fakes import fake_transcriber_factory
+
+
+def use_transcriber(latency_ms):
+    services.override('assemblyai', types.SimpleNamespace(
+        Transcriber=fake_transcriber_factory(latency_ms=latency_ms),
+        TranscriptionConfig=lambda **kwargs: kwargs,
+        SpeechModel=types.SimpleNamespace(universal="universal"),
+    ))
+
+
+@pytest.fixture
+def room(tmp_path, monkeypatch):
+    """A room on the Flask server whose transcriptions go to a stand-in AssemblyAI"""
+    monkeypatch.setattr(app.state, "transcripts_dir", str(tmp_path))
+    use_transcriber(latency_ms=0)
+    app.state.join("sid-alice", "SMOKE", "Alice")
+    yield "SMOKE"
+    app.state.leave("sid-alice", "SMOKE")
+    app.video_calls.pop("SMOKE", None)
+    app.transcript_files.pop("SMOKE", None)
+    services.reset('assemblyai')
+
+
+UNDECODABLE = base64.b64encode(b"not audio").decode("ascii")
+
+
+def wav_chunk(seconds=2.0):
+    t = np.arange(int(seconds * 16000)) / 16000
+    voiced = sum(0.2 / k * np.sin(2 * np.pi * 150 * k * t) for k in range(1, 6))
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(16000)
+        wav.writeframes((voiced * 32767).astype(np.int16).tobytes())
+    return base64.b64encode(buffer.getvalue()).decode("ascii")
+
+
+@pytest.mark.parametrize("audio_data, audio_format", [
+    (wav_chunk(), "wav"),
+    # Cannot be decoded, so it is written to a temporary file and transcribed as-is
+    (UNDECODABLE, "webm"),
+])
+def test_queued_chunk_is_transcribed_and_published(room, audio_data, audio_format):
+    app.process_queued_chunk(QueuedChunk("sid-alice", room, "Alice", audio_data, 1000, audio_format))
+    app.process_queued_chunk(QueuedFlush("sid-alice", room, "leave"))
+
+    transcript = app.state.transcript(room)
+    assert transcript and {entry["speaker"] for entry in transcript} == {"Alice"}
+    assert all(entry["timestamp"] == 1000 for entry in transcript)
+
+
+def test_audio_workers_transcribe_different_speakers_at_the_same_time(room):
+    # The stand-in blocks in time.sleep, like the AssemblyAI SDK blocks on its HTTP request
+    use_transcriber(latency_ms=300)
+    speakers = min(app.AUDIO_WORKERS, 4)
+    for i in range(speakers):
+        app.audio_queue.offer(f"sid-{i}", room, f"Speaker {i}", UNDECODABLE, 1000, "webm")
+
+    started = time.perf_counter()
+    app.ensure_audio_workers()
+    while len(app.state.transcript(room)) < speakers and time.perf_counter() - started < 5:
+        app.socketio.sleep(0.01)
+    elapsed = time.perf_counter() - started
+
+    assert len(app.state.transcript(room)) == speakers
+    # One chunk at a time would take speakers x 300 ms
+    assert elapsed < 0.3 * min(speakers, 2) + 0.2
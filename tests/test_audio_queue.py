@@ -0,0 +1,87 @@
+import threading
+import time
+
+from audio_queue import AudioIngestQueue, QueuedFlush
+
+
+def test_speaker_in_flight_is_skipped_until_done():
+    queue = AudioIngestQueue(max_per_speaker=4, max_per_room=16, policy='drop-oldest')
+    queue.offer("alice", "room", "Alice", "a1", 1, "wav")
+    queue.offer("alice", "room", "Alice", "a2", 2, "wav")
+    queue.offer("bob", "room", "Bob", "b1", 1, "wav")
+
+    first = queue.take()
+    assert (first.user_id, first.timestamp) == ("alice", 1)
+    # Alice is in flight, so the next worker gets Bob and then nothing
+    second = queue.take()
+    assert (second.user_id, second.timestamp) == ("bob", 1)
+    assert queue.take() is None
+
+    queue.done("alice")
+    third = queue.take()
+    assert (third.user_id, third.timestamp) == ("alice", 2)
+
+
+def test_two_workers_keep_one_speakers_chunks_in_order():
+    queue = AudioIngestQueue(max_per_speaker=4, max_per_room=16, policy='drop-oldest')
+    queue.offer("alice", "room", "Alice", "a1", 1, "wav")
+    queue.offer("alice", "room", "Alice", "a2", 2, "wav")
+    processed = []
+    first_taken = threading.Event()
+
+    def worker(delay):
+        deadline = time.monotonic() + 2
+        while len(processed) < 2 and time.monotonic() < deadline:
+            item = queue.take()
+            if item is None:
+                time.sleep(0.001)
+                continue
+            first_taken.set()
+            # The first chunk is slower, so a second worker would overtake it without serialization
+            time.sleep(delay)
+            processed.append(item.timestamp)
+            queue.done(item.user_id)
+
+    slow = threading.Thread(target=worker, args=(0.05,))
+    slow.start()
+    assert first_taken.wait(1)
+    fast = threading.Thread(target=worker, args=(0.0,))
+    fast.start()
+    slow.join()
+    fast.join()
+
+    assert processed == [1, 2]
+
+
+def test_leave_flush_runs_after_queued_chunks_and_deadline_job_before():
+    queue = AudioIngestQueue(max_per_speaker=2, max_per_room=16, policy='drop-oldest')
+    queue.offer("alice", "room", "Alice", "a1", 1, "wav")
+    queue.offer_flush("alice", "room", "leave")
+    queue.offer_flush("alice", "room", "deadline", job="job")
+
+    entries = []
+    while (item := queue.take()) is not None:
+        entries.append(item)
+        queue.done(item.user_id)
+
+    assert [type(entry).__name__ for entry in entries] == ["QueuedFlush", "QueuedChunk", "QueuedFlush"]
+    assert (entries[0].reason, entries[0].job) == ("deadline", "job")
+    assert (entries[2].reason, entries[2].job) == ("leave", None)
+
+
+def test_flush_entries_are_never_evicted_and_keep_the_room_busy():
+    queue = AudioIngestQueue(max_per_speaker=1, max_per_room=16, policy='drop-oldest')
+    queue.offer("alice", "room", "Alice", "a1", 1, "wav")
+    queue.offer_flush("alice", "room", "leave")
+    assert queue.offer("alice", "room", "Alice", "a2", 2, "wav") == "dropped"
+    assert not queue.room_idle("room")
+
+    first = queue.take()
+    assert isinstance(first, QueuedFlush)
+    # Still busy while the flush is in flight
+    assert not queue.room_idle("room")
+    queue.done(first.user_id)
+    second = queue.take()
+    assert second.timestamp == 2
+    queue.done(second.user_id)
+    assert queue.room_idle("room")
@@ -0,0 +1,65 @@
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+import pytest
+
+import app
+import db
+import services
+from benchmarks.fakes import FakeMongoClient
+
+
+@pytest.fixture
+def mongo(monkeypatch):
+    client = FakeMongoClient()
+    services.override('mongo', client)
+    # Indexes and the backfill run again on the first use of each fresh database
+    monkeypatch.setattr(db, "_indexes_ready", False)
+    yield client[db.MONGO_DB_NAME]
+    services.reset('mongo')
+
+
+def test_concurrent_joins_by_one_user_add_one_member(mongo):
+    room_code = db.create_room("alice", "Standup")
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        results = list(pool.map(lambda _: db.join_room(room_code, "bob"), range(8)))
+
+    assert sorted(results) == [(False, "User already in room")] * 7 + [(True, "Joined room successfully")]
+    assert [m["username"] for m in mongo.rooms.find_one({"room_code": room_code})["members"]] == ["alice", "bob"]
+    assert {m["username"]: m["member_count"] for m in mongo.memberships.find({"room_code": room_code})} == \
+        {"alice": 2, "bob": 2}
+
+
+def test_join_room_recognises_legacy_string_members(mongo):
+    mongo.rooms.insert_one({"room_code": "OLD", "room_name": "Old", "owner": "alice", "members": ["alice", "bob"]})
+    assert db.join_room("OLD", "bob") == (False, "User already in room")
+    assert db.join_room("NONE", "bob") == (False, "Room not found")
+
+
+def test_rooms_from_before_the_collections_are_backfilled_once(mongo):
+    task = {"task_id": "t1", "title": "Ship it", "created_by": "alice", "timestamp": datetime(2024, 1, 1)}
+    mongo.rooms.insert_one({"room_code": "OLD", "room_name": "Old", "owner": "alice", "created_at": datetime(2024, 1, 1),
+                            "members": [{"username": "alice", "tasks": []}, {"username": "bob", "tasks": [task]}]})
+
+    tasks, next_cursor = db.get_tasks_for_user_in_room("OLD", "bob")
+    assert [t["title"] for t in tasks] == ["Ship it"] and next_cursor is None
+    assert [room["room_code"] for room in db.get_user_room_summaries("alice")] == ["OLD"]
+
+    mongo.memberships.delete_many({})
+    db.ensure_indexes(mongo)
+    assert mongo.memberships.count_documents({}) == 0
+
+
+def test_tasks_are_only_paged_when_asked(mongo):
+    room_code = db.create_room("alice", "Standup")
+    for i in range(3):
+        db.add_task_to_user_in_room(room_code, "alice", "alice", f"Task {i}")
+
+    client = app.app.test_client()
+    assert len(client.get(f"/tasks/{room_code}/alice").get_json()["tasks"]) == 3
+    assert "next_cursor" not in client.get(f"/tasks/{room_code}/alice").get_json()
+    page = client.get(f"/tasks/{room_code}/alice?limit=2").get_json()
+    assert len(page["tasks"]) == 2 and page["next_cursor"]
+    rest = client.get(f"/tasks/{room_code}/alice?limit=2&cursor={page['next_cursor']}").get_json()
+    assert len(rest["tasks"]) == 1 and rest["next_cursor"] is None
+    assert {t["title"] for t in page["tasks"] + rest["tasks"]} == {"Task 0", "Task 1", "Task 2"}
@@ -0,0 +1,25 @@
+import logging
+import os
+import subprocess
+import sys
+
+import logger
+from logger import log_event
+
+
+def test_importing_library_modules_leaves_the_root_logger_alone():
+    # A fresh interpreter, since the servers imported by other tests configure logging
+    code = "import logging, db, server_common, vad; print(len(logging.getLogger().handlers))"
+    result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True,
+                            cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))), check=True)
+    assert result.stdout.strip() == "0"
+
+
+def test_warnings_are_never_sampled_out(monkeypatch, caplog):
+    monkeypatch.setitem(logger.sample_rates, "audio-chunk", 0.0)
+    example = logging.getLogger("tests.example")
+    with caplog.at_level(logging.INFO, logger="tests.example"):
+        log_event(example, logging.INFO, "audio-chunk", "Received audio chunk")
+        log_event(example, logging.WARNING, "audio-chunk", "Audio queue full")
+    assert [record.getMessage() for record in caplog.records] == ["Audio queue full"]
+    assert "sample_rate" not in caplog.records[0].fields
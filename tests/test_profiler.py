@@ -0,0 +1,86 @@
+import asyncio
+import importlib
+import threading
+
+import pytest
+
+from profiler import ProfileToggle
+
+
+def burn():
+    return sum(i * i for i in range(20000))
+
+
+def burn_calls(toggle):
+    return sum(entry[1] for key, entry in toggle.stats.stats.items() if key[2] == "burn")
+
+
+def test_concurrent_coroutines_share_one_profiler():
+    toggle = ProfileToggle("handler", lambda toggle: None, lambda toggle: None)
+    assert toggle.enable()
+
+    @toggle.wrap_async
+    async def handler():
+        burn()
+        await asyncio.sleep(0.01)
+        burn()
+
+    async def run():
+        await asyncio.gather(*(handler() for _ in range(5)))
+
+    asyncio.run(run())
+    toggle.disable()
+
+    assert toggle.calls == 5
+    assert burn_calls(toggle) == 10
+
+
+def test_only_one_toggle_profiles_at_a_time():
+    first = ProfileToggle("first", lambda toggle: None, lambda toggle: None)
+    second = ProfileToggle("second", lambda toggle: None, lambda toggle: None)
+    assert first.enable()
+    assert not second.enable()
+    first.disable()
+    assert second.enable()
+    second.disable()
+
+
+def test_calls_from_other_threads_run_unprofiled_without_waiting():
+    toggle = ProfileToggle("handler")
+    assert toggle.enable()
+    inside = threading.Event()
+    release = threading.Event()
+
+    @toggle.wrap
+    def handler(block):
+        if block:
+            inside.set()
+            release.wait(5)
+        burn()
+
+    owner = threading.Thread(target=handler, args=(True,))
+    owner.start()
+    assert inside.wait(5)
+    other = threading.Thread(target=handler, args=(False,))
+    other.start()
+    other.join(1)
+    finished_while_profiling = not other.is_alive()
+    release.set()
+    owner.join(5)
+    toggle.disable()
+
+    assert finished_while_profiling
+    assert toggle.calls == 1
+    assert burn_calls(toggle) == 1
+
+
+@pytest.mark.parametrize("server", ["app", "async_app"])
+def test_toggling_the_audio_chunk_profile_keeps_the_registered_handler(server):
+    module = importlib.import_module(server)
+    registered = module.socketio.server if server == "app" else module.sio
+    handler = registered.handlers["/"]["audio-chunk"]
+    toggle = module.profile_toggles["handle_audio_chunk"]
+    for _ in range(3):
+        assert toggle.enable()
+        toggle.disable()
+    assert registered.handlers["/"]["audio-chunk"] is handler
@@ -0,0 +1,25 @@
+import progress_tracker
+from progress_tracker import SweepStats, sweep_branch
+
+
+def commit(sha, date):
+    return {"sha": sha, "commit": {"committer": {"date": date}}}
+
+
+def test_unparseable_progress_keeps_the_old_watermark(monkeypatch):
+    saved = []
+    monkeypatch.setattr(progress_tracker, "get_commits",
+                        lambda *args, **kwargs: [commit("new", "2024-05-02T00:00:00Z"),
+                                                 commit("old", "2024-05-01T00:00:00Z")])
+    monkeypatch.setattr(progress_tracker, "get_pretty_diff", lambda *args: [{"filename": "a.py", "patch": "+x"}])
+    # tasksync.get_progress returns {} when the model reply is not valid JSON
+    monkeypatch.setattr(progress_tracker, "get_progress", lambda *args: {})
+    monkeypatch.setattr(progress_tracker, "save_task_progress", lambda *args: saved.append(args))
+    task = {"task_id": "t1", "title": "Task", "progress": {"head_sha": "old", "result": {"status": "started"}}}
+    stats = SweepStats()
+
+    sweep_branch("token", "owner/repo", "main", [task], stats)
+
+    assert saved == []
+    assert stats.errors == 1
+    assert stats.analyzed == 0
@@ -0,0 +1,20 @@
+import rate_limit
+from rate_limit import TokenBucketLimiter
+
+
+def test_address_rejection_keeps_the_connection_token():
+    limiter = TokenBucketLimiter({"event": (0.001, 2), "event:addr": (0.001, 1)})
+    assert limiter.allow_all([("event:addr", "1.2.3.4"), ("event", "sid-a")])
+    # The address budget is spent; sid-b must not lose a token for an event that is dropped
+    assert not limiter.allow_all([("event:addr", "1.2.3.4"), ("event", "sid-b")])
+    assert limiter.allow_all([("event:addr", "5.6.7.8"), ("event", "sid-b")])
+    assert limiter.allow_all([("event:addr", "9.9.9.9"), ("event", "sid-b")])
+    assert limiter.rejected == {"event:addr": 1}
+
+
+def test_address_budgets_only_cover_socketio_events():
+    for name in rate_limit.DEFAULT_EVENT_BUDGETS:
+        rate, burst = rate_limit.budgets[name]
+        assert rate_limit.budgets[name + ":addr"][0] == rate * rate_limit.RATE_LIMIT_ADDR_MULTIPLIER
+    for name in rate_limit.DEFAULT_ROUTE_BUDGETS:
+        assert name + ":addr" not in rate_limit.budgets
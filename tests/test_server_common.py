@@ -0,0 +1,62 @@
+from datetime import datetime
+
+import pytest
+
+import db_common
+import server_common
+from server_common import RoomState
+
+
+@pytest.fixture
+def state(tmp_path):
+    return RoomState(str(tmp_path))
+
+
+def test_join_rename_and_leave_keep_rooms_and_video_call_in_sync(state):
+    state.join("s1", "room", "Alice")
+    state.join("s2", "room", "Bob")
+    assert state.user_rooms == {"s1": "room", "s2": "room"}
+    assert state.video_calls["room"].get_attendees_count() == 2
+    assert "room" in state.transcript_files
+
+    assert state.rename("s2", "Robert") == "room"
+    assert state.user_list("room") == [{"userId": "s1", "name": "Alice"}, {"userId": "s2", "name": "Robert"}]
+    assert state.rename("nobody", "X") is None
+
+    assert state.leave("s1", "room") == [{"userId": "s2", "name": "Robert"}]
+    assert "s1" not in state.user_rooms
+    assert state.video_calls["room"].get_attendees_count() == 1
+
+
+def test_transcriptions_are_stored_once_for_both_readers(state):
+    state.join("s1", "room", "Alice")
+    entry = state.add_transcription("room", "Alice", "hello", 1)
+    assert entry == {"speaker": "Alice", "transcription": "hello", "timestamp": 1}
+    assert [item["transcription"] for item in state.transcript("room")] == ["hello"]
+    assert state.extraction_transcript("other") is None
+
+
+@pytest.mark.parametrize("args, error", [({"limit": "x"}, "limit and offset must be integers"),
+                                         ({"limit": "0"}, "limit must be at least 1")])
+def test_parse_page_rejects_bad_values(args, error):
+    with pytest.raises(ValueError, match=error):
+        server_common.parse_page(args)
+
+
+def test_video_calls_page_sets_paging_headers(state):
+    for name in ("c", "a", "b"):
+        state.join("s-" + name, name, name)
+    items, headers = server_common.video_calls_page(state.video_calls, None, True, 0, 2)
+    assert [name for name, _ in items] == ["a", "b"]
+    assert headers == {"X-Total-Count": "3", "X-Next-Offset": "2"}
+
+
+def test_task_cursor_continues_after_the_last_task_of_a_page():
+    tasks = [{"task_id": str(i), "timestamp": datetime(2024, 1, 1, 0, 0, i)} for i in range(3)]
+    page, cursor = db_common.page_tasks(tasks, 2)
+    assert page == tasks[:2]
+    query = db_common.build_task_query("bob", room_code="R", cursor=cursor)
+    assert query["assigned_to"] == "bob" and query["room_code"] == "R"
+    assert query["$or"][1] == {"timestamp": tasks[1]["timestamp"], "task_id": {"$gt": "1"}}
+    with pytest.raises(ValueError):
+        db_common.decode_task_cursor("not a cursor")
@@ -0,0 +1,17 @@
+import rate_limit
+from rate_limit import TokenBucketLimiter
+from signaling import CandidateBatcher
+
+
+def test_oversized_candidate_lists_are_cut_to_the_per_event_cap():
+    batcher = CandidateBatcher(window_ms=5, max_batch=100, max_per_event=3)
+    assert batcher.add("a", "b", list(range(10))) == "new"
+    assert batcher.flush("a", "b") == [0, 1, 2]
+    assert batcher.stats()["truncated"] == 1
+
+
+def test_joining_a_twenty_peer_room_fits_the_ice_candidates_budget():
+    limiter = TokenBucketLimiter({"ice-candidates": rate_limit.DEFAULT_EVENT_BUDGETS["ice-candidates"]})
+    # One event per peer for each 10 ms client flush while candidates are gathered
+    events = [limiter.allow("ice-candidates", "sid") for _flush in range(10) for _peer in range(19)]
+    assert all(events)
@@ -0,0 +1,55 @@
+import pytest
+
+import services
+import transcript_preprocess
+from transcript_preprocess import count_tokens, prepare_extraction_input, strip_disfluencies
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("I I think we should", "I think we should"),
+    ("The the plan is ready", "The plan is ready"),
+    ("um, so er we ship it", "so we ship it"),
+    ("mm-hmm yes", "yes"),
+    ("Uh-huh, sure", "sure"),
+    ("Er, maybe", "maybe"),
+])
+def test_disfluencies_are_removed(text, expected):
+    assert strip_disfluencies(text) == expected
+
+
+@pytest.mark.parametrize("text", [
+    "We need 10 10 points",
+    "I had had enough",
+    "The offsite is in Bora Bora",
+    "Err on the side of caution",
+    "To err is human",
+])
+def test_intended_words_are_kept(text):
+    assert strip_disfluencies(text) == text
+
+
+def test_budget_overflow_drops_middle_turns():
+    filler = " ".join(f"word{n}" for n in range(20))
+    transcript = [{"speaker": f"S{i % 2}", "transcription": f"turn number {i} {filler}"} for i in range(10)]
+    line_tokens = count_tokens(f"S0: turn number 0 {filler}")
+
+    prepared = prepare_extraction_input(transcript, [], budget=line_tokens * 5)
+
+    lines = prepared.text.splitlines()
+    assert prepared.dropped_turns > 0
+    assert lines[0].startswith("S0: turn number 0 ")
+    assert lines[-1].startswith("S1: turn number 9 ")
+    assert f"[{prepared.dropped_turns} turns omitted]" in lines
+    assert "turn number 5 " not in prepared.text
+
+
+def test_token_counts_fall_back_to_the_estimate_when_the_encoding_cannot_be_loaded(monkeypatch):
+    def offline():
+        raise OSError("cannot fetch cl100k_base")
+
+    monkeypatch.setattr(transcript_preprocess, "_encoding_unavailable", False)
+    monkeypatch.setitem(services._factories, "tiktoken", offline)
+    services.reset("tiktoken")
+    # 3 words x 1.3 + 1 punctuation mark
+    assert count_tokens("one two three.") == 5
+    assert transcript_preprocess.get_encoding() is None
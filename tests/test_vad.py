@@ -0,0 +1,59 @@
+import io
+import wave
+
+import numpy as np
+
+import vad
+
+
+def seconds(n):
+    return np.arange(int(n * vad.SAMPLE_RATE)) / vad.SAMPLE_RATE
+
+
+def test_broadband_noise_is_skipped():
+    rng = np.random.default_rng(0)
+    # Uniform noise with a standard deviation of 0.05
+    half_width = 0.05 * np.sqrt(3)
+    noise = rng.uniform(-half_width, half_width, vad.SAMPLE_RATE * 2).astype(np.float32)
+
+    assert vad.filter_pcm(noise).decision == "skip"
+
+
+def test_voiced_sound_is_kept():
+    t = seconds(2)
+    # A vowel-like signal: a 150 Hz fundamental with a few harmonics
+    voiced = sum(0.2 / k * np.sin(2 * np.pi * 150 * k * t) for k in range(1, 6)).astype(np.float32)
+
+    assert vad.filter_pcm(voiced).decision == "keep"
+
+
+def test_silence_around_speech_is_trimmed():
+    t = seconds(1)
+    voiced = (0.3 * np.sin(2 * np.pi * 200 * t)).astype(np.float32)
+    silence = np.zeros(vad.SAMPLE_RATE * 2, dtype=np.float32)
+
+    result = vad.filter_pcm(np.concatenate([silence, voiced, silence]))
+
+    assert result.decision == "trim"
+    assert result.speech_ms >= 900
+
+
+def wav_bytes(pcm, rate, channels=1):
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as wav:
+        wav.setnchannels(channels)
+        wav.setsampwidth(2)
+        wav.setframerate(rate)
+        wav.writeframes((np.repeat(pcm, channels) * 32767).astype(np.int16).tobytes())
+    return buffer.getvalue()
+
+
+def test_wav_is_decoded_without_ffmpeg(monkeypatch):
+    monkeypatch.setattr(vad, "FFMPEG_PATH", None)
+    t = np.arange(8000) / 8000
+    voiced = sum(0.2 / k * np.sin(2 * np.pi * 150 * k * t) for k in range(1, 6))
+
+    pcm = vad.decode_to_pcm(wav_bytes(voiced, 8000, channels=2))
+    assert len(pcm) == vad.SAMPLE_RATE
+    assert vad.filter_chunk(wav_bytes(voiced, 8000)).decision == "keep"
+    assert vad.filter_chunk(b"\x1aE\xdf\xa3 webm").decision == "undecoded"
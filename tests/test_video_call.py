@@ -0,0 +1,15 @@
+from video_call import VideoCall
+
+
+def test_to_dict_snapshots_attendees_and_transcript():
+    call = VideoCall("room")
+    call.add_attendee("u1", "Alice", "u1")
+    call.add_transcript_entry("Alice", "Hello", 1)
+
+    data = call.to_dict(["attendees", "transcript"])
+    # A join or a new transcript entry while the response streams must not change what it iterates
+    call.add_attendee("u2", "Bob", "u2")
+    call.add_transcript_entry("Bob", "Hi", 2)
+
+    assert list(data["attendees"]) == ["u1"]
+    assert len(data["transcript"]) == 1
@@ -0,0 +1,222 @@
+"""
+Transcript preprocessing before LLM task extraction.
+
+Raw VideoCall transcripts are one entry per audio chunk, so they carry filler words,
+fragments repeated across chunk boundaries, empty transcriptions and one line per chunk
+for a speaker who talked for a minute. prepare_extraction_input cleans them up in order:
+    1. strip disfluencies (um, uh, mm-hmm, stutters such as "I I think")
+    2. drop empty text and text repeated from the speaker's previous chunk, including the
+       words that overlap a chunk boundary
+    3. merge consecutive lines from the same speaker into one turn
+    4. render the turns and a one-line member/role appendix, dropping turns from the middle
+       of the call if the result is over EXTRACTION_TOKEN_BUDGET
+and reports the prompt token count before and after.
+"""
+import os
+import re
+from dotenv import load_dotenv
+from logger import get_logger
+import services
+from tasksync import build_extraction_input
+
+load_dotenv()
+
+logger = get_logger(__name__)
+
+TRANSCRIPT_PREPROCESS_ENABLED = os.getenv('TRANSCRIPT_PREPROCESS_ENABLED', 'true').lower() == 'true'
+# Upper bound on transcript tokens sent for extraction (0 disables the budget)
+EXTRACTION_TOKEN_BUDGET = int(os.getenv('EXTRACTION_TOKEN_BUDGET', '24000'))
+# Words a chunk must repeat from the end of the previous one to count as boundary overlap
+OVERLAP_MIN_WORDS = 3
+
+# tiktoken gives real BPE counts; without it (or offline, when its encoding cannot be fetched)
+# tokens are estimated as 1.3 per word plus one per punctuation mark, and the budget is
+# enforced against that estimate. The encoding is the 'tiktoken' service, loaded on first use.
+_encoding_unavailable = False
+
+# Whole tokens only: hyphens count as part of a word, so "mm-hmm" goes as one filler. "er" is
+# a filler in lower case, and "er"/"err" in any case when a comma, period or the end of the
+# text follows, which keeps "Err on the side of caution" and "to err is human".
+_FILLERS = re.compile(r"(?<![\w'-])(?:u+m+|u+h+|uh+m+|e+r+m+|a+h+|h+m+|m+h*m+|m+-?h+m+|u+h+-h+u+h+|(?-i:e+r)"
+                      r"|e+r+(?=[,.]|\s*$))(?![\w'-])[,.]?\s*", re.IGNORECASE)
+_PHRASE_FILLERS = re.compile(r",?\s*(?<![\w'])(?:you know|i mean|sort of|kind of),\s*", re.IGNORECASE)
+# Repeated alphabetic words; numbers ("10 10 points") are never collapsed
+_STUTTER = re.compile(r"(?<![\w'-])((?:[^\W\d_]|')+)(?:[\s,]+\1)+(?![\w'-])", re.IGNORECASE)
+# Words that are repeated on purpose ("I had had enough", "what it is is")
+_INTENDED_REPEATS = {"had", "that", "is"}
+_REPEAT_SEPARATOR = re.compile(r"[\s,]+")
+_SPACES = re.compile(r"\s+")
+_SPACE_BEFORE_PUNCT = re.compile(r"\s+([,.!?;:])")
+_WORD_TOKENS = re.compile(r"\w+|[^\w\s]")
+
+
+def get_encoding():
+    """tiktoken's cl100k_base, or None (logged once) if it is not installed or cannot be fetched"""
+    global _encoding_unavailable
+    if _encoding_unavailable:
+        return None
+    try:
+        return services.get('tiktoken')
+    except Exception as e:
+        _encoding_unavailable = True
+        logger.warning("tiktoken encoding unavailable, estimating prompt tokens instead: %s", e)
+        return None
+
+
+def count_tokens(text: str) -> int:
+    """Prompt tokens for text: tiktoken's cl100k_base when available, otherwise an estimate"""
+    encoding = get_encoding()
+    if encoding is not None:
+        return len(encoding.encode(text))
+    # Roughly 1.3 BPE tokens per word; punctuation marks are usually one token each
+    words = 0
+    punctuation = 0
+    for token in _WORD_TOKENS.findall(text):
+        if token[0].isalnum() or token[0] == '_':
+            words += 1
+        else:
+            punctuation += 1
+    return int(words * 1.3 + punctuation + 0.5)
+
+
+def _collapse_stutter(match) -> str:
+    word = match.group(1)
+    if word.lower() in _INTENDED_REPEATS:
+        return match.group(0)
+    # The same capitalized word repeated exactly is a name ("Bora Bora"); "I I" and "The the" are stutters
+    if word != "I" and word[0].isupper() and set(_REPEAT_SEPARATOR.split(match.group(0))) == {word}:
+        return match.group(0)
+    return word
+
+
+def strip_disfluencies(text: str) -> str:
+    text = _FILLERS.sub("", text)
+    text = _PHRASE_FILLERS.sub(" ", text)
+    text = _STUTTER.sub(_collapse_stutter, text)
+    text = _SPACE_BEFORE_PUNCT.sub(r"\1", _SPACES.sub(" ", text)).strip(" ,")
+    return text
+
+
+def _words(text: str) -> list:
+    return [word.strip(".,!?;:\"'").lower() for word in text.split()]
+
+
+def remove_overlap(previous: str, text: str) -> str:
+    """Drop words at the start of text that repeat the end of previous (a chunk-boundary repeat)"""
+    previous_words = _words(previous)
+    words = text.split()
+    normalized = _words(text)
+    for size in range(min(len(previous_words), len(normalized)), OVERLAP_MIN_WORDS - 1, -1):
+        if previous_words[-size:] == normalized[:size]:
+            return " ".join(words[size:])
+    return text
+
+
+def clean_entries(transcript: list) -> list:
+    """
+    Apply steps 1-3 to VideoCall transcript entries.
+
+    Returns:
+        List[Tuple[str, str]]: (speaker, text) turns
+    """
+    turns = []
+    last_text = {}  # {speaker: previous cleaned chunk}
+    for entry in transcript:
+        speaker = entry.get('speaker') or 'Unknown'
+        text = strip_disfluencies(entry.get('transcription') or "")
+        previous = last_text.get(speaker)
+        if previous is not None:
+            if _words(text) == _words(previous):
+                continue
+            text = remove_overlap(previous, text)
+        if not any(ch.isalnum() for ch in text):
+            continue
+        last_text[speaker] = text
+        if turns and turns[-1][0] == speaker:
+            turns[-1] = (speaker, turns[-1][1] + " " + text)
+        else:
+            turns.append((speaker, text))
+    return turns
+
+
+def render_members(members: list) -> str:
+    """Compact member appendix: "Team Members and Roles: alice (host), bob (member)" """
+    people = [f"{m['username']} ({m.get('role', 'member')})"
+              for m in members if isinstance(m, dict) and "username" in m]
+    return "Team Members and Roles: " + ", ".join(people) if people else ""
+
+
+class PreparedTranscript:
+    """
+    Extraction input produced by prepare_extraction_input.
+
+    Attributes:
+        text (str): Prompt input for extract_tasks
+        tokens_before (int): Tokens in the unprocessed input (tasksync.build_extraction_input)
+        tokens_after (int): Tokens in text
+        entries (int): Transcript entries received
+        turns (int): Speaker turns kept
+        dropped_turns (int): Turns dropped from the middle to fit EXTRACTION_TOKEN_BUDGET
+    """
+
+    def __init__(self, text, tokens_before, tokens_after, entries, turns, dropped_turns=0):
+        self.text = text
+        self.tokens_before = tokens_before
+        self.tokens_after = tokens_after
+        self.entries = entries
+        self.turns = turns
+        self.dropped_turns = dropped_turns
+
+    def to_dict(self) -> dict:
+        return {
+            "tokens_before": self.tokens_before,
+            "tokens_after": self.tokens_after,
+            "entries": self.entries,
+            "turns": self.turns,
+            "dropped_turns": self.dropped_turns,
+        }
+
+
+def prepare_extraction_input(transcript: list, members: list,
+                             budget: int = EXTRACTION_TOKEN_BUDGET) -> PreparedTranscript:
+    """
+    Build the task-extraction input for a call, preprocessed unless TRANSCRIPT_PREPROCESS_ENABLED is false.
+
+    Args:
+        transcript (List[dict]): VideoCall transcript entries
+        members (List[dict]): Room members with username and role
+        budget (int): Maximum transcript tokens; 0 for no limit
+    """
+    raw = build_extraction_input(transcript, members)
+    tokens_before = count_tokens(raw)
+    if not TRANSCRIPT_PREPROCESS_ENABLED:
+        return PreparedTranscript(raw, tokens_before, tokens_before, len(transcript), len(transcript))
+
+    turns = clean_entries(transcript)
+    lines = [f"{speaker}: {text}" for speaker, text in turns]
+    appendix = render_members(members)
+    line_tokens = [count_tokens(line) + 1 for line in lines]
+    total = sum(line_tokens) + count_tokens(appendix)
+
+    # Over budget: drop turns from the middle outwards, since the opening (agenda) and the end
+    # (wrap-up, action items) carry most of the tasks. The first and last turns are always kept
+    # and the appendix still names everyone.
+    middle = (len(lines) - 1) / 2
+    dropped_indices = set()
+    for index in sorted(range(1, len(lines) - 1), key=lambda i: abs(i - middle)):
+        if not budget or total <= budget:
+            break
+        total -= line_tokens[index]
+        dropped_indices.add(index)
+    dropped = len(dropped_indices)
+    if dropped:
+        first = min(dropped_indices)
+        kept = lines[:first] + [f"[{dropped} turns omitted]"] + lines[first + dropped:]
+        logger.warning("Transcript over the %d token budget; dropped %d of %d turns", budget, dropped, len(lines))
+    else:
+        kept = lines
+
+    text = "\n".join(kept)
+    if appendix:
+        text += "\n\n" + appendix
+    return PreparedTranscript(text, tokens_before, count_tokens(text), len(transcript), len(turns) - dropped, dropped)
@@ -0,0 +1,278 @@
+import io
+import os
+import shutil
+import subprocess
+import threading
+import wave
+import numpy as np
+from dotenv import load_dotenv
+from logger import get_logger
+
+load_dotenv()
+
+logger = get_logger(__name__)
+
+# Audio is decoded to 16 kHz mono PCM and analysed in fixed-size frames
+SAMPLE_RATE = 16000
+FRAME_MS = 30
+FRAME_SAMPLES = SAMPLE_RATE * FRAME_MS // 1000
+
+VAD_ENABLED = os.getenv('VAD_ENABLED', 'true').lower() == 'true'
+# Frames quieter than this (dBFS) are never considered speech
+VAD_ENERGY_THRESHOLD_DB = float(os.getenv('VAD_ENERGY_THRESHOLD_DB', '-45'))
+# Frames must also be this far above the chunk's own noise floor
+VAD_SNR_DB = float(os.getenv('VAD_SNR_DB', '6'))
+# A chunk with less detected speech than this is dropped entirely
+VAD_MIN_SPEECH_MS = int(os.getenv('VAD_MIN_SPEECH_MS', '240'))
+# Silence kept around detected speech when trimming
+VAD_PADDING_MS = int(os.getenv('VAD_PADDING_MS', '300'))
+# Only re-encode a trimmed chunk if it removes at least this fraction of the audio
+VAD_MIN_TRIM_RATIO = float(os.getenv('VAD_MIN_TRIM_RATIO', '0.2'))
+# Frames crossing zero on more than this fraction of samples are treated as noise, not voice
+VAD_MAX_ZERO_CROSSING_RATE = float(os.getenv('VAD_MAX_ZERO_CROSSING_RATE', '0.35'))
+
+# Only needed for compressed chunks (the browser's WebM/Opus); WAV is decoded in-process
+FFMPEG_PATH = os.getenv('FFMPEG_PATH') or shutil.which('ffmpeg')
+
+
+def warn_if_ffmpeg_missing():
+    """Log once at server startup, after logging is configured, if compressed chunks will skip VAD"""
+    if VAD_ENABLED and not FFMPEG_PATH:
+        logger.warning("ffmpeg not found (set FFMPEG_PATH); WebM/Opus audio chunks will be transcribed without VAD")
+
+
+class VadStats:
+    """Thread-safe counters describing how much audio the VAD stage removed"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.chunks_total = 0
+        self.chunks_skipped = 0
+        self.chunks_trimmed = 0
+        self.chunks_undecoded = 0
+        self.audio_ms_total = 0
+        self.audio_ms_skipped = 0
+        self.audio_ms_trimmed = 0
+
+    def record(self, decision: str, total_ms: int = 0, removed_ms: int = 0):
+        with self._lock:
+            self.chunks_total += 1
+            self.audio_ms_total += total_ms
+            if decision == "skip":
+                self.chunks_skipped += 1
+                self.audio_ms_skipped += total_ms
+            elif decision == "trim":
+                self.chunks_trimmed += 1
+                self.audio_ms_trimmed += removed_ms
+            elif decision == "undecoded":
+                self.chunks_undecoded += 1
+
+    def to_dict(self) -> dict:
+        with self._lock:
+            removed = self.audio_ms_skipped + self.audio_ms_trimmed
+            return {
+                "enabled": VAD_ENABLED,
+                "ffmpeg_available": FFMPEG_PATH is not None,
+                "chunks_total": self.chunks_total,
+                "chunks_skipped": self.chunks_skipped,
+                "chunks_trimmed": self.chunks_trimmed,
+                "chunks_undecoded": self.chunks_undecoded,
+                "audio_ms_total": self.audio_ms_total,
+                "audio_ms_skipped": self.audio_ms_skipped,
+                "audio_ms_trimmed": self.audio_ms_trimmed,
+                "audio_removed_ratio": removed / self.audio_ms_total if self.audio_ms_total else 0.0,
+            }
+
+
+stats = VadStats()
+
+
+class VadResult:
+    """
+    Outcome of running a chunk through the VAD stage.
+
+    Attributes:
+        decision (str): "skip" (no speech), "trim" (silence removed), "keep" or "undecoded"
+        audio_bytes (bytes): Audio to send to the transcriber, None when skipped
+        audio_format (str): File extension for audio_bytes, None to keep the original format
+        pcm (np.ndarray): Decoded float32 PCM of the audio that is kept, None if decoding failed
+        speech_ms (int): Milliseconds of detected speech
+        total_ms (int): Duration of the decoded chunk in milliseconds
+    """
+
+    def __init__(self, decision, audio_bytes=None, audio_format=None, pcm=None, speech_ms=0, total_ms=0):
+        self.decision = decision
+        self.audio_bytes = audio_bytes
+        self.audio_format = audio_format
+        self.pcm = pcm
+        self.speech_ms = speech_ms
+        self.total_ms = total_ms
+
+    @property
+    def skip(self) -> bool:
+        return self.decision == "skip"
+
+
+def decode_wav(audio_bytes: bytes):
+    """
+    Decode a PCM RIFF/WAV payload to 16 kHz mono float32 PCM without a subprocess.
+    Returns None if it is not a WAV file the wave module can read (e.g. float samples).
+    """
+    if audio_bytes[:4] != b"RIFF" or audio_bytes[8:12] != b"WAVE":
+        return None
+    try:
+        with wave.open(io.BytesIO(audio_bytes), "rb") as wav:
+            channels, width, rate = wav.getnchannels(), wav.getsampwidth(), wav.getframerate()
+            frames = wav.readframes(wav.getnframes())
+    except (wave.Error, EOFError):
+        return None
+    if width == 1:
+        samples = (np.frombuffer(frames, dtype=np.uint8).astype(np.float32) - 128.0) / 128.0
+    elif width in (2, 4):
+        dtype = np.int16 if width == 2 else np.int32
+        samples = np.frombuffer(frames, dtype=dtype).astype(np.float32) / float(np.iinfo(dtype).max + 1)
+    else:
+        return None
+    samples = samples[:len(samples) - len(samples) % channels].reshape(-1, channels).mean(axis=1)
+    if rate != SAMPLE_RATE and len(samples):
+        positions = np.arange(int(len(samples) * SAMPLE_RATE / rate)) * (rate / SAMPLE_RATE)
+        samples = np.interp(positions, np.arange(len(samples)), samples).astype(np.float32)
+    return samples.astype(np.float32)
+
+
+def decode_to_pcm(audio_bytes: bytes):
+    """
+    Decode an encoded chunk (Opus/WebM, WAV, ...) to 16 kHz mono float32 PCM.
+    WAV is read in-process; anything else goes through ffmpeg.
+    Returns None if ffmpeg is needed but unavailable, or the payload cannot be decoded.
+    """
+    if not audio_bytes:
+        return None
+    pcm = decode_wav(audio_bytes)
+    if pcm is not None:
+        return pcm
+    if not FFMPEG_PATH:
+        return None
+    try:
+        completed = subprocess.run(
+            [FFMPEG_PATH, "-hide_banner", "-loglevel", "error", "-i", "pipe:0",
+             "-f", "s16le", "-acodec", "pcm_s16le", "-ac", "1", "-ar", str(SAMPLE_RATE), "pipe:1"],
+            input=audio_bytes, stdout=subprocess.PIPE, stderr=subprocess.PIPE, timeout=10, check=False
+        )
+    except (OSError, subprocess.TimeoutExpired) as e:
+        logger.warning("ffmpeg decode failed: %s", e)
+        return None
+    if completed.returncode != 0 or not completed.stdout:
+        logger.debug("ffmpeg could not decode chunk: %s", completed.stderr[-200:])
+        return None
+    return np.frombuffer(completed.stdout, dtype=np.int16).astype(np.float32) / 32768.0
+
+
+def pcm_to_wav_bytes(pcm: np.ndarray) -> bytes:
+    """Encode float32 PCM as a 16-bit mono WAV file"""
+    samples = (np.clip(pcm, -1.0, 1.0) * 32767.0).astype(np.int16)
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(SAMPLE_RATE)
+        wav.writeframes(samples.tobytes())
+    return buffer.getvalue()
+
+
+def frame_signal(pcm: np.ndarray) -> np.ndarray:
+    """Reshape PCM into a (n_frames, FRAME_SAMPLES) view, dropping the incomplete tail"""
+    n_frames = len(pcm) // FRAME_SAMPLES
+    return pcm[:n_frames * FRAME_SAMPLES].reshape(n_frames, FRAME_SAMPLES)
+
+
+def frame_energy_db(frames: np.ndarray) -> np.ndarray:
+    return 10.0 * np.log10(np.mean(frames * frames, axis=1) + 1e-10)
+
+
+def speech_probability(frames: np.ndarray) -> np.ndarray:
+    """
+    Estimate a per-frame speech probability from energy, the chunk's adaptive noise
+    floor and zero-crossing rate. The three scores are multiplied, so a frame has to
+    pass all of them. All operations are vectorized over frames.
+    """
+    if len(frames) == 0:
+        return np.zeros(0, dtype=np.float32)
+    energy_db = frame_energy_db(frames)
+    noise_floor_db = np.percentile(energy_db, 10)
+    zero_crossings = np.mean(np.abs(np.diff(np.signbit(frames), axis=1)), axis=1)
+
+    # Logistic scores: loud enough in absolute terms and relative to the noise floor
+    absolute = 1.0 / (1.0 + np.exp(-(energy_db - VAD_ENERGY_THRESHOLD_DB) / 3.0))
+    relative = 1.0 / (1.0 + np.exp(-(energy_db - noise_floor_db - VAD_SNR_DB) / 3.0))
+    # Broadband noise crosses zero far more often than voiced speech; unvoiced consonants that
+    # score low here are usually recovered by the padding around neighbouring voiced frames
+    voicing = 1.0 / (1.0 + np.exp((zero_crossings - VAD_MAX_ZERO_CROSSING_RATE) / 0.05))
+
+    # A chunk that is uniformly loud has no noise floor to compare against; fall back to absolute energy
+    if np.ptp(energy_db) < VAD_SNR_DB:
+        relative = np.ones_like(relative)
+    return absolute * relative * voicing
+
+
+def analyze(pcm: np.ndarray):
+    """Return (speech_mask, speech_ms) for decoded PCM, with speech regions padded"""
+    frames = frame_signal(pcm)
+    speech = speech_probability(frames) >= 0.5
+    speech_ms = int(np.count_nonzero(speech) * FRAME_MS)
+    pad_frames = VAD_PADDING_MS // FRAME_MS
+    if pad_frames and speech.any():
+        # Dilate the mask so word onsets and tails are not clipped
+        speech = np.convolve(speech.astype(np.int8), np.ones(2 * pad_frames + 1, dtype=np.int8), mode="same") > 0
+    return speech, speech_ms
+
+
+def filter_chunk(audio_bytes: bytes) -> VadResult:
+    """
+    Run the VAD stage on one encoded audio chunk.
+
+    Chunks without enough speech are skipped; chunks with long leading or trailing
+    silence are trimmed and re-encoded as WAV. If the chunk cannot be decoded the
+    original bytes are passed through unchanged so transcription still happens.
+    """
+    if not VAD_ENABLED:
+        return VadResult("keep", audio_bytes)
+
+    pcm = decode_to_pcm(audio_bytes)
+    if pcm is None:
+        stats.record("undecoded")
+        return VadResult("undecoded", audio_bytes)
+    return filter_pcm(pcm, audio_bytes)
+
+
+def filter_pcm(pcm: np.ndarray, audio_bytes: bytes = None) -> VadResult:
+    """
+    Run the VAD stage on already decoded 16 kHz mono PCM (e.g. audio received over WebRTC).
+
+    Args:
+        pcm (np.ndarray): float32 samples
+        audio_bytes (bytes, optional): The encoded original, sent as-is when nothing is trimmed;
+            without it kept audio is encoded as WAV
+    """
+    total_ms = len(pcm) * 1000 // SAMPLE_RATE
+    if not VAD_ENABLED:
+        return VadResult("keep", pcm_to_wav_bytes(pcm), "wav", pcm, total_ms=total_ms)
+
+    speech, speech_ms = analyze(pcm)
+    if speech_ms < VAD_MIN_SPEECH_MS:
+        stats.record("skip", total_ms)
+        return VadResult("skip", speech_ms=speech_ms, total_ms=total_ms)
+
+    voiced = np.flatnonzero(speech)
+    start = voiced[0] * FRAME_SAMPLES
+    end = min(len(pcm), (voiced[-1] + 1) * FRAME_SAMPLES)
+    removed_ms = (len(pcm) - (end - start)) * 1000 // SAMPLE_RATE
+    if total_ms and removed_ms / total_ms >= VAD_MIN_TRIM_RATIO:
+        trimmed = pcm[start:end]
+        stats.record("trim", total_ms, removed_ms)
+        return VadResult("trim", pcm_to_wav_bytes(trimmed), "wav", trimmed, speech_ms, total_ms)
+
+    stats.record("keep", total_ms)
+    if audio_bytes is None:
+        return VadResult("keep", pcm_to_wav_bytes(pcm), "wav", pcm, speech_ms, total_ms)
+    return VadResult("keep", audio_bytes, None, pcm, speech_ms, total_ms)
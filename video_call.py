@@ -116,21 +116,40 @@ class VideoCall:
         """
         return len(self.attendees)
         
-    def to_dict(self) -> Dict[str, Any]:
+    def to_dict(self, fields: List[str] = None) -> Dict[str, Any]:
         """
         Convert the VideoCall object to a dictionary representation.
         
+        Args:
+            fields (List[str], optional): Only include these keys. Unknown keys are ignored.
+                Fields that are not requested are never built, so a projection that
+                leaves out "transcript" costs nothing per transcript entry.
+        
         Returns:
             Dict[str, Any]: Dictionary representation of the video call
         """
-        return {
-            "uuid": self.uuid,
-            "room_code": self.room_code,
-            "attendees": self.attendees,
-            "transcript": self.transcript,
-            "created_at": self.created_at.isoformat(),
-            "attendees_count": self.get_attendees_count()
+        builders = {
+            "uuid": lambda: self.uuid,
+            "room_code": lambda: self.room_code,
+            # Copies, so a response streamed while people join or speak iterates a stable snapshot
+            "attendees": lambda: dict(self.attendees),
+            "transcript": lambda: list(self.transcript),
+            "created_at": lambda: self.created_at.isoformat(),
+            "attendees_count": self.get_attendees_count,
+            "transcript_entries": lambda: len(self.transcript)
         }
+        if fields is None:
+            fields = ["uuid", "room_code", "attendees", "transcript", "created_at", "attendees_count"]
+        return {field: builders[field]() for field in fields if field in builders}
+        
+    def to_summary(self) -> Dict[str, Any]:
+        """
+        Convert the VideoCall object to a small summary without attendees or transcript.
+        
+        Returns:
+            Dict[str, Any]: uuid, room_code, created_at, attendees_count and transcript_entries
+        """
+        return self.to_dict(["uuid", "room_code", "created_at", "attendees_count", "transcript_entries"])
         
     def __str__(self) -> str:
         """String representation of the VideoCall object."""